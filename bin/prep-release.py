@@ -1,6 +1,10 @@
+import hashlib
 import re
+import shutil
 import subprocess
 import sys
+import tempfile
+import zipapp
 from datetime import UTC, datetime
 from pathlib import Path
 from zipfile import ZipFile
@@ -15,12 +19,15 @@ def main(release_version):
     if final_release:
         generate_release_changelog()
         zip_wrappers()
+        build_zipapp(release_version)
         update_changelog(release_version)
     subprocess.run(["git", "tag", "-am", f"Release {release_version} by Github action", release_version], check=True)
 
 
 def cleanup_old_files():
     Path("wrappers.zip").unlink(missing_ok=True)
+    for pyz in [*Path().glob("pyprojectx-*.pyz"), *Path().glob("pyprojectx-*.pyz.sha256")]:
+        pyz.unlink()
     Path(".release-changelog.md").unlink(missing_ok=True)
 
 
@@ -51,6 +58,21 @@ def zip_wrappers():
         zip_file.write("src/pyprojectx/wrapper/pw.ps1", "pw.ps1")
 
 
+def build_zipapp(release_version):
+    # bundle pyprojectx with its pure Python dependencies; uv is a platform specific binary that pw installs itself
+    with Path("dist/requirements.txt").open() as f:
+        requirements = [req.split(";")[0].strip() for req in f.read().splitlines() if not req.startswith("uv==")]
+    with tempfile.TemporaryDirectory() as build_dir:
+        subprocess.run(["uv", "pip", "install", "--no-deps", "--target", build_dir, *requirements], check=True)
+        shutil.copytree("src/pyprojectx", Path(build_dir, "pyprojectx"), ignore=shutil.ignore_patterns("__pycache__"))
+        zipapp.create_archive(
+            build_dir, f"pyprojectx-{release_version}.pyz", main="pyprojectx.cli:main", compressed=True
+        )
+    # pw verifies the downloaded zipapp with this checksum
+    pyz = Path(f"pyprojectx-{release_version}.pyz")
+    Path(f"{pyz}.sha256").write_text(f"{hashlib.sha256(pyz.read_bytes()).hexdigest()}  {pyz.name}\n")
+
+
 def generate_release_changelog():
     # extract the first change log from CHANGELOG.md
     with Path("CHANGELOG.md").open() as changelog, Path(".release-changelog.md").open("w") as out:
@@ -0,0 +1,199 @@
+"""In-process Python API to resolve and run the aliases, scripts and tool context commands of a project.
+
+Tools that run many commands (IDEs, test harnesses, task runners) can use a single Project instance instead of
+starting pyprojectx for every command. The config and the lock data are loaded once and are only reloaded when
+the toml file, the lock file or the scripts dir change.
+
+Example::
+
+    from pyprojectx.api import Project
+
+    project = Project("path/to/project")
+    print(project.plan("test"))
+    result = project.run("test", ["-k", "api"], capture_output=True)
+    print(result.returncode, result.stdout)
+"""
+
+import io
+import os
+import sys
+import sysconfig
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Union
+
+from pyprojectx.env import IsolatedVirtualEnv
+from pyprojectx.graph import build_graph
+from pyprojectx.manifest import ConfigCache
+from pyprojectx.plan import PlannedCommand, dispatch, ensure_context, parse_options
+
+ALIAS = "alias"
+SCRIPT = "script"
+COMMAND = "command"
+
+
+@dataclass
+class Resolution:
+    """The result of resolving a (possibly abbreviated) name.
+
+    :param name: the full name of the alias or script, or the command itself
+    :param kind: 'alias', 'script' or 'command' (a command that runs in a tool context)
+    :param commands: the commands that run, in order
+    """
+
+    name: str
+    kind: str
+    commands: list[PlannedCommand]
+
+
+@dataclass
+class RunResult:
+    """The result of running an alias, a script or a command.
+
+    :param returncode: the exit code of the command that failed, else 0
+    :param commands: the commands of the alias, script or command, as they are planned
+    :param stdout: the combined standard output of the commands if it was captured, else None
+    :param stderr: the combined standard error of the commands if it was captured, else None
+    """
+
+    returncode: int
+    commands: list[PlannedCommand] = field(default_factory=list)
+    stdout: Optional[str] = None
+    stderr: Optional[str] = None
+
+
+class Project:
+    """A pyprojectx project, loaded once and reused for all the resolve, plan and run calls."""
+
+    def __init__(
+        self,
+        path: Union[str, Path] = ".",
+        toml_path: Optional[Union[str, Path]] = None,
+        install_path: Optional[Union[str, Path]] = None,
+        quiet: bool = True,
+    ) -> None:
+        """Construct a Project.
+
+        :param path: The project directory
+        :param toml_path: The toml config file, defaults to pyproject.toml in the project directory
+        :param install_path: The path to .pyprojectx, defaults to .pyprojectx in the project directory
+        :param quiet: Don't print installation and locking output
+        """
+        path = Path(path).absolute()
+        self.toml_path = Path(toml_path).absolute() if toml_path else path / "pyproject.toml"
+        self.install_path = Path(install_path).absolute() if install_path else path / ".pyprojectx"
+        self.quiet = quiet
+        self._config_cache = ConfigCache(self.toml_path, self.install_path)
+
+    @property
+    def config(self):
+        """The config of the project, reloaded when its files changed."""
+        return self._config_cache.get()
+
+    def resolve(self, name: str, args: tuple[str, ...] = ()) -> Resolution:
+        """Resolve a (possibly abbreviated) alias or script name, or a command in a tool context.
+
+        :param name: the name, as it would be passed to pw
+        :param args: the extra arguments, as they would be passed to pw after the name
+        :return: the resolution, with the commands that would run
+        :raise Warning: if the name is ambiguous, if there is nothing to run for it or if aliases reference each other
+            in a cycle
+        """
+        config = self.config
+        candidates = config.find_aliases_or_scripts(name)
+        if len(candidates) > 1:
+            msg = f"'{name}' is ambiguous, candidates are: {', '.join(candidates)}"
+            raise Warning(msg)
+        full_name = candidates[0] if candidates else name
+        # references to other aliases are expanded, so that each alias runs only once
+        commands = build_graph(config, full_name, list(args), self._pw_args()).commands()
+        if not commands:
+            msg = f"'{name}' is not an alias, a script or a command of a tool context"
+            raise Warning(msg)
+        if config.get_alias(full_name):
+            kind = ALIAS
+        elif config.is_script(full_name):
+            kind = SCRIPT
+        else:
+            kind = COMMAND
+        return Resolution(full_name, kind, commands)
+
+    def plan(self, name: str, args: tuple[str, ...] = ()) -> list[PlannedCommand]:
+        """Return the commands that run for an alias, a script or a command, without running or installing anything.
+
+        :param name: the name, as it would be passed to pw
+        :param args: the extra arguments, as they would be passed to pw after the name
+        """
+        return self.resolve(name, args).commands
+
+    def ensure_context(self, ctx: str) -> IsolatedVirtualEnv:
+        """Lock the requirements of a tool context and install its virtual environment if needed.
+
+        :param ctx: the name of the tool context
+        :return: the installed virtual environment
+        :raise Warning: if the tool context doesn't exist or if its installation failed
+        """
+        config = self.config
+        if not config.is_ctx(ctx):
+            msg = f"Invalid ctx: '{ctx}' is not defined in [tool.pyprojectx]"
+            raise Warning(msg)
+        return ensure_context(config, ctx, self._pw_args(), self._options())
+
+    def run(self, name: str, args: tuple[str, ...] = (), capture_output: bool = False) -> RunResult:
+        """Run an alias, a script or a command, installing its tool contexts if needed.
+
+        The run behaves like `pw <name> <args>`: up-to-date checks, the cache, python matrices and parallel steps
+        work the same way, and the first command that fails stops the run.
+        Capturing the output redirects the standard output and error of the whole process while the commands run.
+        :param name: the name, as it would be passed to pw
+        :param args: the extra arguments, as they would be passed to pw after the name
+        :param capture_output: capture the standard output and error of the commands as text
+        :return: the exit code, the commands of the alias, script or command and the captured output
+        """
+        resolution = self.resolve(name, args)
+        result = RunResult(0, resolution.commands)
+        if not capture_output:
+            result.returncode = dispatch(self.config, resolution.name, list(args), self._pw_args(), self._options())
+            return result
+        with _captured_fd(1) as stdout, _captured_fd(2) as stderr:
+            result.returncode = dispatch(self.config, resolution.name, list(args), self._pw_args(), self._options())
+        result.stdout, result.stderr = stdout.read(), stderr.read()
+        return result
+
+    def _options(self):
+        argv = ["--toml", str(self.toml_path), "--install-dir", str(self.install_path)]
+        if self.quiet:
+            argv.append("--quiet")
+        # the logging configuration belongs to the application that uses the API
+        return parse_options(argv)
+
+    def _pw_args(self) -> list[str]:
+        # references to other aliases (pw@alias) and python matrices run the pyprojectx script of this interpreter
+        script = Path(sysconfig.get_path("scripts"), "pyprojectx.exe" if os.name == "nt" else "pyprojectx")
+        return [str(script), "--toml", str(self.toml_path), "--install-dir", str(self.install_path)]
+
+
+@contextmanager
+def _captured_fd(fd: int) -> Iterator[io.StringIO]:
+    """Redirect a file descriptor, and the Python stream that writes to it, to a temporary file.
+
+    :return: a buffer that receives the captured text when the context exits
+    """
+    stream = sys.stdout if fd == 1 else sys.stderr
+    output = io.StringIO()
+    with tempfile.TemporaryFile("w+", encoding="utf-8", errors="replace") as captured:
+        stream.flush()
+        saved = os.dup(fd)
+        os.dup2(captured.fileno(), fd)
+        try:
+            yield output
+        finally:
+            stream.flush()
+            os.dup2(saved, fd)
+            os.close(saved)
+            captured.seek(0)
+            output.write(captured.read())
+            output.seek(0)
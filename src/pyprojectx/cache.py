@@ -0,0 +1,207 @@
+"""A content-addressed cache for the results of aliases, which can be shared between checkouts and CI workers.
+
+The results of an alias with `cache = true` are stored under a key that covers its input files, its input and output
+patterns, commands, arguments, environment, the platform and the locked requirements and Python versions of its tool
+contexts (see Fingerprint.cache_key): its output files (with their permissions) and its stdout and stderr. When an
+alias runs with a key that is already in the cache, the results are restored instead: the output files are written
+and the output is replayed. Only the results of successful runs are stored: a failure is not replayed, so that it
+runs again, f.e. after a flaky failure or when the cause was fixed outside of the inputs (on another machine).
+
+The cache location is set with PYPROJECTX_CACHE: a directory (f.e. on a shared volume), or a URL whose scheme
+selects a backend. It defaults to _.pyprojectx/cache_.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Callable
+
+from pyprojectx.fingerprint import Fingerprint
+from pyprojectx.log import logger
+from pyprojectx.parallel import Prepare
+from pyprojectx.plan import PlannedCommand
+
+PYPROJECTX_CACHE_ENV_VAR = "PYPROJECTX_CACHE"
+CACHE_DIR = "cache"
+RESULT_FILE = "result.json"
+FILES_DIR = "files"
+
+
+class CacheBackend(ABC):
+    """Stores cache entries: directories with the result file and the output files of an alias."""
+
+    @abstractmethod
+    def get(self, key: str, target: Path) -> bool:
+        """Copy the entry with the given key to the (non-existing) target directory.
+
+        :return: False if there is no entry with the key
+        """
+
+    @abstractmethod
+    def put(self, key: str, source: Path) -> None:
+        """Store the source directory as the entry with the given key."""
+
+
+class DirectoryBackend(CacheBackend):
+    """Stores the cache entries in a directory, f.e. on a shared volume."""
+
+    def __init__(self, path: Path) -> None:
+        """Construct a DirectoryBackend.
+
+        :param path: the root directory of the cache
+        """
+        self.path = path
+
+    def get(self, key: str, target: Path) -> bool:
+        entry = self._entry(key)
+        if not (entry / RESULT_FILE).is_file():
+            return False
+        try:
+            shutil.copytree(entry, target)
+        except OSError:
+            # f.e. removed concurrently
+            logger.debug("Could not read cache entry %s", entry, exc_info=True)
+            shutil.rmtree(target, ignore_errors=True)
+            return False
+        return True
+
+    def put(self, key: str, source: Path) -> None:
+        entry = self._entry(key)
+        if entry.exists():
+            return
+        # copy next to the entry and rename it, so that concurrent readers never see a partial entry
+        tmp_entry = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        try:
+            shutil.copytree(source, tmp_entry)
+            tmp_entry.rename(entry)
+        except OSError:
+            logger.debug("Could not write cache entry %s", entry, exc_info=True)
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    def _entry(self, key: str) -> Path:
+        return self.path / key[:2] / key
+
+
+# the backends for the URL schemes of PYPROJECTX_CACHE
+BACKENDS: dict[str, Callable[[str], CacheBackend]] = {
+    "file": lambda location: DirectoryBackend(Path(location)),
+}
+
+
+def get_backend(install_path: Path) -> CacheBackend:
+    """Return the cache backend for PYPROJECTX_CACHE, or a directory in the install dir if it isn't set.
+
+    :param install_path: the path to .pyprojectx
+    :raise Warning: if the scheme of PYPROJECTX_CACHE doesn't have a backend
+    """
+    location = os.environ.get(PYPROJECTX_CACHE_ENV_VAR)
+    if not location:
+        return DirectoryBackend(install_path / CACHE_DIR)
+    scheme, separator, path = location.partition("://")
+    if not separator:
+        return DirectoryBackend(Path(location))
+    if scheme not in BACKENDS:
+        msg = f"Unsupported {PYPROJECTX_CACHE_ENV_VAR} backend '{scheme}', use one of: {', '.join(BACKENDS)}"
+        raise Warning(msg)
+    return BACKENDS[scheme](path)
+
+
+class AliasCache:
+    """Restores or runs and stores the results of an alias."""
+
+    def __init__(self, backend: CacheBackend, fingerprint: Fingerprint) -> None:
+        """Construct an AliasCache.
+
+        :param backend: the backend that stores the results
+        :param fingerprint: the fingerprint of the alias, which provides the cache key and the output files
+        """
+        self._backend = backend
+        self._fingerprint = fingerprint
+        self._key = fingerprint.cache_key()
+
+    def restore(self) -> bool:
+        """Restore the output files and replay the output of the alias if its results are in the cache.
+
+        :return: whether the results were in the cache
+        """
+        with tempfile.TemporaryDirectory(prefix="pyprojectx-cache-") as tmp_dir:
+            entry = Path(tmp_dir) / "entry"
+            if not self._backend.get(self._key, entry):
+                logger.info("Cache miss: %s", self._key)
+                return False
+            result = json.loads((entry / RESULT_FILE).read_text(encoding="utf-8"))
+            if result.get("returncode"):
+                # stored by an older version
+                logger.info("Cache miss (failed run): %s", self._key)
+                return False
+            logger.info("Cache hit: %s", self._key)
+            for name in result["files"]:
+                target = self._fingerprint.cwd / name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(entry / FILES_DIR / name, target)
+            _write(sys.stdout, result["stdout"])
+            _write(sys.stderr, result["stderr"])
+            return True
+
+    def run(self, commands: list[PlannedCommand], prepare: Prepare) -> int:
+        """Run the commands of the alias one after the other, stop at the first failure and store the results.
+
+        The results are only stored when all commands succeed.
+
+        :return: the exit code of the first command that failed, or 0
+        """
+        stdout, stderr, returncode = bytearray(), bytearray(), 0
+        for command in commands:
+            cmd, env, shell = prepare(command)
+            logger.info("Running %s", cmd)
+            proc = subprocess.Popen(
+                cmd, env=env, cwd=command.cwd, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            # the output is captured and shown while the command runs
+            tee_stderr = threading.Thread(target=_tee, args=(proc.stderr, sys.stderr, stderr))
+            tee_stderr.start()
+            _tee(proc.stdout, sys.stdout, stdout)
+            tee_stderr.join()
+            returncode = proc.wait()
+            if returncode:
+                return returncode
+        self._store(bytes(stdout), bytes(stderr))
+        return 0
+
+    def _store(self, stdout: bytes, stderr: bytes) -> None:
+        with tempfile.TemporaryDirectory(prefix="pyprojectx-cache-") as tmp_dir:
+            entry = Path(tmp_dir) / "entry"
+            files = []
+            for path in self._fingerprint.output_files():
+                name = path.relative_to(self._fingerprint.cwd).as_posix()
+                (entry / FILES_DIR / name).parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(path, entry / FILES_DIR / name)
+                files.append(name)
+            result = {
+                "stdout": stdout.decode(errors="surrogateescape"),
+                "stderr": stderr.decode(errors="surrogateescape"),
+                "returncode": 0,
+                "files": files,
+            }
+            entry.mkdir(exist_ok=True)
+            (entry / RESULT_FILE).write_text(json.dumps(result), encoding="utf-8")
+            self._backend.put(self._key, entry)
+
+
+def _tee(source: BinaryIO, target, captured: bytearray) -> None:
+    for line in iter(source.readline, b""):
+        captured.extend(line)
+        target.buffer.write(line)
+        target.flush()
+    source.close()
+
+
+def _write(target, text: str) -> None:
+    target.buffer.write(text.encode(errors="surrogateescape"))
+    target.flush()
@@ -0,0 +1,51 @@
+"""Selects the files that changed since a git ref, which `--changed` passes to an alias instead of the whole tree."""
+
+import fnmatch
+import subprocess
+import sys
+from pathlib import Path
+
+# uncommitted changes
+DEFAULT_REF = "HEAD"
+# the maximum length of the file arguments of one command; cmd.exe limits a command line to 8191 characters
+MAX_ARGS_LENGTH = 7_000 if sys.platform.startswith("win") else 100_000
+
+
+def changed_files(ref: str, cwd: Path, patterns: list[str]) -> list[str]:
+    """Return the files in cwd that changed since a git ref, including untracked files but not deleted ones.
+
+    :param ref: the git ref to compare the working tree with, f.e. 'origin/main'
+    :param cwd: the directory to list the changed files of, relative to which the files are returned
+    :param patterns: fnmatch patterns to filter the files with ('*' also matches '/'), or an empty list for all files
+    :raise Warning: if git is not available or fails, f.e. for an unknown ref
+    """
+    diff = _git(["diff", "--name-only", "--relative", "--diff-filter=d", "-z", ref, "--"], cwd)
+    untracked = _git(["ls-files", "--others", "--exclude-standard", "-z"], cwd)
+    files = dict.fromkeys(file for file in [*diff.split("\0"), *untracked.split("\0")] if file)
+    return [file for file in files if not patterns or any(fnmatch.fnmatchcase(file, p) for p in patterns)]
+
+
+def batches(files: list[str], max_length: int = MAX_ARGS_LENGTH) -> list[list[str]]:
+    """Split the files into batches that stay under the maximum length of a command line."""
+    result = [[]]
+    length = 0
+    for file in files:
+        # quotes and a space per file
+        file_length = len(file) + 3
+        if result[-1] and length + file_length > max_length:
+            result.append([])
+            length = 0
+        result[-1].append(file)
+        length += file_length
+    return result if files else []
+
+
+def _git(args: list[str], cwd: Path) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=True).stdout
+    except FileNotFoundError as e:
+        msg = "--changed needs git, but git is not installed"
+        raise Warning(msg) from e
+    except subprocess.CalledProcessError as e:
+        msg = f"Could not list the changed files with git {' '.join(args)}: {e.stderr.strip()}"
+        raise Warning(msg) from e
@@ -1,22 +1,36 @@
 import os
-import re
+import shlex
 import shutil
 import subprocess
 import sys
 from logging import INFO
 from pathlib import Path
-from typing import Union
-
-from pyprojectx.config import AliasCommand, Config
-from pyprojectx.env import IsolatedVirtualEnv
-from pyprojectx.install_global import install_px
-from pyprojectx.lock import can_lock, get_or_update_locked_requirements
+from typing import Callable, Union
+
+from pyprojectx import shims
+from pyprojectx.completion import completion_script
+from pyprojectx.config import AliasCommand
+from pyprojectx.env import IsolatedVirtualEnv, run_or_exec
+from pyprojectx.lock import (
+    can_lock,
+    get_lock_state,
+    get_locked_requirements,
+    get_or_update_locked_requirements,
+    reset_lock,
+)
 from pyprojectx.log import logger, set_verbosity
-from pyprojectx.requirements import add_requirement
+from pyprojectx.manifest import load_config
+from pyprojectx.plan import (
+    PlannedCommand,
+    alias_full_cmd,
+    parse_options,
+    python_version,
+    resolve_references,
+    starts_pyprojectx,
+)
+from pyprojectx.state import ResolvedState
 from pyprojectx.wrapper import pw
 
-alias_regex = re.compile(r"(pw)?@([\w-]+)")
-
 
 def main() -> None:
     try:
@@ -26,16 +40,37 @@ def main() -> None:
         raise
 
 
-# ruff: noqa: PLR0911 C901
+# ruff: noqa: PLR0911 PLR0912 C901
 def _run(argv: list[str]) -> None:
     options = _get_options(argv[1:])
+    # commands that are not on the hot path import their (heavier) dependencies lazily
     if options.install_px:
+        from pyprojectx.install_global import install_px  # noqa: PLC0415
+
         install_px(options)
         return
 
-    config = Config(options.toml_path)
+    if options.completion:
+        print(completion_script(options.completion), end="")
+        return
+
+    if options.server:
+        from pyprojectx.server import serve  # noqa: PLC0415
+
+        serve(options)
+        return
+    if os.environ.get(pw.PYPROJECTX_SERVER_ENV_VAR):
+        from pyprojectx.server import start_server  # noqa: PLC0415
+
+        start_server(options)
+
+    config = load_config(options.toml_path, options.install_path)
+    # nested pyprojectx processes (alias references) reuse the tool contexts that were verified by their parent
+    options.state = ResolvedState.inherit(config, options.install_path)
 
     if options.add:
+        from pyprojectx.requirements import add_requirement  # noqa: PLC0415
+
         add_requirement(options.add, options.toml_path, options.venvs_dir, options.quiet, config.prerelease)
         return
 
@@ -43,6 +78,10 @@ def _run(argv: list[str]) -> None:
         _install_ctx(options, config, argv)
         return
 
+    if options.env:
+        _print_env(options, config, argv)
+        return
+
     if options.lock:
         _lock_requirements(argv, config, options)
         return
@@ -63,6 +102,30 @@ def _run(argv: list[str]) -> None:
 
     cmd_index = argv.index(cmd)
     pw_args = argv[:cmd_index]
+    if options.plan:
+        _print_plan(config, cmd, pw_args, options)
+        return
+
+    if options.all:
+        _run_workspace(config, cmd, pw_args, options)
+        return
+
+    if options.watch:
+        _watch(config, cmd, pw_args, options)
+        return
+
+    if options.changed:
+        _run_changed(config, cmd, pw_args, options)
+        return
+
+    run_command(config, cmd, pw_args, options)
+
+
+def run_command(config, cmd, pw_args, options) -> None:
+    """Run an alias, a script or a tool context command, like `pw <cmd>` does.
+
+    :raise SystemExit: with the exit code of the command that failed, or 1 if there is nothing to run for cmd
+    """
     if _run_alias_cmds(config, cmd, pw_args, options):
         return
 
@@ -77,26 +140,293 @@ def _run(argv: list[str]) -> None:
     raise SystemExit(1)
 
 
+def _run_workspace(config, cmd, pw_args, options) -> None:
+    from copy import copy  # noqa: PLC0415
+
+    from pyprojectx.fanout import print_summary, pyprojectx_command, run_processes  # noqa: PLC0415
+    from pyprojectx.graph import build_graph  # noqa: PLC0415
+    from pyprojectx.jobserver import jobs, jobserver  # noqa: PLC0415
+    from pyprojectx.workspace import find_members, member_name  # noqa: PLC0415
+
+    flags = ["--quiet"] if options.quiet else [f"-{'v' * options.verbosity}"] if options.verbosity else []
+    # the members don't verify the state of this project
+    member_options = copy(options)
+    member_options.state = None
+    commands = {}
+    for toml in find_members(config):
+        member_config = load_config(toml, options.install_path)
+        member_args = ["--install-dir", str(options.install_path.absolute()), "--toml", str(toml), *flags]
+        # references to other aliases and post-install commands resolve against the toml file of the member
+        member_pw_args = [pw_args[0], *member_args]
+        candidates = member_config.find_aliases_or_scripts(cmd)
+        graph = build_graph(
+            member_config, candidates[0] if len(candidates) == 1 else cmd, options.cmd_args, member_pw_args
+        )
+        if not graph.commands():
+            logger.info("Skipping workspace member %s: it has no alias or command %s", toml, cmd)
+            commands[member_name(config, toml)] = None
+            continue
+        # install the tool contexts before the members run in parallel, so that members with the same requirements
+        # don't install the same virtual environment at the same time
+        for ctx in graph.contexts():
+            ensure_ctx(member_config, ctx, {}, member_options, member_pw_args)
+        commands[member_name(config, toml)] = [*pyprojectx_command(pw_args[0]), *member_args, cmd, *options.cmd_args]
+    max_jobs = jobs(os.cpu_count() or 1)
+    with jobserver(max_jobs) as server:
+        results = run_processes(commands, max_jobs, server)
+    print_summary(results, "member")
+    returncodes = [result.returncode for result in results if result.returncode]
+    if returncodes:
+        raise SystemExit(returncodes[0])
+
+
+def _watch(config, cmd, pw_args, options) -> None:
+    from pyprojectx.graph import build_graph  # noqa: PLC0415
+    from pyprojectx.manifest import ConfigCache  # noqa: PLC0415
+    from pyprojectx.parallel import ParallelRunner  # noqa: PLC0415
+    from pyprojectx.watch import create_watcher, watch  # noqa: PLC0415
+
+    candidates = config.find_aliases_or_scripts(cmd)
+    verify_ambiguity(candidates, cmd)
+    name = candidates[0] if candidates else cmd
+    if not build_graph(config, name, options.cmd_args, pw_args).commands():
+        config.show_info(cmd, error=True)
+        raise SystemExit(1)
+    alias_cmds = config.get_alias(name)
+    patterns = (alias_cmds[0].watch or alias_cmds[0].inputs) if alias_cmds else []
+    # the files that the alias writes itself would start it again and again
+    outputs = [output for alias_cmd in alias_cmds for output in alias_cmd.outputs]
+    root = Path(alias_cmds[0].cwd if alias_cmds else config.get_cwd())
+    config_cache = ConfigCache(options.toml_path, options.install_path)
+    planned = {"config": config}
+
+    def plan():
+        # the config and the verified tool contexts are only loaded and verified again if the config files changed
+        current = config_cache.get()
+        if current is not planned["config"]:
+            planned["config"] = current
+            options.state = ResolvedState.inherit(current, options.install_path)
+        graph = build_graph(current, name, options.cmd_args, pw_args)
+        venvs = _resolve_contexts(current, graph.contexts(), options, pw_args)
+        return ParallelRunner(_preparer(venvs, options)), graph
+
+    logger.info("Watching %s in %s", ", ".join(patterns) or "all files", root)
+    watch(plan, create_watcher(root, patterns, outputs), name)
+
+
+def _run_changed(config, cmd, pw_args, options) -> None:
+    from pyprojectx.changed import batches, changed_files  # noqa: PLC0415
+
+    candidates = config.find_aliases_or_scripts(cmd)
+    verify_ambiguity(candidates, cmd)
+    alias_cmds = config.get_alias(candidates[0]) if candidates else []
+    patterns = alias_cmds[0].files if alias_cmds else []
+    cwd = alias_cmds[0].cwd if alias_cmds else config.get_cwd()
+    files = changed_files(options.changed, Path(cwd), patterns)
+    if not files:
+        print(
+            f"{pw.CYAN}{cmd} {pw.BLUE}is skipped: no files changed since {options.changed}{pw.RESET}", file=sys.stderr
+        )
+        return
+    file_batches = batches(files)
+    logger.info("Running %s with %s changed files in %s batches", cmd, len(files), len(file_batches))
+    cmd_args = options.cmd_args
+    for index, batch in enumerate(file_batches):
+        options.cmd_args = [*cmd_args, *batch]
+        # only the last batch can replace the pyprojectx process: nothing needs to run after it
+        options.replace_process = index == len(file_batches) - 1
+        run_command(config, cmd, pw_args, options)
+
+
 def _run_alias_cmds(config, cmd, pw_args, options) -> bool:
     candidates = config.find_aliases_or_scripts(cmd)
     logger.debug("Matching aliases/scripts for %s: %s", cmd, ", ".join(candidates))
     if candidates:
         verify_ambiguity(candidates, cmd)
         alias_cmds = config.get_alias(candidates[0])
-        if alias_cmds:
+        fingerprint = _fingerprint(config, candidates[0], alias_cmds, options)
+        if fingerprint and fingerprint.up_to_date():
+            print(f"{pw.CYAN}{candidates[0]} {pw.BLUE}is up-to-date{pw.RESET}", file=sys.stderr)
+            return True
+        if alias_cmds and alias_cmds[0].python and not options.python:
+            _run_matrix(config, candidates[0], alias_cmds[0].python, pw_args, options)
+        elif alias_cmds and alias_cmds[0].cache:
+            _run_cached(config, candidates[0], fingerprint, pw_args, options)
+        elif alias_cmds and (alias_cmds[0].parallel or _has_references(config, candidates[0])):
+            from pyprojectx.graph import build_graph  # noqa: PLC0415
+
+            graph = build_graph(config, candidates[0], options.cmd_args, pw_args)
+            _run_graph(graph, pw_args, options, config, replace_process=options.replace_process and not fingerprint)
+        elif alias_cmds:
+            # only a single command can replace the pyprojectx process: nothing needs to run after it,
+            # except storing the fingerprint
+            replace_process = options.replace_process and len(alias_cmds) == 1 and not fingerprint
             for alias_cmd in alias_cmds:
                 _run_alias(
                     alias_cmd,
                     pw_args,
                     options=options,
                     config=config,
+                    replace_process=replace_process,
                 )
         else:
             _run_script(candidates[0], pw_args, options, config)
+        if fingerprint:
+            fingerprint.save()
         return True
     return False
 
 
+def _run_matrix(config, alias, versions, pw_args, options) -> None:
+    from pyprojectx.fanout import print_summary, pyprojectx_command, run_processes  # noqa: PLC0415
+    from pyprojectx.graph import build_graph  # noqa: PLC0415
+    from pyprojectx.jobserver import jobs, jobserver  # noqa: PLC0415
+
+    # lock the tool contexts before the versions install them concurrently
+    with get_lock_state(config).batch():
+        for ctx in build_graph(config, alias, options.cmd_args, pw_args).contexts():
+            get_or_update_locked_requirements(ctx, config, options.quiet)
+    # every version runs the alias in its own pyprojectx process, which installs the venvs of that version;
+    # the files of --changed are already in the arguments
+    args = [arg for arg in pw_args[1:] if not arg.startswith("--changed")]
+    commands = {
+        f"py{version}": [*pyprojectx_command(pw_args[0]), *args, "--python", version, alias, *options.cmd_args]
+        for version in versions
+    }
+    max_jobs = jobs(len(versions))
+    with jobserver(max_jobs) as server:
+        results = run_processes(commands, max_jobs, server)
+    print_summary(results, "python")
+    returncodes = [result.returncode for result in results if result.returncode]
+    if returncodes:
+        raise SystemExit(returncodes[0])
+
+
+def _fingerprint(config, alias, alias_cmds, options):
+    if not any(alias_cmd.fingerprinted for alias_cmd in alias_cmds):
+        return None
+    if options.python and alias_cmds[0].python:
+        # the pyprojectx process that runs the whole python matrix checks and stores the fingerprint
+        return None
+    from pyprojectx.fingerprint import Fingerprint  # noqa: PLC0415
+
+    return Fingerprint(config, alias, alias_cmds, options.cmd_args, options.install_path, options.python)
+
+
+def _run_cached(config, alias, fingerprint, pw_args, options) -> None:
+    from pyprojectx.cache import AliasCache, get_backend  # noqa: PLC0415
+    from pyprojectx.graph import build_graph  # noqa: PLC0415
+
+    alias_cache = AliasCache(get_backend(options.install_path), fingerprint)
+    if alias_cache.restore():
+        print(f"{pw.CYAN}{alias} {pw.BLUE}was restored from the cache{pw.RESET}", file=sys.stderr)
+        return
+    commands = build_graph(config, alias, options.cmd_args, pw_args).commands()
+    venvs = _resolve_contexts(config, {command.ctx for command in commands if command.ctx}, options, pw_args)
+    returncode = alias_cache.run(commands, _preparer(venvs, options))
+    if returncode:
+        raise SystemExit(returncode)
+
+
+def _has_references(config, alias) -> bool:
+    # cheap check before importing the graph module: references start with @ or pw@
+    if not any("@" in alias_cmd.cmd for alias_cmd in config.get_alias(alias)):
+        return False
+    from pyprojectx.graph import has_references  # noqa: PLC0415
+
+    return has_references(config, alias)
+
+
+def _run_graph(graph, pw_args, options, config, replace_process=True) -> None:
+    if graph.has_parallel_steps():
+        from pyprojectx.jobserver import jobserver  # noqa: PLC0415
+        from pyprojectx.parallel import ParallelRunner  # noqa: PLC0415
+
+        venvs = _resolve_contexts(config, graph.contexts(), options, pw_args)
+        with jobserver(graph.max_parallel()) as js:
+            returncode = ParallelRunner(_preparer(venvs, options), js).run(graph)
+        if returncode:
+            raise SystemExit(returncode)
+        return
+    commands = graph.commands()
+    logger.debug("Running the alias graph of %s: %s", graph.name, commands)
+    for index, command in enumerate(commands):
+        # only the last command can replace the pyprojectx process: nothing needs to run after it
+        replace_last = replace_process and index == len(commands) - 1
+        if command.ctx:
+            _run_in_ctx(
+                command.ctx,
+                command.cmd,
+                options=options,
+                pw_args=pw_args,
+                config=config,
+                env=command.env,
+                cwd=command.cwd,
+                replace_process=replace_last,
+                nested=command.nested,
+            )
+        else:
+            _run_without_venv(
+                command.cmd, {**command.env, **_state_env(options, command.nested)}, command.cwd, replace_last
+            )
+
+
+def _resolve_contexts(config, contexts, options, pw_args) -> dict:
+    """Lock and install the tool contexts one by one, before their commands run concurrently.
+
+    :return: the virtual environments by tool context
+    """
+    return {ctx: ensure_ctx(config, ctx, {}, options, pw_args) for ctx in sorted(contexts)}
+
+
+def _preparer(venvs: dict, options) -> Callable[[PlannedCommand], tuple[Union[str, list[str]], dict, bool]]:
+    """Return a function that composes the command, the environment and whether to use a shell for a command.
+
+    The environment and the resolved state are taken now, on the main thread: the function only reads them, so that
+    it can run in the threads of a ParallelRunner.
+    :param venvs: the virtual environments of the tool contexts of the commands, see _resolve_contexts
+    """
+    environ = dict(os.environ)
+    state_env = options.state.env() if options.state else {}
+
+    def prepare(command):
+        env = {**command.env, **state_env} if command.nested else command.env
+        if not command.ctx:
+            # same as _run_without_venv
+            return command.cmd, {**environ, **env}, True
+        cmd = list(command.cmd) if isinstance(command.cmd, list) else command.cmd
+        return venvs[command.ctx].prepare(cmd, env, environ)
+
+    return prepare
+
+
+def _print_plan(config, cmd, pw_args, options) -> None:
+    from pyprojectx.graph import build_graph  # noqa: PLC0415
+
+    candidates = config.find_aliases_or_scripts(cmd)
+    verify_ambiguity(candidates, cmd)
+    graph = build_graph(config, candidates[0] if candidates else cmd, options.cmd_args, pw_args)
+    if not graph.commands():
+        config.show_info(cmd, error=True)
+        raise SystemExit(1)
+    print("\n".join(graph.format()))
+    if graph.contexts():
+        print(f"{pw.BLUE}tool contexts:{pw.RESET}", file=sys.stderr)
+    for ctx in graph.contexts():
+        requirements = get_locked_requirements(ctx, config)
+        venv = (
+            IsolatedVirtualEnv(options.venvs_dir, ctx, requirements, python=python_version(config, ctx, options))
+            if requirements is not None
+            else None
+        )
+        if venv and venv.is_installed:
+            print(f"{ctx} {pw.BLUE}(installed){pw.RESET}")
+        elif venv:
+            print(f"{ctx} {pw.BLUE}(needs to be installed){pw.RESET}")
+        else:
+            print(f"{ctx} {pw.BLUE}(needs to be locked and installed){pw.RESET}")
+
+
 def _run_cmd_in_ctx(config, cmd, pw_args, options) -> bool:
     ctx = config.get_ctx_or_main(cmd)
     if ctx:
@@ -108,6 +438,7 @@ def _run_cmd_in_ctx(config, cmd, pw_args, options) -> bool:
             config=config,
             env=config.env,
             cwd=config.get_cwd(),
+            replace_process=options.replace_process,
         )
         return True
     return False
@@ -127,16 +458,12 @@ def verify_ambiguity(candidates, cmd):
         raise SystemExit(1)
 
 
-def _run_alias(alias_cmd: AliasCommand, pw_args: list[str], options, config) -> None:
+def _run_alias(alias_cmd: AliasCommand, pw_args: list[str], options, config, replace_process=False) -> None:
     logger.debug(
         "Running alias command, ctx: %s, command: %s, arguments: %s", alias_cmd.ctx, alias_cmd, options.cmd_args
     )
-    quoted_args = [f'"{a}"' for a in options.cmd_args]
-    full_cmd = " ".join([_resolve_references(alias_cmd.cmd, pw_args, config), *quoted_args])
-    if alias_cmd.shell:
-        full_cmd = [alias_cmd.shell, "-c", full_cmd]
-
-    alias_env = {**config.env, **alias_cmd.env}
+    full_cmd, alias_env = alias_full_cmd(alias_cmd, pw_args, options.cmd_args, config)
+    nested = starts_pyprojectx(alias_cmd.cmd, config)
     if alias_cmd.ctx:
         _run_in_ctx(
             alias_cmd.ctx,
@@ -146,24 +473,25 @@ def _run_alias(alias_cmd: AliasCommand, pw_args: list[str], options, config) ->
             config=config,
             env=alias_env,
             cwd=alias_cmd.cwd,
+            replace_process=replace_process,
+            nested=nested,
         )
     else:
-        try:
-            logger.debug(
-                "Running command without venv, full command: %s, in %s, with shell %s",
-                full_cmd,
-                alias_cmd.cwd,
-                alias_cmd.shell,
-            )
-            subprocess.run(full_cmd, shell=True, check=True, env={**os.environ, **alias_env}, cwd=alias_cmd.cwd)
-        except subprocess.CalledProcessError as e:
-            raise SystemExit(e.returncode) from e
+        logger.debug(
+            "Running command without venv, full command: %s, in %s, with shell %s",
+            full_cmd,
+            alias_cmd.cwd,
+            alias_cmd.shell,
+        )
+        _run_without_venv(full_cmd, {**alias_env, **_state_env(options, nested)}, alias_cmd.cwd, replace_process)
 
 
 def _run_script(script: str, pw_args: list[str], options, config) -> None:
     file = config.get_script_path(script)
     logger.debug("Running script: %s, arguments: %s", file, options.cmd_args)
     full_cmd = ["python", file, *options.cmd_args]
+    if config.scripts_context and _run_in_forkserver(full_cmd, pw_args, options, config):
+        return
     if config.scripts_context:
         _run_in_ctx(
             config.scripts_context,
@@ -173,83 +501,118 @@ def _run_script(script: str, pw_args: list[str], options, config) -> None:
             config=config,
             env=config.env,
             cwd=config.cwd,
+            replace_process=options.replace_process,
         )
     else:
-        try:
-            logger.debug("Running script without venv, full command: %s, in %s", full_cmd, config.cwd)
-            subprocess.run(full_cmd, shell=True, check=True, env={**os.environ, **config.env}, cwd=config.cwd)
-        except subprocess.CalledProcessError as e:
-            raise SystemExit(e.returncode) from e
+        logger.debug("Running script without venv, full command: %s, in %s", full_cmd, config.cwd)
+        _run_without_venv(full_cmd, config.env, config.cwd, replace_process=options.replace_process)
+
+
+def _run_in_forkserver(full_cmd: list[str], pw_args: list[str], options, config) -> bool:
+    ctx = config.scripts_context
+    modules = config.get_preload_modules(ctx)
+    # the forkserver forks and passes file descriptors over a Unix socket
+    if not modules or os.name != "posix":
+        return False
+    from pyprojectx import forkserver  # noqa: PLC0415
+
+    venv = ensure_ctx(config, ctx, config.env, options, pw_args)
+    socket_path = forkserver.socket_path(options.install_path, ctx, venv.path, modules)
+    if not socket_path:
+        return False
+    cmd, env, _ = venv.prepare(list(full_cmd), config.env)
+    argv = [str(arg) for arg in cmd[1:]]
+    returncode = forkserver.run(socket_path, argv, config.cwd, env)
+    if returncode is None:
+        forkserver.stop_stale(socket_path, ctx)
+        idle_timeout = float(os.environ.get(pw.PYPROJECTX_SERVER_IDLE_TIMEOUT_ENV_VAR, forkserver.DEFAULT_IDLE_TIMEOUT))
+        forkserver.start(cmd[0], socket_path, modules, config.scripts_path, env, idle_timeout)
+        returncode = forkserver.run(socket_path, argv, config.cwd, env, wait=forkserver.STARTUP_TIMEOUT)
+    if returncode is None:
+        logger.info("The forkserver of %s is not available, running %s in a new interpreter", ctx, argv[0])
+        return False
+    if returncode:
+        raise SystemExit(returncode)
+    return True
+
+
+def _run_without_venv(full_cmd: Union[str, list[str]], env, cwd, replace_process) -> None:
+    try:
+        run_or_exec(full_cmd, env={**os.environ, **env}, cwd=cwd, shell=True, replace_process=replace_process)
+    except subprocess.CalledProcessError as e:
+        raise SystemExit(e.returncode) from e
 
 
 # ruff: noqa: PLR0913
-def _run_in_ctx(ctx: str, full_cmd: Union[str, list[str]], options, pw_args, config, env, cwd) -> None:
+def _run_in_ctx(
+    ctx: str, full_cmd: Union[str, list[str]], options, pw_args, config, env, cwd, replace_process=False, nested=False
+) -> None:
     logger.debug("Running command in virtual environment, ctx: %s, full command: %s", ctx, full_cmd)
-    venv = _ensure_ctx(config, ctx, env, options, pw_args)
+    venv = ensure_ctx(config, ctx, env, options, pw_args)
     try:
-        venv.run(full_cmd, env, cwd)
+        venv.run(full_cmd, {**env, **_state_env(options, nested)}, cwd, replace_process=replace_process)
     except subprocess.CalledProcessError as e:
         raise SystemExit(e.returncode) from e
 
 
-def _ensure_ctx(config, ctx, env, options, pw_args):
+def ensure_ctx(config, ctx, env, options, pw_args) -> IsolatedVirtualEnv:
+    """Lock the requirements of a tool context and install its virtual environment if needed.
+
+    :raise SystemExit: if the installation failed
+    """
+    # the venvs of other Python versions (--python) are verified separately
+    state_key = f"{ctx}@py{options.python}" if options.python else ctx
+    verified_path = options.state.venv_path(state_key) if options.state else None
+    if verified_path and not options.force_install and Path(verified_path).is_dir():
+        logger.debug("Using the verified virtual environment of %s: %s", ctx, verified_path)
+        return IsolatedVirtualEnv(options.venvs_dir, ctx, {"dir": verified_path}, prerelease=config.prerelease)
     requirements, modified = get_or_update_locked_requirements(ctx, config, options.quiet)
-    venv = IsolatedVirtualEnv(options.venvs_dir, ctx, requirements, prerelease=config.prerelease)
+    venv = IsolatedVirtualEnv(
+        options.venvs_dir, ctx, requirements, prerelease=config.prerelease, python=python_version(config, ctx, options)
+    )
     if not venv.is_installed or options.force_install or modified:
         try:
-            venv.install(quiet=options.quiet, install_path=options.install_path)
+            # only the venv of the default Python version is linked in the install dir
+            venv.install(quiet=options.quiet, install_path=None if options.python else options.install_path)
             if requirements.get("post-install"):
-                post_install_cmd = _resolve_references(requirements["post-install"], pw_args, config=config)
-                venv.run(post_install_cmd, env, config.get_cwd())
+                post_install_cmd = resolve_references(requirements["post-install"], pw_args, config=config)
+                nested = starts_pyprojectx(requirements["post-install"], config)
+                venv.run(post_install_cmd, {**env, **_state_env(options, nested)}, config.get_cwd())
         except subprocess.CalledProcessError as e:
             print(
                 f"{pw.RED}PYPROJECTX ERROR: installation of '{ctx}' failed with exit code {e.returncode}{pw.RESET}",
                 file=sys.stderr,
             )
             raise SystemExit(e.returncode) from e
+    if os.name == "posix" and not options.python and config.is_default_layout(options.install_path):
+        _refresh_shims(config, venv, options, pw_args)
+    if options.state:
+        options.state.add_venv(state_key, venv.path)
     return venv
 
 
-def _resolve_references(alias_cmd: str, pw_args: list[str], config) -> str:
-    """Resolve all @alias and pw@ references."""
-    alias_refs = alias_regex.findall(alias_cmd)
-    for optional_pw, alias in alias_refs:
-        if config.is_alias(alias) or config.get_script_path(alias).exists():
-            alias_cmd = alias_cmd.replace(f"{optional_pw}@{alias}", f"pw@{alias}")
-    is_path = True
-    skip = False
-    absolute_pw_args = []
-    for arg in pw_args:
-        if arg in ["-t", "--toml", "-i", "--install-dir"]:
-            is_path = True
-            absolute_pw_args.append(arg)
-        elif arg == "--install-context":
-            skip = True
-        elif is_path:
-            absolute_pw_args.append(str(Path(arg).absolute()))
-            is_path = False
-        elif skip:
-            skip = False
-        else:
-            absolute_pw_args.append(arg)
-    replacement = " ".join([_quote(arg) for arg in absolute_pw_args]) + " "
-    return alias_cmd.replace("pw@", replacement)
+def _refresh_shims(config, venv, options, pw_args) -> None:
+    scripts_path = venv.scripts_path.absolute()
+    watched = [config.lock_file, config.toml_path.absolute()]
+    if shims.is_up_to_date(options.install_path, venv.name, scripts_path, watched):
+        return
+    from pyprojectx.fanout import pyprojectx_command  # noqa: PLC0415
 
+    # stale shims install the context with the wrapper script of the project, which survives pyprojectx upgrades
+    pw_script = Path(config.project_dir, "pw")
+    fallback = [str(pw_script)] if pw_script.is_file() else pyprojectx_command(pw_args[0])
+    fallback += ["--toml", str(config.toml_path.absolute()), "--install-dir", str(options.install_path.absolute())]
+    venv.link_scripts(options.install_path)
+    shims.write_shims(options.install_path, venv.name, scripts_path, fallback, watched)
 
-def _quote(arg):
-    if " " in arg:
-        return f'"{arg}"'
-    return arg
+
+def _state_env(options, nested: bool) -> dict[str, str]:
+    # only nested pyprojectx processes receive the resolved state, not the tools
+    return options.state.env() if nested and options.state else {}
 
 
 def _get_options(args):
-    options = pw.get_options(args)
-    if options.command:
-        options.cmd, *options.cmd_args = options.command
-    else:
-        options.cmd = None
-        options.cmd_args = []
-    options.venvs_dir = options.install_path / "venvs"
+    options = parse_options(args)
     set_verbosity(options.verbosity)
     logger.debug("Parsed cli arguments: %s", options)
     return options
@@ -259,7 +622,7 @@ def _install_ctx(options, config, pw_args):
     ctx = options.install_context
     if not config.is_ctx(ctx):
         raise Warning(f"Invalid ctx: '{options.install_context}' is not defined in [tool.pyprojectx]")
-    _ensure_ctx(
+    ensure_ctx(
         config,
         ctx,
         options=options,
@@ -268,32 +631,62 @@ def _install_ctx(options, config, pw_args):
     )
 
 
+def _print_env(options, config, pw_args):
+    """Print the shell commands that put the tool contexts on the PATH, f.e. for `eval "$(./pw --env main)"`."""
+    scripts_paths = []
+    for ctx in options.env.split(","):
+        if not config.is_ctx(ctx):
+            raise Warning(f"Invalid ctx: '{ctx}' is not defined in [tool.pyprojectx]")
+        venv = ensure_ctx(config, ctx, env={}, options=options, pw_args=pw_args)
+        scripts_paths.append(str(venv.scripts_path.absolute()))
+    print(f'export PATH={shlex.quote(os.pathsep.join(scripts_paths))}"{os.pathsep}$PATH"')
+
+
 def _lock_requirements(argv, config, options):
-    config.lock_file.unlink(missing_ok=True)
-    config.lock_file.touch()
+    reset_lock(config)
     argv.remove("--lock")
-    for ctx in config.get_context_names():
-        if can_lock(config.get_requirements(ctx)):
-            if options.force_install:
-                IsolatedVirtualEnv(options.venvs_dir, ctx, config.get_requirements(ctx)).remove()
-            _ensure_ctx(config, ctx, env=config.env, options=options, pw_args=argv)
+    with get_lock_state(config).batch():
+        for ctx in config.get_context_names():
+            if can_lock(config.get_requirements(ctx)):
+                if options.force_install:
+                    python = python_version(config, ctx, options)
+                    IsolatedVirtualEnv(options.venvs_dir, ctx, config.get_requirements(ctx), python=python).remove()
+                ensure_ctx(config, ctx, env=config.env, options=options, pw_args=argv)
 
 
 def _clean_venvs(config, options):
     pyprojectx_dir = options.install_path / "pyprojectx"
     pyprojectx_venv_dir = pyprojectx_dir / f"{options.version}-py{sys.version_info.major}.{sys.version_info.minor}"
 
+    pyprojectx_zipapp = pyprojectx_dir / f"pyprojectx-{options.version}.pyz"
+
     for f in pyprojectx_dir.glob("*"):
-        if f.is_dir() and f.resolve() != pyprojectx_venv_dir.resolve():
+        if f.suffix == ".pyz" and f != pyprojectx_zipapp:
+            if not options.quiet:
+                print(f"{pw.CYAN}Removing {pw.BLUE}{f.resolve()}{pw.RESET}", file=sys.stderr)
+            f.unlink()
+        elif f.is_symlink() and f != pyprojectx_venv_dir:
+            # only remove the link to a venv in the shared bootstrap store: other projects may still use it
+            if not options.quiet:
+                print(f"{pw.CYAN}Removing {pw.BLUE}{f}{pw.RESET}", file=sys.stderr)
+            f.unlink()
+        elif f.is_dir() and f.resolve() != pyprojectx_venv_dir.resolve():
             if not options.quiet:
                 print(f"{pw.CYAN}Removing {pw.BLUE}{f.resolve()}{pw.RESET}", file=sys.stderr)
             shutil.rmtree(f, ignore_errors=True)
 
+    # the venvs of the Python versions of alias matrices are kept as well
+    versions = {ctx: {config.get_python_version(ctx)} for ctx in config.get_context_names()}
+    for alias in config.get_alias_names():
+        for alias_cmd in config.get_alias(alias):
+            versions.get(alias_cmd.ctx, set()).update(alias_cmd.python)
     ctxt_venvs = []
-    for ctx in config.get_context_names():
-        requirements, _ = get_or_update_locked_requirements(ctx, config, options.quiet)
-        venv = IsolatedVirtualEnv(options.venvs_dir, ctx, requirements)
-        ctxt_venvs.append(venv.path.resolve())
+    with get_lock_state(config).batch():
+        for ctx in config.get_context_names():
+            requirements, _ = get_or_update_locked_requirements(ctx, config, options.quiet)
+            for python in versions[ctx]:
+                venv = IsolatedVirtualEnv(options.venvs_dir, ctx, requirements, python=python)
+                ctxt_venvs.append(venv.path.resolve())
     for f in options.venvs_dir.glob("*"):
         if f.is_dir() and f.resolve() not in ctxt_venvs:
             if not options.quiet:
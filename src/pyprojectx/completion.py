@@ -0,0 +1,160 @@
+"""Shell completion of the aliases, scripts and tool contexts of a project, without starting Python on TAB.
+
+Each time pyprojectx parses the config of a project, it writes the names of its aliases, scripts and tool contexts
+to an index in the install dir. The completion scripts for bash, zsh and fish (`--completion SHELL`) look for the
+project like `px` does (the nearest directory with a `pw` script) and match the word to complete against the index
+with awk, including camel case abbreviations like pyprojectx itself (`tA` completes to `test-all`). Only when the
+index is missing or older than _pyproject.toml_ they run `pw --info` to refresh it.
+
+The index is only written for the default locations (_pyproject.toml_ and _.pyprojectx_ in the same directory),
+because the completion scripts don't know about `--toml` and `--install-dir`.
+"""
+
+import os
+from pathlib import Path
+
+from pyprojectx.log import logger
+from pyprojectx.wrapper.pw import DEFAULT_INSTALL_DIR, PYPROJECT_TOML
+
+INDEX_FILE = "commands.txt"
+
+# the camel case matching of config.camel_match
+_AWK_MATCH = r"""
+function camel_parts(key, parts,    camel, i, c, n, cur) {
+    if (length(key) < 2) {
+        parts[1] = key
+        return length(key)
+    }
+    camel = ""
+    for (i = 1; i <= length(key); i++) {
+        c = substr(key, i, 1)
+        if (c == "-" && substr(key, i + 1, 1) ~ /[A-Za-z0-9_]/) {
+            camel = camel toupper(substr(key, ++i, 1))
+        } else {
+            camel = camel c
+        }
+    }
+    camel = tolower(substr(camel, 1, 1)) substr(camel, 2)
+    n = 0
+    cur = ""
+    for (i = 1; i <= length(camel); i++) {
+        c = substr(camel, i, 1)
+        if (c ~ /[A-Z]/ && cur != "") {
+            parts[++n] = cur
+            cur = ""
+        }
+        cur = cur c
+    }
+    if (cur != "") parts[++n] = cur
+    return n
+}
+function camel_match(abbrev, key,    a, k, na, i) {
+    na = camel_parts(abbrev, a)
+    if (na > camel_parts(key, k)) return 0
+    for (i = 1; i <= na; i++) if (index(k[i], a[i]) != 1) return 0
+    return 1
+}
+NR > 1 && camel_match(word, $1) { print (names ? $1 : $0) }
+"""
+
+# prints the matching names (with their kind if $2 is empty), refreshing the index with pw if it's stale
+_SH_COMMANDS = f"""_pyprojectx_commands() {{
+    local dir="$PWD"
+    while [ -n "$dir" ] && [ ! -e "$dir/pw" ]; do dir="${{dir%/*}}"; done
+    [ -e "$dir/pw" ] || return 0
+    local index="$dir/{DEFAULT_INSTALL_DIR}/{INDEX_FILE}"
+    if [ ! -f "$index" ] || [ "$dir/{PYPROJECT_TOML}" -nt "$index" ]; then
+        /usr/bin/env python3 "$dir/pw" --info >/dev/null 2>&1
+    fi
+    [ -f "$index" ] && awk -F '\\t' -v word="$1" -v names="$2" '{_AWK_MATCH}' "$index"
+}}
+"""
+
+_BASH = f"""# pyprojectx completion for bash, install with: eval "$(px --completion bash)"
+{_SH_COMMANDS}
+_pyprojectx() {{
+    local cur="${{COMP_WORDS[COMP_CWORD]}}" i
+    for ((i = 1; i < COMP_CWORD; i++)); do
+        [[ "${{COMP_WORDS[i]}}" == -* ]] || return 0
+    done
+    [[ "$cur" == -* ]] && return 0
+    local IFS=$'\\n'
+    COMPREPLY=($(_pyprojectx_commands "$cur" 1))
+}}
+complete -F _pyprojectx px pw
+"""
+
+_ZSH = f"""#compdef px pw
+# pyprojectx completion for zsh, install with: eval "$(px --completion zsh)" (after compinit)
+{_SH_COMMANDS}
+_pyprojectx() {{
+    local word
+    for word in "${{(@)words[2,CURRENT-1]}}"; do
+        [[ "$word" == -* ]] || return 1
+    done
+    [[ "$PREFIX" == -* ]] && return 1
+    # -U: abbreviations don't need to be a prefix of their match
+    compadd -U -- "${{(@f)$(_pyprojectx_commands "$PREFIX" 1)}}"
+}}
+compdef _pyprojectx px pw
+"""
+
+_FISH = f"""# pyprojectx completion for fish, install with: px --completion fish | source
+function __pyprojectx_commands
+    set -l dir $PWD
+    while test -n "$dir"; and not test -e "$dir/pw"
+        set dir (string replace -r '/[^/]*$' '' -- $dir)
+    end
+    test -e "$dir/pw"; or return 0
+    set -l index "$dir/{DEFAULT_INSTALL_DIR}/{INDEX_FILE}"
+    if not test -f "$index"; or command test "$dir/{PYPROJECT_TOML}" -nt "$index"
+        /usr/bin/env python3 "$dir/pw" --info >/dev/null 2>&1
+    end
+    test -f "$index"; and awk -F '\\t' -v word=(commandline -ct) -v names= '{_AWK_MATCH}' "$index"
+end
+function __pyprojectx_needs_command
+    for token in (commandline -opc)[2..-1]
+        string match -q -- '-*' $token; or return 1
+    end
+end
+complete -c px -f -n __pyprojectx_needs_command -a '(__pyprojectx_commands)'
+complete -c pw -f -n __pyprojectx_needs_command -a '(__pyprojectx_commands)'
+complete -p '*/pw' -f -n __pyprojectx_needs_command -a '(__pyprojectx_commands)'
+"""
+
+
+def completion_script(shell: str) -> str:
+    """Return the completion script for a shell (bash, zsh or fish)."""
+    return {"bash": _BASH, "zsh": _ZSH, "fish": _FISH}[shell]
+
+
+def index_path(install_path: Path) -> Path:
+    return install_path / INDEX_FILE
+
+
+def write_index(config, install_path: Path) -> None:
+    """Write the names of the aliases, scripts and tool contexts of a project, one per line with their kind.
+
+    :param config: the config of the project
+    :param install_path: the path to .pyprojectx
+    """
+    if not config.is_default_layout(install_path):
+        return
+    toml_path = config.toml_path.absolute()
+    entries = {}
+    for kind, names in (
+        ("tool context", config.get_context_names()),
+        ("script", config.get_scripts()),
+        ("alias", config.get_alias_names()),
+    ):
+        entries.update(dict.fromkeys(names, kind))
+    lines = [f"# {toml_path}", *(f"{name}\t{kind}" for name, kind in sorted(entries.items()))]
+    index = index_path(install_path)
+    tmp_file = index.with_name(f"{index.name}.{os.getpid()}.tmp")
+    try:
+        index.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        tmp_file.replace(index)
+    except OSError:
+        logger.debug("Could not write completion index %s", index, exc_info=True)
+        tmp_file.unlink(missing_ok=True)
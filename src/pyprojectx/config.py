@@ -1,3 +1,4 @@
+import os
 import re
 import sys
 from collections.abc import Iterable
@@ -6,9 +7,7 @@ from itertools import zip_longest
 from pathlib import Path
 from typing import Optional
 
-import tomlkit
-
-from pyprojectx.wrapper.pw import BLUE, CYAN, RESET
+from pyprojectx.wrapper.pw import BLUE, CYAN, DEFAULT_INSTALL_DIR, PYPROJECT_TOML, RESET
 
 MAIN = "main"
 DEFAULT_TOOLS = ["uv"]
@@ -26,18 +25,59 @@ class AliasCommand:
     shell: Optional[str] = None
     env: dict[str, str] = field(default_factory=dict)
     ctx: Optional[str] = None
+    # the maximum number of commands of the alias that run concurrently, 0 to run them one after the other
+    parallel: int = 0
+    prefix: bool = True
+    # globs of the files that the alias reads and writes, relative to cwd: the alias is skipped when they didn't change
+    inputs: list[str] = field(default_factory=list)
+    outputs: list[str] = field(default_factory=list)
+    # fnmatch patterns of the files that --changed passes to the alias
+    files: list[str] = field(default_factory=list)
+    # globs of the files that trigger a new run with --watch, relative to cwd; defaults to the inputs
+    watch: list[str] = field(default_factory=list)
+    # store the output files and the output in the cache and restore them instead of running the alias again
+    cache: bool = False
+    # the Python versions (matrix) to run the alias with, in parallel, instead of the Python version of pyprojectx
+    python: list[str] = field(default_factory=list)
+
+    @property
+    def fingerprinted(self) -> bool:
+        """Whether the alias only runs when its fingerprint changed, see pyprojectx.fingerprint."""
+        return bool(self.inputs or self.outputs or self.cache)
 
 
 class Config:
     """Encapsulates the PyprojectX config inside a toml file."""
 
-    # ruff: noqa: C901
-    def __init__(self, toml_path: Path) -> None:
-        """:param toml_path: The toml config file"""
+    def __init__(self, toml_path: Path, state: Optional[dict] = None) -> None:
+        """Load the config from a toml file.
+
+        :param toml_path: The toml config file
+        :param state: a previously compiled config state (see to_state); when given, the toml file is not parsed
+        """
         self._toml_path = toml_path
+        self._scripts = None
+        self._script_names = None
+        self._name_trie = None
+        self.lock_data = None
+        # the pending changes to the lock file, see pyprojectx.lock.LockState
+        self.lock_state = None
+        if state is None:
+            self._parse(toml_path)
+        else:
+            self._load_state(state)
+        self._uses_default_contexts = not self._contexts
+        if self._uses_default_contexts:
+            print(
+                f"{BLUE}No configuration found, providing {CYAN}{MAIN}{BLUE} context with default tools:"
+                f" {CYAN}{DEFAULT_TOOLS}{RESET}",
+                file=sys.stderr,
+            )
+            self._contexts = {MAIN: DEFAULT_TOOLS}
+
+    def _parse(self, toml_path: Path) -> None:
         try:
-            with toml_path.open("rb") as f:
-                toml_dict = tomlkit.load(f)
+            toml_dict = read_toml(toml_path)
         except FileNotFoundError:
             print(f"{CYAN}{toml_path}{BLUE} does not exist{RESET}", file=sys.stderr)
             toml_dict = {}
@@ -50,6 +90,8 @@ class Config:
         self.env = self._contexts.pop("env", {})
         self.prerelease = self._contexts.pop("prerelease", None)
         self.lock_python_version = self._contexts.pop("lock-python-version", None)
+        self.lock_shards = _lock_shards(_unwrap(self._contexts.pop("lock-shards", False)))
+        self.workspace = _workspace_patterns(_unwrap(self._contexts.pop("workspace", None)))
         if not isinstance(self.env, dict):
             msg = "Invalid config: 'env' must be a dictionary"
             raise Warning(msg)
@@ -76,13 +118,53 @@ class Config:
         self._merge_os_config()
         self.scripts_path = project_path / scripts_dir
         self.lock_file = project_path / LOCK_FILE
-        if not self._contexts:
-            print(
-                f"{BLUE}No configuration found, providing {CYAN}{MAIN}{BLUE} context with default tools:"
-                f" {CYAN}{DEFAULT_TOOLS}{RESET}",
-                file=sys.stderr,
-            )
-            self._contexts = {MAIN: DEFAULT_TOOLS}
+
+    def to_state(self) -> dict:
+        """Return the resolved config as plain, json serializable data that can be passed to the constructor."""
+        return {
+            "contexts": {} if self._uses_default_contexts else _unwrap_dict(self._contexts),
+            "aliases": _unwrap_dict(self._aliases),
+            "env": _unwrap_dict(self.env),
+            "prerelease": _unwrap(self.prerelease),
+            "lock_python_version": _unwrap(self.lock_python_version),
+            "lock_shards": self.lock_shards,
+            "workspace": self.workspace,
+            "project_dir": self.project_dir,
+            "cwd": _unwrap(self.cwd),
+            "shell": _unwrap(self.shell),
+            "scripts_context": _unwrap(self.scripts_context),
+            "scripts_path": str(self.scripts_path),
+            "lock_file": str(self.lock_file),
+        }
+
+    def _load_state(self, state: dict) -> None:
+        self._contexts = state["contexts"]
+        self._aliases = state["aliases"]
+        self.env = state["env"]
+        self.prerelease = state["prerelease"]
+        self.lock_python_version = state["lock_python_version"]
+        self.lock_shards = state["lock_shards"]
+        self.workspace = state["workspace"]
+        self.project_dir = state["project_dir"]
+        self.cwd = state["cwd"]
+        self.shell = state["shell"]
+        self.scripts_context = state["scripts_context"]
+        self.scripts_path = Path(state["scripts_path"])
+        self.lock_file = Path(state["lock_file"])
+
+    @property
+    def toml_path(self) -> Path:
+        """The toml config file."""
+        return self._toml_path
+
+    def is_default_layout(self, install_path: Path) -> bool:
+        """Check whether the config is pyproject.toml with the install dir .pyprojectx next to it.
+
+        Files that are shared by all config files of a project, like the tool shims in .pyprojectx/bin, are only
+        written for this layout: other config files (`--toml`) would overwrite those of the project.
+        """
+        toml_path = self._toml_path.absolute()
+        return toml_path.name == PYPROJECT_TOML and install_path.absolute() == toml_path.parent / DEFAULT_INSTALL_DIR
 
     def show_info(self, cmd, error=False):
         alias_cmds = self.get_alias(cmd)
@@ -94,7 +176,7 @@ class Config:
                     print(f"{BLUE}and runs in the {CYAN}{alias_cmd.ctx}{BLUE} tool context", file=sys.stderr)
                 print(f"{BLUE}command:{RESET}", file=sys.stderr)
                 print(alias_cmd.cmd, file=out)
-        elif self.get_script_path(cmd).exists():
+        elif self.is_script(cmd):
             print(f"{cmd}{BLUE} is a script in {CYAN}{self.scripts_path.absolute()}", file=sys.stderr)
         elif self.is_ctx(cmd):
             print(f"{cmd}{BLUE} is a tool context in {CYAN}{self._toml_path.absolute()}", file=sys.stderr)
@@ -114,7 +196,7 @@ class Config:
             print(f"{BLUE}available aliases:{RESET}", file=sys.stderr)
             print("\n".join(self._aliases.keys()), file=out)
             print(f"{BLUE}available scripts:{RESET}", file=sys.stderr)
-            print("\n".join(self._get_scripts()), file=out)
+            print("\n".join(self.get_scripts()), file=out)
             print(f"{BLUE}available tool contexts:{RESET}", file=sys.stderr)
             print("\n".join(self._contexts.keys() - ["aliases", "os"]), file=out)
 
@@ -147,6 +229,38 @@ class Config:
                 venv_dir = venv_dir.replace(PROJECT_DIR, self.project_dir)
         return {"requirements": sorted(requirements), "post-install": post_install, "dir": venv_dir}
 
+    def get_python_version(self, key) -> Optional[str]:
+        """Get the Python version that the virtual environment of a tool context is created with.
+
+        :param key: The key (tool context name) to look for
+        :return: the version, f.e. '3.12', or None to use the Python version of pyprojectx
+        """
+        versions = self._get_ctx_strings(key, "python")
+        if len(versions) > 1:
+            msg = (
+                f"Invalid config: 'python' of tool context {key} must be one version, use the alias option for a matrix"
+            )
+            raise Warning(msg)
+        return versions[0] if versions else None
+
+    def get_preload_modules(self, key) -> list[str]:
+        """Get the modules that the forkserver of a tool context imports before it runs scripts.
+
+        :param key: The key (tool context name) to look for
+        :return: the modules, or an empty list if the scripts don't run in a forkserver
+        """
+        return self._get_ctx_strings(key, "preload")
+
+    def _get_ctx_strings(self, key, option) -> list[str]:
+        requirements_config = self._contexts.get(key) if key else None
+        values = requirements_config.get(option, []) if isinstance(requirements_config, dict) else []
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            msg = f"Invalid config: '{option}' of tool context {key} must be a string or a list of strings"
+            raise Warning(msg)
+        return values
+
     def get_ctx_or_main(self, ctx=None):
         """Return the given context if it exists, otherwise return the main context if it exists.
 
@@ -162,6 +276,10 @@ class Config:
         """Return all context names in the [tool.pyprojectx] section."""
         return self._contexts.keys()
 
+    def get_alias_names(self) -> Iterable[str]:
+        """Return all alias names in the [tool.pyprojectx.aliases] section."""
+        return self._aliases.keys()
+
     def is_ctx(self, key) -> bool:
         """Check whether a key (context name) exists in the [tool.pyprojectx] section.
 
@@ -183,15 +301,23 @@ class Config:
         alias = self._aliases.get(key) if key else None
         if not alias:
             return []
-        alias_config = {"ctx": None, "env": {}, "cwd": self.cwd, "shell": self.shell}
+        alias_config = {
+            "ctx": None,
+            "env": {},
+            "cwd": self.cwd,
+            "shell": self.shell,
+            "parallel": False,
+            "prefix": True,
+            "inputs": [],
+            "outputs": [],
+            "cache": False,
+            "files": [],
+            "watch": [],
+            "python": [],
+        }
         if isinstance(alias, dict):
             alias_config.update(alias)
-            if alias_config.get("ctx") and not isinstance(alias_config["ctx"], str):
-                raise Warning(f"Invalid alias {key}: 'ctx' must be a string")
-            if not isinstance(alias_config["env"], dict):
-                raise Warning(f"Invalid alias {key}: 'env' must be a dictionary")
-            if not isinstance(alias_config["cwd"], str):
-                raise Warning(f"Invalid alias {key}: 'cwd' must be a string")
+            _validate_alias(key, alias_config)
             alias_cmd = alias_config.get("cmd")
         else:
             alias_cmd = alias
@@ -223,6 +349,14 @@ class Config:
             env=alias_config["env"],
             cwd=self.get_cwd(alias_config["cwd"]),
             shell=alias_config["shell"],
+            parallel=_max_parallel(alias_config["parallel"]),
+            prefix=alias_config["prefix"],
+            inputs=alias_config["inputs"],
+            outputs=alias_config["outputs"],
+            cache=alias_config["cache"],
+            files=alias_config["files"],
+            watch=alias_config["watch"],
+            python=list(dict.fromkeys(alias_config["python"])),
         )
 
     def is_alias(self, key) -> bool:
@@ -246,11 +380,10 @@ class Config:
         :param abbrev: abbreviated or full alias key to search for
         :return: a list of matching alias keys and/or scripts
         """
-        aliases_and_scripts = {*self._aliases.keys(), *self._get_scripts()}
-        if abbrev in aliases_and_scripts:
+        if abbrev in self._aliases or self.is_script(abbrev):
             return [abbrev]
 
-        return sorted([name for name in aliases_and_scripts if camel_match(abbrev, name)])
+        return find_in_name_trie(self.get_name_trie(), abbrev)
 
     def get_cwd(self, cwd=None):
         _cwd = cwd or self.cwd
@@ -266,8 +399,102 @@ class Config:
                 self.shell = os_dict[os_key].pop("shell", self.shell)
                 self._aliases.update(os_dict[os_key].get("aliases", {}))
 
-    def _get_scripts(self):
-        return sorted([f.name.replace(".py", "") for f in self.scripts_path.glob("*.py") if f.is_file()])
+    def get_scripts(self) -> list[str]:
+        """Return the names of all scripts in scripts_dir."""
+        if self._scripts is None:
+            self._scripts = sorted([f.name.replace(".py", "") for f in self.scripts_path.glob("*.py") if f.is_file()])
+        return self._scripts
+
+    def set_scripts(self, scripts: list[str]) -> None:
+        """Use a previously listed content of scripts_dir instead of scanning the directory."""
+        self._scripts = scripts
+        self._script_names = None
+        self._name_trie = None
+
+    def is_script(self, name: str) -> bool:
+        """Check whether scripts_dir contains a script with this name, without accessing the file system again."""
+        if self._script_names is None:
+            self._script_names = set(self.get_scripts())
+        return name in self._script_names
+
+    def get_name_trie(self) -> dict:
+        """Return the trie of the camel case parts of all alias keys and scripts, see build_name_trie."""
+        if self._name_trie is None:
+            self._name_trie = build_name_trie({*self._aliases.keys(), *self.get_scripts()})
+        return self._name_trie
+
+    def set_name_trie(self, trie: dict) -> None:
+        """Use a previously built trie, f.e. from the manifest, for the current alias keys and scripts."""
+        self._name_trie = trie
+
+
+def read_toml(path: Path) -> dict:
+    """Parse a toml file that is only read, not modified.
+
+    Uses the fast tomllib parser when available; tomlkit is only needed to modify toml files without losing
+    their formatting.
+    """
+    if sys.version_info >= (3, 11):
+        import tomllib  # noqa: PLC0415
+
+        with path.open("rb") as f:
+            return tomllib.load(f)
+    import tomlkit  # noqa: PLC0415
+
+    with path.open("rb") as f:
+        return tomlkit.load(f).unwrap()
+
+
+def _validate_alias(key, alias_config: dict) -> None:
+    if alias_config.get("ctx") and not isinstance(alias_config["ctx"], str):
+        raise Warning(f"Invalid alias {key}: 'ctx' must be a string")
+    if not isinstance(alias_config["env"], dict):
+        raise Warning(f"Invalid alias {key}: 'env' must be a dictionary")
+    if not isinstance(alias_config["cwd"], str):
+        raise Warning(f"Invalid alias {key}: 'cwd' must be a string")
+    parallel = alias_config["parallel"]
+    if not isinstance(parallel, (bool, int)) or (not isinstance(parallel, bool) and parallel < 1):
+        raise Warning(f"Invalid alias {key}: 'parallel' must be a boolean or a positive number")
+    for flag in ("prefix", "cache"):
+        if not isinstance(alias_config[flag], bool):
+            raise Warning(f"Invalid alias {key}: '{flag}' must be a boolean")
+    for option in ("inputs", "outputs", "files", "watch", "python"):
+        if isinstance(alias_config[option], str):
+            alias_config[option] = [alias_config[option]]
+        values = alias_config[option]
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            raise Warning(f"Invalid alias {key}: '{option}' must be a string or a list of strings")
+
+
+def _max_parallel(parallel) -> int:
+    if parallel is True:
+        return os.cpu_count() or 1
+    return parallel or 0
+
+
+def _workspace_patterns(workspace) -> Optional[list[str]]:
+    if isinstance(workspace, str):
+        return [workspace]
+    if workspace is not None and not (isinstance(workspace, list) and all(isinstance(p, str) for p in workspace)):
+        msg = "Invalid config: 'workspace' must be a string or a list of strings"
+        raise Warning(msg)
+    return workspace
+
+
+def _lock_shards(lock_shards) -> bool:
+    if not isinstance(lock_shards, bool):
+        msg = "Invalid config: 'lock-shards' must be true or false"
+        raise Warning(msg)
+    return lock_shards
+
+
+def _unwrap(value):
+    # tomlkit items are wrapped python objects
+    return value.unwrap() if hasattr(value, "unwrap") else value
+
+
+def _unwrap_dict(value: dict) -> dict:
+    return {str(k): _unwrap(v) for k, v in value.items()}
 
 
 def camel_match(abbrev, key):
@@ -283,3 +510,43 @@ def to_camel_parts(key):
         return [key]
     camel = re.sub(r"(-\w)", lambda m: m.group(0)[1].upper(), key)
     return filter(len, re.split("([A-Z][^A-Z]*)", camel[0].lower() + camel[1:]))
+
+
+# the keys of a node in the name trie
+TRIE_NAMES = "names"
+TRIE_CHILDREN = "children"
+
+
+def build_name_trie(names: Iterable[str]) -> dict:
+    """Build a trie over the camel case parts of names, for abbreviation lookups that don't scan all the names.
+
+    Each node matches a part (f.e. 'Bar' of 'fooBar' and 'foo-bar') and lists all the names below it, so that a
+    lookup only visits the nodes of the parts that start like the parts of the abbreviation. The children of a node
+    are grouped by the first character of their part. The trie only contains lists and dicts with string keys, so
+    that it can be stored as json.
+    :param names: the alias keys and scripts
+    """
+    root = {TRIE_NAMES: [], TRIE_CHILDREN: {}}
+    for name in sorted(names):
+        node = root
+        node[TRIE_NAMES].append(name)
+        for part in to_camel_parts(name):
+            siblings = node[TRIE_CHILDREN].setdefault(part[0], {})
+            node = siblings.setdefault(part, {TRIE_NAMES: [], TRIE_CHILDREN: {}})
+            node[TRIE_NAMES].append(name)
+    return root
+
+
+def find_in_name_trie(trie: dict, abbrev: str) -> list[str]:
+    """Return the sorted names in a trie (see build_name_trie) that match an abbreviation, like camel_match does."""
+    nodes = [trie]
+    for abbrev_part in to_camel_parts(abbrev):
+        nodes = [
+            child
+            for node in nodes
+            for part, child in node[TRIE_CHILDREN].get(abbrev_part[0], {}).items()
+            if part.startswith(abbrev_part)
+        ]
+    if len(nodes) == 1:
+        return list(nodes[0][TRIE_NAMES])
+    return sorted(name for node in nodes for name in node[TRIE_NAMES])
@@ -5,30 +5,36 @@ import re
 import shutil
 import subprocess
 import sys
+from functools import cache
 from pathlib import Path
-from typing import Optional, Union
-
-import uv
+from typing import NoReturn, Optional, Union
 
 from pyprojectx.hash import calculate_hash
 from pyprojectx.log import logger
+from pyprojectx.wrapper.pw import PYPROJECTX_UV_BIN_ENV_VAR
 
 PYTHON_EXE = "python.exe" if sys.platform == "win32" else "python3"
-UV_EXE = uv.find_uv_bin()
 ENV_VAR_RE = re.compile(r"(?P<var>\$\{(?P<name>[A-Z0-9_]+)})")
+# on Windows, os.exec* spawns a new process and exits the current one, which breaks the calling console
+CAN_EXEC = os.name == "posix"
+POSIX_SHELL = "/bin/sh"
 
 
 class IsolatedVirtualEnv:
     """Encapsulates the location and installation of an isolated virtual environment."""
 
-    def __init__(self, base_path: Path, name: str, requirements_config: dict, prerelease=None) -> None:
+    def __init__(
+        self, base_path: Path, name: str, requirements_config: dict, prerelease=None, python: Optional[str] = None
+    ) -> None:
         """Construct an IsolatedVirtualEnv.
 
         :param base_path: The base path for all environments
         :param name: The name for the environment
         :param requirements_config: The requirements and post-install script to install in the environment
+        :param python: The Python version of the environment (f.e. '3.12'), defaults to the one running pyprojectx
         """
         self._name = name
+        self._python = python or f"{sys.version_info.major}.{sys.version_info.minor}"
         self._base_path = base_path
         self._hash = requirements_config.get("hash", calculate_hash(requirements_config))
         self._requirements = requirements_config.get("requirements", [])
@@ -62,13 +68,13 @@ class IsolatedVirtualEnv:
         """
         logger.debug("Installing IsolatedVirtualEnv in %s", self.path)
         cmd = [
-            UV_EXE,
+            uv_exe(),
             "venv",
             str(self.path),
             "--prompt",
             f"px-{self.name}",
             "--python",
-            f"{sys.version_info.major}.{sys.version_info.minor}",
+            self._python,
             "--clear",
         ]
         if quiet:
@@ -77,10 +83,11 @@ class IsolatedVirtualEnv:
         subprocess.run(cmd, check=True, stdout=sys.stderr)
         self._install_requirements(quiet)
         if install_path and self.scripts_path.exists():
-            self._copy_scripts(install_path, self.scripts_path)
+            self.link_scripts(install_path)
 
-    def _copy_scripts(self, install_path, scripts_dir):
-        # make the scripts dir available in .pyprojectx/<tool context name>
+    def link_scripts(self, install_path: Path) -> None:
+        """Make the scripts dir available in .pyprojectx/<tool context name>."""
+        scripts_dir = self.scripts_path.absolute()
         ctx_path = install_path / self.name
         try:
             ctx_path.unlink(missing_ok=True)
@@ -110,7 +117,7 @@ class IsolatedVirtualEnv:
             expand_env_variables(r) for r in self._requirements if not requirements_file_regex.match(r)
         ]
         requirements_string = "\n".join(regular_requirements)
-        cmd = [UV_EXE, "pip", "install", "-r", "-", "--python", str(self.scripts_path / PYTHON_EXE)]
+        cmd = [uv_exe(), "pip", "install", "-r", "-", "--python", str(self.scripts_path / PYTHON_EXE)]
         cmd += [param for f in file_requirements for param in f.split()]
         if quiet:
             cmd.append("--quiet")
@@ -119,7 +126,7 @@ class IsolatedVirtualEnv:
         subprocess.run(cmd, input=requirements_string.encode("utf-8"), stdout=sys.stderr, check=True)
 
     def check_is_installable(self, requirement_specs, quiet=False):
-        cmd = [UV_EXE, "pip", "install", "--python", str(self.scripts_path / PYTHON_EXE), "--dry-run"]
+        cmd = [uv_exe(), "pip", "install", "--python", str(self.scripts_path / PYTHON_EXE), "--dry-run"]
         if quiet:
             cmd.append("--quiet")
         cmd += requirement_specs
@@ -131,19 +138,42 @@ class IsolatedVirtualEnv:
         shutil.rmtree(self.path, ignore_errors=True)
 
     def run(
-        self, cmd: Union[str, list[str]], env: dict, cwd: Union[str, bytes, os.PathLike], stdout=None
-    ) -> subprocess.CompletedProcess:
+        self,
+        cmd: Union[str, list[str]],
+        env: dict,
+        cwd: Union[str, bytes, os.PathLike],
+        stdout=None,
+        replace_process=False,
+    ) -> Optional[subprocess.CompletedProcess]:
         """Run a command inside the virtual environment.
 
         :param cmd: The command string to run
         :param env: additional environment variables
         :param cwd: current working directory
         :param stdout: redirect stdout to this stream
+        :param replace_process: replace the current process with the command when possible (no return)
         :return: The subprocess.CompletedProcess instance
         """
         logger.info("Running command in isolated venv %s: %s", self.name, cmd)
+        cmd, env, shell = self.prepare(cmd, env)
+        logger.debug("Final command to run: %s", cmd)
+        logger.debug("Environment for running command: %s", env)
+        logger.debug("Cwd for running command: %s", cwd)
+        return run_or_exec(cmd, env=env, cwd=cwd, shell=shell, stdout=stdout, replace_process=replace_process)
+
+    def prepare(
+        self, cmd: Union[str, list[str]], env: dict, environ: Optional[dict] = None
+    ) -> tuple[Union[str, list[str]], dict, bool]:
+        """Compose the command and the complete environment to run a command inside the virtual environment.
+
+        :param cmd: The command string to run
+        :param env: additional environment variables
+        :param environ: the environment to extend, defaults to os.environ
+        :return: the command, the environment and whether the command must run in a shell
+        """
+        environ = os.environ if environ is None else environ
         logger.debug("Adding scripts path to PATH: %s", self.scripts_path.absolute())
-        path = os.pathsep.join((str(self.scripts_path.absolute()), os.environ.get("PATH", os.defpath)))
+        path = os.pathsep.join((str(self.scripts_path.absolute()), environ.get("PATH", os.defpath)))
 
         extra_environ = {"PATH": path}
         if isinstance(cmd, list):
@@ -151,17 +181,69 @@ class IsolatedVirtualEnv:
             shell = False
         else:
             shell = True
-
-        env = {**os.environ, **extra_environ, **env}
-        logger.debug("Final command to run: %s", cmd)
-        logger.debug("Environment for running command: %s", env)
-        logger.debug("Cwd for running command: %s", cwd)
-        return subprocess.run(cmd, env=env, shell=shell, check=True, cwd=cwd, stdout=stdout)
+        return cmd, {**environ, **extra_environ, **env}, shell
 
     def _compose_path(self):
-        return (
-            self._base_path / f"{self._name.lower()}-{self._hash}-py{sys.version_info.major}.{sys.version_info.minor}"
-        ).absolute()
+        return (self._base_path / f"{self._name.lower()}-{self._hash}-py{self._python}").absolute()
+
+
+@cache
+def uv_exe() -> str:
+    """Locate the uv binary that is installed together with pyprojectx (only once, when it is needed).
+
+    The pyprojectx zipapp doesn't contain uv: the pw script passes the location of the uv binary that it installed,
+    or uv must be on the PATH.
+    """
+    uv_bin = os.environ.get(PYPROJECTX_UV_BIN_ENV_VAR)
+    if uv_bin:
+        return uv_bin
+    try:
+        import uv  # noqa: PLC0415
+    except ImportError:
+        uv_bin = shutil.which("uv")
+        if not uv_bin:
+            msg = "uv is not installed: add it to your PATH or remove the pyprojectx zipapp"
+            raise Warning(msg) from None
+        return uv_bin
+    return uv.find_uv_bin()
+
+
+def run_or_exec(  # noqa: PLR0913
+    cmd: Union[str, list[str]], env: dict, cwd, shell: bool, stdout=None, replace_process=False
+) -> Optional[subprocess.CompletedProcess]:
+    """Run a command in a subprocess or, if requested and possible, replace the current process with it.
+
+    Replacing the process avoids keeping the pyprojectx interpreter(s) in memory while the command runs
+    and lets signals reach the command directly. It is only possible when nothing needs to happen afterward.
+    :param cmd: The command to run
+    :param env: the complete environment for the command
+    :param cwd: current working directory
+    :param shell: run the command in a shell
+    :param stdout: redirect stdout to this stream; prevents replacing the process
+    :param replace_process: replace the current process with the command when possible
+    :return: The subprocess.CompletedProcess instance, or nothing when the process is replaced
+    """
+    if replace_process and CAN_EXEC and stdout is None:
+        return exec_process(cmd, env=env, cwd=cwd, shell=shell)
+    return subprocess.run(cmd, env=env, shell=shell, check=True, cwd=cwd, stdout=stdout)
+
+
+def exec_process(cmd: Union[str, list[str]], env: dict, cwd, shell: bool) -> NoReturn:
+    """Replace the current process with cmd, using the same shell semantics as subprocess.run."""
+    args = exec_args(cmd, shell)
+    logger.debug("Replacing pyprojectx process with: %s", args)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    if cwd:
+        os.chdir(cwd)
+    os.execvpe(args[0], args, env)  # noqa: S606
+
+
+def exec_args(cmd: Union[str, list[str]], shell: bool) -> list[str]:
+    """Convert a command to the arguments of an exec call, using the same shell semantics as subprocess.run."""
+    if shell:
+        return [POSIX_SHELL, "-c", cmd] if isinstance(cmd, str) else [POSIX_SHELL, "-c", *cmd]
+    return [cmd] if isinstance(cmd, str) else [str(arg) for arg in cmd]
 
 
 def expand_env_variables(line):
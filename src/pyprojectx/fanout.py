@@ -0,0 +1,97 @@
+"""Runs pyprojectx in several child processes at the same time, f.e. for all members of a workspace (`--all`).
+
+The output of the processes is prefixed with their name, line by line, and a summary with the exit code and the
+duration of each process is printed when they all finished. A failing process doesn't stop the others.
+"""
+
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from pyprojectx.jobserver import JobServer
+from pyprojectx.log import logger
+from pyprojectx.wrapper.pw import BLUE, CYAN, RED, RESET
+
+
+@dataclass
+class ProcessResult:
+    """The outcome of a pyprojectx child process."""
+
+    name: str
+    # None if the process was skipped
+    returncode: Optional[int]
+    seconds: float = 0.0
+
+
+def pyprojectx_command(script: str) -> list[str]:
+    """Return the command that starts pyprojectx again with the same Python interpreter.
+
+    :param script: the pyprojectx script that started this process
+    """
+    # the pyprojectx zipapp is not executable itself
+    return [sys.executable, script] if script.endswith(".pyz") else [sys.executable, "-m", "pyprojectx"]
+
+
+def run_processes(
+    commands: dict[str, Optional[list[str]]], jobs: int, jobserver: Optional[JobServer] = None
+) -> list[ProcessResult]:
+    """Run the commands concurrently, with their output prefixed by their name.
+
+    :param commands: the commands by name, None to skip a command
+    :param jobs: the maximum number of commands that run at the same time
+    :param jobserver: the jobserver to borrow a token from for each command, shared with the child processes
+    :return: the results, in the same order as the commands
+    """
+    output_lock = threading.Lock()
+
+    def run(name: str, cmd: Optional[list[str]]) -> ProcessResult:
+        if cmd is None:
+            return ProcessResult(name, None)
+        token = jobserver.acquire() if jobserver else None
+        start = time.monotonic()
+        try:
+            logger.info("Running %s (%s)", cmd, name)
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                errors="replace",
+                pass_fds=jobserver.pass_fds if jobserver else (),
+            )
+            for line in proc.stdout:
+                text = line.rstrip("\n")
+                with output_lock:
+                    sys.stdout.write(f"[{name}] {text}\n")
+                    sys.stdout.flush()
+            return ProcessResult(name, proc.wait(), time.monotonic() - start)
+        finally:
+            if jobserver:
+                jobserver.release(token)
+
+    logger.debug("Running %s processes, at most %s at a time", len(commands), jobs)
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="process") as pool:
+        futures = [pool.submit(run, name, cmd) for name, cmd in commands.items()]
+        return [future.result() for future in futures]
+
+
+def print_summary(results: list[ProcessResult], title: str) -> None:
+    """Print the exit code and the duration of each process.
+
+    :param title: the header of the column with the names of the processes
+    """
+    width = max(len(title), *(len(result.name) for result in results))
+    print(f"\n{BLUE}{title:<{width}}  exit code  duration{RESET}", file=sys.stderr)
+    for result in results:
+        if result.returncode is None:
+            print(f"{CYAN}{result.name:<{width}}  {BLUE}skipped{RESET}", file=sys.stderr)
+        else:
+            color = RED if result.returncode else BLUE
+            print(
+                f"{CYAN}{result.name:<{width}}  {color}{result.returncode:<9}  {result.seconds:.1f}s{RESET}",
+                file=sys.stderr,
+            )
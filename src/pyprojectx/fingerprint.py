@@ -0,0 +1,184 @@
+"""Up-to-date checks for aliases that declare the files that they read (`inputs`) and write (`outputs`).
+
+The fingerprint of an alias consists of its commands, arguments and environment, its input and output patterns, the
+(locked) requirements and the Python versions of its tool contexts, the platform and the content hashes of its input
+and output files. It is stored in _.pyprojectx/fingerprints_ after the alias ran successfully; the alias is skipped
+as long as the fingerprint doesn't change. Files are only hashed again when their stat data (size, mtime, inode)
+changed since the fingerprint was stored.
+"""
+
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Optional
+
+from pyprojectx.config import AliasCommand, Config
+from pyprojectx.hash import calculate_hash
+from pyprojectx.lock import get_locked_requirements
+from pyprojectx.log import logger
+from pyprojectx.manifest import RACY_INTERVAL_NS
+
+FINGERPRINT_VERSION = 1
+FINGERPRINTS_DIR = "fingerprints"
+
+
+class Fingerprint:
+    """The fingerprint of an alias with inputs or outputs."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        config: Config,
+        alias: str,
+        alias_cmds: list[AliasCommand],
+        args: list[str],
+        install_path: Path,
+        python: Optional[str] = None,
+    ):
+        """Construct a Fingerprint.
+
+        :param config: the config of the project
+        :param alias: the name of the alias
+        :param alias_cmds: the commands of the alias
+        :param args: the arguments that are passed to the alias
+        :param install_path: the path to .pyprojectx
+        :param python: the Python version that the alias runs with (--python), if not the one of its tool contexts
+        """
+        self._alias_cmds = alias_cmds
+        self.cwd = Path(alias_cmds[0].cwd or config.project_dir)
+        # projects can share an install dir, f.e. the members of a workspace
+        toml_id = hashlib.md5(str(config.toml_path.absolute()).encode()).hexdigest()
+        self._file = install_path / FINGERPRINTS_DIR / toml_id / f"{alias}.json"
+        self._stored = _read(self._file)
+        self._key = _compute_key(config, alias_cmds, args, python)
+
+    def up_to_date(self) -> bool:
+        """Check whether the alias ran successfully before with the same commands and the same files."""
+        stored = self._stored
+        if not stored or stored.get("version") != FINGERPRINT_VERSION or stored.get("key") != self._key:
+            logger.info("Fingerprint miss (no fingerprint or other commands, environment or requirements)")
+            return False
+        outputs = self._files("outputs", stored)
+        if any(alias_cmd.outputs for alias_cmd in self._alias_cmds) and not outputs:
+            logger.info("Fingerprint miss (no outputs)")
+            return False
+        # only the hashes are compared: a touched file with the same content is still up-to-date
+        inputs = self._files("inputs", stored)
+        if _hashes(inputs) != _hashes(stored["inputs"]) or _hashes(outputs) != _hashes(stored["outputs"]):
+            logger.info("Fingerprint miss (changed inputs or outputs)")
+            return False
+        return True
+
+    def save(self) -> None:
+        """Store the fingerprint after the alias ran successfully."""
+        stored = self._stored or {}
+        fingerprint = {
+            "version": FINGERPRINT_VERSION,
+            "key": self._key,
+            "inputs": self._files("inputs", stored),
+            "outputs": self._files("outputs", stored),
+        }
+        tmp_file = self._file.with_name(f"{self._file.name}.{os.getpid()}.tmp")
+        try:
+            self._file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file.write_text(json.dumps(fingerprint), encoding="utf-8")
+            tmp_file.replace(self._file)
+        except OSError:
+            logger.debug("Could not write fingerprint %s", self._file, exc_info=True)
+            tmp_file.unlink(missing_ok=True)
+
+    def cache_key(self) -> str:
+        """Return the key of the results of the alias, which doesn't depend on the location of the project.
+
+        It covers the fingerprint key (with the input and output patterns) and the content hashes of the input files.
+        """
+        inputs = _hashes(self._files("inputs", self._stored or {}))
+        return hashlib.sha256(json.dumps([self._key, inputs], sort_keys=True).encode()).hexdigest()
+
+    def output_files(self) -> list[Path]:
+        """Return the output files of the alias that exist."""
+        return sorted({path for alias_cmd in self._alias_cmds for path in self._glob(alias_cmd.outputs)})
+
+    def _files(self, kind: str, stored: dict) -> dict[str, list]:
+        """Return the [stat, hash] of the input or output files, reusing the stored hash if the stat didn't change."""
+        stored_files = stored.get(kind, {})
+        files = {}
+        now = time.time_ns()
+        for path in sorted({path for alias_cmd in self._alias_cmds for path in self._glob(getattr(alias_cmd, kind))}):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            # files modified this recently may still be modified without changing their stat: don't trust it
+            stat = None if now - st.st_mtime_ns < RACY_INTERVAL_NS else [st.st_size, st.st_mtime_ns, st.st_ino]
+            name = path.relative_to(self.cwd).as_posix()
+            stored_stat, stored_hash = stored_files.get(name, (None, None))
+            files[name] = [stat, stored_hash if stat and stat == stored_stat else _hash(path)]
+        return files
+
+    def _glob(self, patterns: list[str]) -> Iterator[Path]:
+        for pattern in patterns:
+            for path in self.cwd.glob(pattern):
+                if path.is_file():
+                    yield path
+
+
+def _hashes(files: dict[str, list]) -> dict[str, Optional[str]]:
+    return {name: file_hash for name, (_, file_hash) in files.items()}
+
+
+def _compute_key(config: Config, alias_cmds: list[AliasCommand], args: list[str], python: Optional[str]) -> str:
+    md5 = hashlib.md5()
+    requirements = {}
+    pythons = {}
+    for ctx in sorted({alias_cmd.ctx for alias_cmd in alias_cmds if alias_cmd.ctx}):
+        # the locked requirements, or the configured ones if they aren't locked (yet)
+        requirements[ctx] = calculate_hash(get_locked_requirements(ctx, config) or config.get_requirements(ctx))
+        # the Python version of the venv, see IsolatedVirtualEnv
+        version = python or config.get_python_version(ctx) or f"{sys.version_info.major}.{sys.version_info.minor}"
+        pythons[ctx] = f"{sys.implementation.name}-{version}"
+    key = {
+        "cmds": [
+            [alias_cmd.cmd, alias_cmd.ctx, _relative_cwd(config, alias_cmd), alias_cmd.shell, alias_cmd.python]
+            for alias_cmd in alias_cmds
+        ],
+        "env": [{**config.env, **alias_cmd.env} for alias_cmd in alias_cmds],
+        # other patterns select other files, also when the files that they select didn't change (yet)
+        "inputs": [sorted(alias_cmd.inputs) for alias_cmd in alias_cmds],
+        "outputs": [sorted(alias_cmd.outputs) for alias_cmd in alias_cmds],
+        "args": args,
+        "requirements": requirements,
+        # results can be shared between machines (PYPROJECTX_CACHE), but not between platforms or Python versions
+        "platform": [sys.platform, platform.machine()],
+        "python": pythons,
+    }
+    md5.update(json.dumps(key, sort_keys=True).encode())
+    return md5.hexdigest()
+
+
+def _relative_cwd(config: Config, alias_cmd: AliasCommand) -> Optional[str]:
+    # the same key for all checkouts of the project
+    return alias_cmd.cwd and os.path.relpath(alias_cmd.cwd, config.project_dir)
+
+
+def _hash(path: Path) -> Optional[str]:
+    sha = hashlib.sha256()
+    try:
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+    except OSError:
+        return None
+    return sha.hexdigest()
+
+
+def _read(file: Path) -> Optional[dict]:
+    try:
+        with file.open("rb") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,322 @@
+"""A resident, pre-forking Python interpreter per tool context that runs the scripts in the scripts dir.
+
+A tool context can list modules to `preload`: its scripts then don't start a new Python interpreter, but are forked
+from a forkserver that runs in the virtual environment of the context and that imported these modules already. The
+client passes its stdin, stdout and stderr with the arguments, the cwd and the environment of the script over a Unix
+socket; the forked child runs the script with runpy and the server reports its exit code back to the client.
+
+The socket name depends on the virtual environment (and so on the locked requirements of the context), the time
+that it was installed and the preloaded modules: a forkserver that doesn't match anymore isn't used and is stopped.
+Forkservers stop after an idle timeout.
+
+The forkserver runs in the virtual environment of the tool context, where pyprojectx is not installed: this module
+only uses the standard library.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+# the logger of pyprojectx.log, which this module can't import
+logger = logging.getLogger("pyprojectx.log")
+
+FORKSERVERS_DIR = "forkservers"
+DEFAULT_IDLE_TIMEOUT = 900
+# the maximum time to wait for a new forkserver to import its modules
+STARTUP_TIMEOUT = 60
+REQUEST_TIMEOUT = 5
+MAX_SOCKET_PATH = 103
+STDIO_FDS = (0, 1, 2)
+
+
+def socket_path(install_path: Path, ctx: str, venv_path: Path, modules: list[str]) -> Optional[str]:
+    """Return the Unix socket of the forkserver of a tool context, or None if the path is too long for a socket.
+
+    :param install_path: the path to .pyprojectx
+    :param ctx: the name of the tool context
+    :param venv_path: the virtual environment of the tool context
+    :param modules: the modules that the forkserver preloads
+    """
+    try:
+        installed = (venv_path / "pyvenv.cfg").stat().st_mtime_ns
+    except OSError:
+        installed = None
+    key = hashlib.md5(json.dumps([str(venv_path), installed, modules]).encode()).hexdigest()[:12]
+    path = str((install_path / FORKSERVERS_DIR / f"{ctx}-{key}.sock").absolute())
+    return path if len(path.encode()) <= MAX_SOCKET_PATH else None
+
+
+def run(path: str, argv: list[str], cwd: str, env: dict, wait: float = 0) -> Optional[int]:
+    """Run a script in the forkserver, with the stdin, stdout and stderr of this process.
+
+    :param path: the socket of the forkserver
+    :param argv: the script and its arguments
+    :param cwd: the working directory of the script
+    :param env: the complete environment of the script
+    :param wait: the number of seconds to wait for the forkserver to start
+    :return: the exit code of the script, or None if it didn't run because the forkserver isn't available
+    """
+    sock = _connect(path, wait)
+    if not sock:
+        return None
+    with sock:
+        try:
+            socket.send_fds(sock, [b"r"], list(STDIO_FDS))
+            sock.sendall(json.dumps({"argv": argv, "cwd": cwd, "env": env}).encode() + b"\n")
+            started = _read_message(sock, bytearray())
+        except OSError:
+            logger.debug("Could not run %s in forkserver %s", argv, path, exc_info=True)
+            return None
+        if not started:
+            return None
+        pid, buffer = started[0]["pid"], started[1]
+        logger.debug("Running %s in forkserver %s, pid %s", argv, path, pid)
+        while True:
+            try:
+                result = _read_message(sock, buffer)
+                break
+            except KeyboardInterrupt:
+                # the script doesn't run in the process group of the terminal
+                _kill(pid, signal.SIGINT)
+        if not result:
+            logger.warning("Forkserver %s stopped while running %s", path, argv)
+            return 1
+        return result[0]["returncode"]
+
+
+def start(python: str, path: str, modules: list[str], sys_path: Path, env: dict, idle_timeout: float) -> None:  # noqa: PLR0913
+    """Start a forkserver in the background; it stops when another forkserver already uses the socket.
+
+    :param python: the Python interpreter of the virtual environment
+    :param path: the socket of the forkserver
+    :param modules: the modules to preload
+    :param sys_path: the first entry of sys.path of the scripts, which is the scripts dir
+    :param env: the environment of the forkserver
+    :param idle_timeout: the number of seconds without scripts after which the forkserver stops
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    logger.info("Starting a forkserver on %s, preloading %s", path, ", ".join(modules))
+    # started from source: the module may be inside the pyprojectx zipapp
+    source = __loader__.get_source(__name__)
+    subprocess.Popen(
+        [python, "-c", source, path, str(idle_timeout), str(sys_path), *modules],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        cwd=Path(path).parent,
+        start_new_session=True,
+    )
+
+
+def stop(path: str) -> None:
+    """Stop a forkserver, after the scripts that it is running finished."""
+    sock = _connect(path, 0)
+    if sock:
+        with sock:
+            try:
+                socket.send_fds(sock, [b"s"], [])
+            except OSError:
+                logger.debug("Could not stop forkserver %s", path, exc_info=True)
+
+
+def stop_stale(path: str, ctx: str) -> None:
+    """Stop the other forkservers of a tool context, f.e. after its requirements changed."""
+    for other in Path(path).parent.glob(f"{ctx}-*.sock"):
+        if str(other) != path:
+            logger.info("Stopping stale forkserver %s", other)
+            stop(str(other))
+
+
+def serve(path: str, idle_timeout: float, modules: list[str]) -> None:
+    """Preload the modules and fork a child for each script, until the forkserver is idle or stopped.
+
+    :param path: the socket to listen on
+    :param idle_timeout: the number of seconds without scripts after which the forkserver stops
+    :param modules: the modules to import before forking
+    """
+    import fcntl  # noqa: PLC0415
+
+    with Path(f"{path}.lock").open("a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        for module in modules:
+            _preload(module)
+        # SIGCHLD wakes up the select loop to report the exit codes of the children
+        wakeup_read_fd, wakeup_write_fd = os.pipe()
+        os.set_blocking(wakeup_write_fd, False)
+        signal.set_wakeup_fd(wakeup_write_fd)
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+        Path(path).unlink(missing_ok=True)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(path)
+            Path(path).chmod(0o600)
+            server.listen()
+            try:
+                _serve(server, wakeup_read_fd, idle_timeout, [lock.fileno(), wakeup_read_fd, wakeup_write_fd])
+            finally:
+                Path(path).unlink(missing_ok=True)
+
+
+def _preload(module: str) -> None:
+    import importlib  # noqa: PLC0415
+
+    try:
+        importlib.import_module(module)
+    except Exception:  # noqa: BLE001
+        # the scripts fail when they import it
+        logger.warning("Could not preload %s", module, exc_info=True)
+
+
+def _serve(server: socket.socket, wakeup_read_fd: int, idle_timeout: float, private_fds: list[int]) -> None:
+    children = {}
+    listening = True
+    while listening or children:
+        readable, _, _ = select.select(
+            [server, wakeup_read_fd] if listening else [wakeup_read_fd], [], [], None if children else idle_timeout
+        )
+        if not readable:
+            return
+        if wakeup_read_fd in readable:
+            os.read(wakeup_read_fd, 1024)
+            _reap(children)
+        if server in readable:
+            connection, _ = server.accept()
+            connection.settimeout(REQUEST_TIMEOUT)
+            fds = []
+            try:
+                message, fds, _, _ = socket.recv_fds(connection, 1, len(STDIO_FDS))
+                request = _read_message(connection, bytearray()) if message == b"r" else None
+                if request and len(fds) == len(STDIO_FDS):
+                    children[_fork(connection, fds, request[0], [server.fileno(), *private_fds])] = connection
+                    continue
+                # a stop request: finish the running scripts, but don't accept new ones
+                listening = message != b"s"
+            except (OSError, ValueError):
+                logger.debug("Invalid request", exc_info=True)
+            finally:
+                for fd in fds:
+                    os.close(fd)
+            connection.close()
+
+
+def _fork(connection: socket.socket, fds: list[int], request: dict, private_fds: list[int]) -> int:
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        connection.sendall(json.dumps({"pid": pid}).encode() + b"\n")
+        return pid
+    returncode = 1
+    try:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        connection.close()
+        for fd in private_fds:
+            os.close(fd)
+        for target, fd in zip(STDIO_FDS, fds):
+            os.dup2(fd, target)
+        returncode = _run_script(request["argv"], request["cwd"], request["env"])
+    finally:
+        os._exit(returncode)
+
+
+def _run_script(argv: list[str], cwd: str, env: dict) -> int:
+    import atexit  # noqa: PLC0415
+    import runpy  # noqa: PLC0415
+    import traceback  # noqa: PLC0415
+
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(env)
+    sys.argv = list(argv)
+    sys.path[0] = str(Path(argv[0]).parent.absolute())
+    sys.stdin = open(0, closefd=False)  # noqa: SIM115
+    sys.stdout = open(1, "w", buffering=1 if os.isatty(1) else -1, closefd=False)  # noqa: SIM115
+    sys.stderr = open(2, "w", buffering=1, closefd=False)  # noqa: SIM115
+    try:
+        runpy.run_path(argv[0], run_name="__main__")
+        returncode = 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            returncode = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            returncode = 1
+    except BaseException:  # noqa: BLE001
+        traceback.print_exc()
+        returncode = 1
+    atexit._run_exitfuncs()  # noqa: SLF001
+    sys.stdout.flush()
+    sys.stderr.flush()
+    return returncode
+
+
+def _reap(children: dict) -> None:
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if not pid:
+            return
+        connection = children.pop(pid, None)
+        if connection:
+            with connection:
+                try:
+                    connection.sendall(json.dumps({"returncode": os.waitstatus_to_exitcode(status)}).encode() + b"\n")
+                except OSError:
+                    logger.debug("Could not report the exit code of %s", pid, exc_info=True)
+
+
+def _connect(path: str, wait: float) -> Optional[socket.socket]:
+    deadline = time.monotonic() + wait
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except OSError:
+            sock.close()
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.02)
+        else:
+            return sock
+
+
+def _read_message(sock: socket.socket, buffer: bytearray) -> Optional[tuple[dict, bytearray]]:
+    """Read a json line from the socket.
+
+    :return: the message and the data that was received after it, or None if the connection was closed
+    """
+    while b"\n" not in buffer:
+        data = sock.recv(65536)
+        if not data:
+            return None
+        buffer += data
+    line, _, rest = bytes(buffer).partition(b"\n")
+    return json.loads(line), bytearray(rest)
+
+
+def _kill(pid: int, sig: int) -> None:
+    try:
+        os.kill(pid, sig)
+    except OSError:
+        logger.debug("Could not signal %s", pid, exc_info=True)
+
+
+if __name__ == "__main__":
+    # the first entry of sys.path is the working directory (-c): preload the modules like the scripts import them
+    sys.path[0] = sys.argv[3]
+    serve(sys.argv[1], float(sys.argv[2]), sys.argv[4:])
@@ -0,0 +1,179 @@
+"""Expands the references between aliases into a graph that runs in a single pyprojectx process.
+
+An alias command that starts with references to other aliases or scripts (`@install && @check && ...`) doesn't
+need to start pyprojectx again for each reference: the referenced aliases are expanded in the same process instead,
+and each alias or script runs at most once per invocation, even if several aliases reference it. Commands that
+precede a reference could change its working directory or environment (`cd docs && @build`), so the shell still
+runs these as before, just like references to aliases with `inputs`, `outputs` or `cache`, which are skipped when
+they are up-to-date or restored from the cache.
+"""
+
+import re
+from dataclasses import dataclass, field, replace
+from typing import Union
+
+from pyprojectx.plan import PlannedCommand, alias_full_cmd, plan_commands, starts_pyprojectx
+from pyprojectx.wrapper.pw import BLUE, CYAN, RESET
+
+# a reference that is followed by '&&' or ends the command
+REFERENCE_RE = re.compile(r"\s*(?:pw@\s*|@)([\w-]+)\s*(?:&&\s*|$)")
+
+
+@dataclass
+class AliasNode:
+    """An alias, script or command with the steps that it runs: other nodes or commands.
+
+    :param name: the name of the alias or script, or the command
+    :param args: the arguments that are passed to the alias, script or command
+    :param steps: the referenced nodes and the commands, in the order in which they run
+    :param duplicate: True if the node already runs earlier in the graph, so it doesn't run again
+    :param parallel: the maximum number of steps that run concurrently, 0 to run them one after the other
+    :param prefix: prefix each line of output of a concurrent step with its name
+    :param group: True for the steps of one command of a parallel alias, which run one after the other
+    """
+
+    name: str
+    args: tuple[str, ...] = ()
+    steps: list[Union["AliasNode", PlannedCommand]] = field(default_factory=list)
+    duplicate: bool = False
+    parallel: int = 0
+    prefix: bool = True
+    group: bool = False
+
+    @property
+    def key(self) -> tuple[str, tuple[str, ...]]:
+        """The alias or script name and its arguments: a node with the same key runs only once."""
+        return self.name, self.args
+
+    def commands(self) -> list[PlannedCommand]:
+        """Return all the commands of the graph in the order in which they run, each node only once."""
+        if self.duplicate:
+            return []
+        commands = []
+        for step in self.steps:
+            commands.extend(step.commands() if isinstance(step, AliasNode) else [step])
+        return commands
+
+    def has_parallel_steps(self) -> bool:
+        """Check whether any node of the graph runs its steps concurrently."""
+        return not self.duplicate and (
+            bool(self.parallel) or any(isinstance(step, AliasNode) and step.has_parallel_steps() for step in self.steps)
+        )
+
+    def max_parallel(self) -> int:
+        """Return the highest maximum concurrency of the nodes of the graph, 1 if none runs its steps concurrently."""
+        if self.duplicate:
+            return 1
+        nested = (step.max_parallel() for step in self.steps if isinstance(step, AliasNode))
+        return max(self.parallel, 1, *nested)
+
+    def contexts(self) -> list[str]:
+        """Return the tool contexts that the commands of the graph need, in the order in which they are needed."""
+        return list(dict.fromkeys(command.ctx for command in self.commands() if command.ctx))
+
+    def format(self, indent: str = "") -> list[str]:
+        """Format the graph as an indented tree, one line per node or command."""
+        # the root is the alias that runs, the other nodes are references
+        name = f"@{self.name}" if indent and not self.group else self.name
+        args = "".join(f' "{arg}"' for arg in self.args)
+        if self.duplicate:
+            return [f"{indent}{name}{args} {BLUE}(already runs before){RESET}"]
+        parallel = f" {BLUE}(parallel, at most {self.parallel} at a time){RESET}" if self.parallel else ""
+        lines = [f"{indent}{name}{args}{parallel}"]
+        for step in self.steps:
+            if isinstance(step, AliasNode):
+                lines.extend(step.format(f"{indent}  "))
+            else:
+                cmd = step.cmd if isinstance(step.cmd, str) else " ".join(str(part) for part in step.cmd)
+                ctx = f" {BLUE}in {CYAN}{step.ctx}{RESET}" if step.ctx else ""
+                lines.append(f"{indent}  {cmd}{ctx}")
+        return lines
+
+
+def has_references(config, name: str) -> bool:
+    """Check whether any command of an alias starts with a reference to another alias or script."""
+    return any(split_references(alias_cmd.cmd, config)[0] for alias_cmd in config.get_alias(name))
+
+
+def split_references(cmd: str, config) -> tuple[list[str], str]:
+    """Split the references to aliases and scripts at the start of a command from the rest of the command.
+
+    :param cmd: the alias command, f.e. '@install && @check && uv build'
+    :param config: the config of the project
+    :return: the referenced names and the rest of the command, f.e. (['install', 'check'], 'uv build')
+    """
+    references = []
+    pos = 0
+    while match := REFERENCE_RE.match(cmd, pos):
+        name = match.group(1)
+        if not config.is_alias(name) and not config.is_script(name):
+            break
+        if any(alias_cmd.fingerprinted or alias_cmd.python for alias_cmd in config.get_alias(name)):
+            # the up-to-date check, the cache and the python matrix of the alias run in its own pyprojectx process
+            break
+        references.append(name)
+        pos = match.end()
+    return references, cmd[pos:].strip()
+
+
+def build_graph(config, name: str, args: list[str], pw_args: list[str]) -> AliasNode:
+    """Expand an alias, a script or a command into a graph, without running or installing anything.
+
+    :param config: the config of the project
+    :param name: the full (not abbreviated) name of an alias or a script, or the command to run in a tool context
+    :param args: the arguments that are passed to the alias, script or command
+    :param pw_args: the pyprojectx arguments before the command, used for references that can't be expanded
+    :raise Warning: if aliases reference each other in a cycle
+    """
+    return _GraphBuilder(config, pw_args).expand(name, tuple(args), {})
+
+
+class _GraphBuilder:
+    def __init__(self, config, pw_args: list[str]) -> None:
+        self.config = config
+        self.pw_args = pw_args
+        self.planned = set()
+        self.path = []
+
+    def expand(self, name: str, args: tuple[str, ...], env: dict) -> AliasNode:
+        key = (name, args)
+        if key in self.path:
+            cycle = " -> ".join([*(ref for ref, _ in self.path[self.path.index(key) :]), name])
+            msg = f"Circular alias reference: {cycle}"
+            raise Warning(msg)
+        node = AliasNode(name, args)
+        if key in self.planned:
+            node.duplicate = True
+            return node
+        self.planned.add(key)
+        self.path.append(key)
+        alias_cmds = self.config.get_alias(name)
+        if not alias_cmds:
+            commands = plan_commands(self.config, name, self.pw_args, list(args))
+            node.steps = [replace(command, env={**env, **command.env}) for command in commands]
+        elif alias_cmds[0].parallel:
+            node.parallel, node.prefix = alias_cmds[0].parallel, alias_cmds[0].prefix
+        for alias_cmd in alias_cmds:
+            steps = self._expand_alias_cmd(alias_cmd, args, env)
+            if node.parallel and len(steps) > 1:
+                # the parts of a command that are combined with '&&' run one after the other
+                node.steps.append(AliasNode(alias_cmd.cmd, steps=steps, group=True))
+            else:
+                node.steps.extend(steps)
+        self.path.pop()
+        return node
+
+    def _expand_alias_cmd(self, alias_cmd, args: tuple[str, ...], env: dict) -> list[Union[AliasNode, PlannedCommand]]:
+        steps = []
+        references, rest = split_references(alias_cmd.cmd, self.config)
+        alias_env = {**env, **self.config.env, **alias_cmd.env}
+        for index, reference in enumerate(references):
+            # like in a shell, the arguments are appended to the last part of the command
+            ref_args = args if not rest and index == len(references) - 1 else ()
+            steps.append(self.expand(reference, ref_args, alias_env))
+        if rest:
+            rest_cmd = replace(alias_cmd, cmd=rest)
+            full_cmd, cmd_env = alias_full_cmd(rest_cmd, self.pw_args, list(args), self.config)
+            nested = starts_pyprojectx(rest, self.config)
+            steps.append(PlannedCommand(full_cmd, alias_cmd.ctx, {**env, **cmd_env}, alias_cmd.cwd, nested))
+        return steps
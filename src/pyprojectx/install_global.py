@@ -1,6 +1,6 @@
 import os
-import shutil
 import sys
+from importlib import resources
 from pathlib import Path
 
 import userpath
@@ -26,14 +26,15 @@ def install_px(options):
     """Install the global px and pxg scripts in your home directory."""
     install_dir = HOME_DIR / DEFAULT_INSTALL_DIR
     global_dir = install_dir / "global"
-    wrapper_dir = Path(__file__).parent / "wrapper"
+    # read the wrapper scripts as resources: pyprojectx may run from a zipapp
+    wrapper_dir = resources.files("pyprojectx.wrapper")
     logger.debug("creating global directory %s", global_dir)
     global_dir.mkdir(parents=True, exist_ok=True)
 
-    target_pw = global_dir / "pw"
-    shutil.copy2(wrapper_dir / "pw.py", target_pw)
-    for file in wrapper_dir.glob("px*"):
-        shutil.copy2(file, install_dir)
+    _copy_script(wrapper_dir / "pw.py", global_dir / "pw")
+    for file in wrapper_dir.iterdir():
+        if file.name.startswith("px"):
+            _copy_script(file, install_dir / file.name)
 
     if not (global_dir / "pyproject.toml").exists():
         with (global_dir / "pyproject.toml").open("w", encoding="utf-8") as f:
@@ -67,6 +68,11 @@ def install_px(options):
     )
 
 
+def _copy_script(source, target: Path):
+    target.write_bytes(source.read_bytes())
+    target.chmod(0o755)
+
+
 def ensure_path(location: Path):
     global_path = str(location.parent.absolute())
     try:
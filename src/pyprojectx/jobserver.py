@@ -0,0 +1,153 @@
+"""A GNU make compatible jobserver that limits the number of commands that run at the same time.
+
+The top-level pyprojectx process that runs a parallel alias creates a named pipe with one token per job (minus the
+implicit token that every process has) and exports it in MAKEFLAGS with `--jobserver-auth=fifo:<path>`, like
+GNU make 4.4 does. Nested pyprojectx processes, and make itself, borrow tokens from it before they start another
+concurrent command, so that all levels together never run more than PYPROJECTX_JOBS jobs (by default the maximum
+concurrency of the parallel aliases of the top-level command). When pyprojectx itself runs under make, it borrows
+tokens from the jobserver of make instead.
+"""
+
+import os
+import select
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from pyprojectx.log import logger
+
+PYPROJECTX_JOBS_ENV_VAR = "PYPROJECTX_JOBS"
+MAKEFLAGS_ENV_VAR = "MAKEFLAGS"
+JOBSERVER_AUTH = "--jobserver-auth="
+TOKEN = b"+"
+
+
+class JobServer:
+    """The client side of a jobserver: a pipe to borrow tokens from and to return them to."""
+
+    def __init__(self, read_fd: int, write_fd: int, pass_fds: tuple[int, ...] = ()) -> None:
+        """Construct a JobServer.
+
+        :param read_fd: the file descriptor to read tokens from
+        :param write_fd: the file descriptor to return tokens to
+        :param pass_fds: the file descriptors that child processes need to inherit to use the jobserver
+        """
+        self.read_fd = read_fd
+        self.write_fd = write_fd
+        self.pass_fds = pass_fds
+        self._lock = threading.Lock()
+        self._implicit_token_free = True
+        # wakes up the threads that wait for a token from the pipe when the implicit token is released
+        self._wakeup_read_fd, self._wakeup_write_fd = os.pipe()
+
+    def acquire(self) -> Optional[bytes]:
+        """Wait for a job slot: the implicit token of this process if it is free, else a token from the pipe.
+
+        :return: the token to release, None for the implicit token
+        """
+        while True:
+            with self._lock:
+                if self._implicit_token_free:
+                    self._implicit_token_free = False
+                    return None
+            readable, _, _ = select.select([self.read_fd, self._wakeup_read_fd], [], [])
+            if self._wakeup_read_fd in readable:
+                os.read(self._wakeup_read_fd, 1)
+            else:
+                # another process may take the token first, then this waits for the next one
+                return os.read(self.read_fd, 1)
+
+    def release(self, token: Optional[bytes]) -> None:
+        """Return a token that was acquired."""
+        if token is None:
+            with self._lock:
+                self._implicit_token_free = True
+            os.write(self._wakeup_write_fd, TOKEN)
+        else:
+            os.write(self.write_fd, token)
+
+    def close(self) -> None:
+        """Close the file descriptors that this client opened."""
+        os.close(self._wakeup_read_fd)
+        os.close(self._wakeup_write_fd)
+
+
+def jobs(default: int) -> int:
+    """Return the total number of jobs: PYPROJECTX_JOBS, or the default if it isn't set."""
+    try:
+        return max(1, int(os.environ.get(PYPROJECTX_JOBS_ENV_VAR, "")))
+    except ValueError:
+        return default
+
+
+@contextmanager
+def jobserver(default_jobs: int) -> Iterator[Optional[JobServer]]:
+    """Use the jobserver of a parent process, or create one for the child processes while the context is active.
+
+    :param default_jobs: the total number of jobs of a new jobserver if PYPROJECTX_JOBS isn't set
+    :return: the jobserver, or None if the platform doesn't support named pipes
+    """
+    inherited = _inherit()
+    if inherited:
+        try:
+            yield inherited
+        finally:
+            inherited.close()
+            if not inherited.pass_fds:
+                os.close(inherited.read_fd)
+        return
+    if not hasattr(os, "mkfifo"):
+        yield None
+        return
+    import shutil  # noqa: PLC0415
+    import tempfile  # noqa: PLC0415
+
+    total = jobs(default_jobs)
+    tmp_dir = Path(tempfile.mkdtemp(prefix="pyprojectx-jobserver-"))
+    fifo = tmp_dir / "fifo"
+    os.mkfifo(fifo, 0o600)
+    # read-write, so that opening doesn't block and reading blocks until a token is returned
+    fd = os.open(fifo, os.O_RDWR)
+    js = JobServer(fd, fd)
+    environ = {key: os.environ.get(key) for key in (MAKEFLAGS_ENV_VAR, PYPROJECTX_JOBS_ENV_VAR)}
+    try:
+        os.write(fd, TOKEN * (total - 1))
+        makeflags = os.environ.get(MAKEFLAGS_ENV_VAR, "")
+        os.environ[MAKEFLAGS_ENV_VAR] = f"{makeflags} -j{total} {JOBSERVER_AUTH}fifo:{fifo}".strip()
+        os.environ[PYPROJECTX_JOBS_ENV_VAR] = str(total)
+        logger.debug("Started a jobserver with %s jobs: %s", total, fifo)
+        yield js
+    finally:
+        for key, value in environ.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        js.close()
+        os.close(fd)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _inherit() -> Optional[JobServer]:
+    auth = None
+    for flag in os.environ.get(MAKEFLAGS_ENV_VAR, "").split():
+        # the last one wins, like in make; older versions of make use --jobserver-fds
+        if flag.startswith((JOBSERVER_AUTH, "--jobserver-fds=")):
+            auth = flag.split("=", 1)[1]
+    if not auth or os.name != "posix":
+        # make on Windows uses a semaphore instead of a pipe
+        return None
+    try:
+        if auth.startswith("fifo:"):
+            fd = os.open(auth[len("fifo:") :], os.O_RDWR)
+            return JobServer(fd, fd)
+        read_fd, write_fd = (int(fd) for fd in auth.split(","))
+        os.fstat(read_fd)
+        os.fstat(write_fd)
+        return JobServer(read_fd, write_fd, pass_fds=(read_fd, write_fd))
+    except (OSError, ValueError):
+        # f.e. when make didn't pass the jobserver to this (not recursive) command
+        logger.debug("Ignoring the unavailable jobserver %s", auth)
+        return None
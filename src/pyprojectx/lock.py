@@ -1,15 +1,23 @@
+import hashlib
+import os
 import re
 import subprocess
 import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
 
-import tomlkit
-
-from pyprojectx.config import Config
-from pyprojectx.env import UV_EXE
+from pyprojectx.config import Config, read_toml
+from pyprojectx.env import uv_exe
 from pyprojectx.hash import calculate_hash
+from pyprojectx.log import logger
 from pyprojectx.wrapper import pw
 
 EDITABLE_REGEX = re.compile(r"^--?e")
+# with the lock-shards option, the locked requirements of each context are in pw.lock.d/<ctx>.lock
+SHARDS_DIR_SUFFIX = ".d"
+SHARD_SUFFIX = ".lock"
 
 
 def can_lock(requirements_config: dict) -> bool:
@@ -31,36 +39,256 @@ def get_or_update_locked_requirements(ctx: str, config: Config, quiet) -> tuple[
     :param quiet: Whether to suppress output
     :return: A tuple with the contents of the requirements dictionary and a bool whether the requirements were updated.
     """
+    locked_requirements = get_locked_requirements(ctx, config)
+    if locked_requirements is not None:
+        return locked_requirements, False
+
     requirements = config.get_requirements(ctx)
-    lf = config.lock_file
+    previous = (read_lock_data(config) or {}).get(ctx, {})
+    locked_ctx = {
+        # the other items of the context are kept, but not the ones of an entry in the index of the shards
+        **(previous if "requirements" in previous else {}),
+        "requirements": _freeze(ctx, requirements, config.lock_python_version, config.prerelease, quiet),
+        "hash": calculate_hash(requirements),
+    }
+    post_install = requirements.get("post-install")
+    if post_install:
+        locked_ctx["post-install"] = post_install
+    get_lock_state(config).update(ctx, locked_ctx)
+    return locked_ctx, True
 
-    if not lf.exists() or not can_lock(requirements):
-        return requirements, False
 
-    with lf.open(encoding="utf-8") as f:
-        toml = tomlkit.load(f)
+def get_locked_requirements(ctx: str, config: Config) -> Optional[dict]:
+    """Get the requirements of a context as they are locked, without updating the lock file.
+
+    :param ctx: The context name
+    :param config: The config object
+    :return: The requirements dictionary, or None if the locked requirements are outdated.
+    """
+    requirements = config.get_requirements(ctx)
+    if not can_lock(requirements):
+        return requirements
+    lock_data = read_lock_data(config)
+    if lock_data is None:
+        return requirements
 
-    if ctx not in toml:
-        toml[ctx] = tomlkit.table()
-    lf_toml_ctx = toml[ctx]
+    locked_ctx = lock_data.get(ctx, {})
     requirements_hash = calculate_hash(requirements)
-    if lf_toml_ctx.get("hash") == requirements_hash:
-        locked_requirements = lf_toml_ctx.get("requirements")
-        return {**requirements, "requirements": locked_requirements}, False
+    if (
+        "requirements" not in locked_ctx
+        and (locked_ctx or config.lock_shards)
+        and locked_ctx.get("hash", requirements_hash) == requirements_hash
+    ):
+        # only the shard of this context is read; its index entry may be missing after concurrent updates
+        locked_ctx = _read_shard(config, ctx) or {}
+        if locked_ctx:
+            lock_data[ctx] = locked_ctx
+    if locked_ctx.get("hash") == requirements_hash:
+        return {**requirements, "requirements": locked_ctx.get("requirements")}
+    return None
 
-    locked_requirements = _freeze(ctx, requirements, config.lock_python_version, config.prerelease, quiet)
-    lf_toml_ctx["requirements"] = locked_requirements
-    lf_toml_ctx["hash"] = requirements_hash
-    post_install = requirements.get("post-install")
-    if post_install:
-        lf_toml_ctx["post-install"] = post_install
-    with lf.open("w", encoding="utf-8", newline="") as f:
-        tomlkit.dump(toml, f)
-    return lf_toml_ctx, True
+
+def read_lock_data(config: Config, complete=False):
+    """Return the content of the lock file, parsing it only once per config.
+
+    With lock shards, the lock file is an index with the hash of each context and the locked requirements of a
+    context are only read from its shard when they are needed (see get_locked_requirements).
+    Reading never changes the lock file: both layouts are read, whatever the lock-shards option is. The lock file is
+    only migrated to the layout of the option when it is written (see LockState.flush).
+    :param config: The config object
+    :param complete: whether to read all shards, f.e. to store the lock data in the configuration cache
+    :return: the lock file content as a dictionary or None if there is no lock file
+    """
+    if config.lock_data is None and config.lock_file.exists():
+        config.lock_data = read_toml(config.lock_file)
+    if complete and config.lock_data:
+        for ctx, locked_ctx in config.lock_data.items():
+            if "requirements" not in locked_ctx:
+                config.lock_data[ctx] = _read_shard(config, ctx) or locked_ctx
+    return config.lock_data
+
+
+def reset_lock(config: Config) -> None:
+    """Replace the lock file (and its shards) with an empty one, to lock all contexts again."""
+    import shutil  # noqa: PLC0415
+
+    shutil.rmtree(_shards_dir(config), ignore_errors=True)
+    config.lock_file.unlink(missing_ok=True)
+    config.lock_file.touch()
+    config.lock_data = None
+
+
+class LockState:
+    """The changes to the lock file of a project that were not written yet.
+
+    The lock file is parsed only once per process (read-only, see read_lock_data) and the locked requirements of
+    the contexts are looked up in the parsed data. Updates are applied to that data right away, but written to the
+    lock file only when they are flushed: immediately, or once at the end of a batch that locks several contexts.
+    """
+
+    def __init__(self, config: Config) -> None:
+        """Construct a LockState.
+
+        :param config: the config of the project, which holds the parsed lock data
+        """
+        self._config = config
+        self._updates = {}
+        self._batches = 0
+
+    def update(self, ctx: str, locked_ctx: dict) -> None:
+        """Replace the locked requirements of a context, and write them unless a batch is running."""
+        self._config.lock_data = {**(read_lock_data(self._config) or {}), ctx: locked_ctx}
+        self._updates[ctx] = locked_ctx
+        if not self._batches:
+            self.flush()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Write all the updates once, at the end of the batch (also when the batch fails)."""
+        self._batches += 1
+        try:
+            yield
+        finally:
+            self._batches -= 1
+            if not self._batches:
+                self.flush()
+
+    def flush(self) -> None:
+        """Write the updates to the lock file (and shards), atomically, keeping the formatting of the others.
+
+        The lock file is migrated to the layout of the lock-shards option first. Processes that lock other contexts
+        at the same time update the lock file one after the other, so that they don't drop each other's entries.
+        """
+        if not self._updates:
+            return
+        import tomlkit  # noqa: PLC0415
+
+        config = self._config
+        with _index_lock(config):
+            toml = _load_document(config.lock_file)
+            migrated = _migrate(config, toml)
+            for ctx, locked_ctx in self._updates.items():
+                if config.lock_shards:
+                    shard = _shard_path(config, ctx)
+                    shard_toml = _load_document(shard)
+                    _set_items(shard_toml, locked_ctx)
+                    toml[ctx] = _index_entry(locked_ctx["hash"], _write_document(shard, shard_toml))
+                else:
+                    if ctx not in toml:
+                        toml[ctx] = tomlkit.table()
+                    _set_items(toml[ctx], locked_ctx)
+            _write_document(config.lock_file, toml)
+            if migrated and not config.lock_shards:
+                import shutil  # noqa: PLC0415
+
+                shutil.rmtree(_shards_dir(config), ignore_errors=True)
+        self._updates.clear()
+        if migrated:
+            # the parsed lock data may refer to shards that moved
+            config.lock_data = None
+
+
+def get_lock_state(config: Config) -> LockState:
+    """Return the lock state of a config, which is shared by all the lock operations of this process."""
+    if config.lock_state is None:
+        config.lock_state = LockState(config)
+    return config.lock_state
+
+
+def _shards_dir(config: Config) -> Path:
+    return config.lock_file.with_name(f"{config.lock_file.name}{SHARDS_DIR_SUFFIX}")
+
+
+def _shard_path(config: Config, ctx: str) -> Path:
+    return _shards_dir(config) / f"{ctx}{SHARD_SUFFIX}"
+
+
+def _read_shard(config: Config, ctx: str) -> Optional[dict]:
+    try:
+        return read_toml(_shard_path(config, ctx))
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def _index_lock(config: Config) -> Iterator[None]:
+    """Hold an exclusive lock on the lock file of a project, across processes, while it is updated.
+
+    The lock file itself is replaced when it is written, so a separate file in the temp directory is locked.
+    """
+    import tempfile  # noqa: PLC0415
+
+    key = hashlib.md5(str(config.lock_file.resolve()).encode()).hexdigest()
+    with pw._acquire_lock(Path(tempfile.gettempdir()) / f"pyprojectx-{key}.lock"):  # noqa: SLF001
+        yield
+
+
+def _migrate(config: Config, toml) -> bool:
+    """Move the locked requirements between the lock file and the shards when the lock-shards option changed.
+
+    All the items of the contexts are moved as they are, so that migrating back and forth is lossless.
+    :param toml: the document of the lock file, which is migrated in place; the caller writes it
+    :return: whether the lock file was migrated
+    """
+    # the contexts with their locked requirements in the lock file, instead of in a shard
+    unsharded = [ctx for ctx, locked_ctx in toml.items() if "requirements" in locked_ctx]
+    if config.lock_shards:
+        if not unsharded:
+            return False
+    elif len(unsharded) == len(toml) or not _shards_dir(config).is_dir():
+        return False
+    import tomlkit  # noqa: PLC0415
+
+    logger.info("Migrating %s to %s", config.lock_file, "shards" if config.lock_shards else "a single file")
+    if config.lock_shards:
+        for ctx in unsharded:
+            shard_toml = _load_document(_shard_path(config, ctx))
+            _set_items(shard_toml, toml[ctx])
+            toml[ctx] = _index_entry(toml[ctx]["hash"], _write_document(_shard_path(config, ctx), shard_toml))
+    else:
+        for shard in sorted(_shards_dir(config).glob(f"*{SHARD_SUFFIX}")):
+            table = tomlkit.table()
+            _set_items(table, _load_document(shard))
+            toml[shard.name[: -len(SHARD_SUFFIX)]] = table
+    return True
+
+
+def _index_entry(requirements_hash: str, digest: str):
+    import tomlkit  # noqa: PLC0415
+
+    entry = tomlkit.table()
+    entry["hash"] = requirements_hash
+    # changes whenever the shard changes, so that the caches that depend on the lock file are invalidated
+    entry["shard"] = digest
+    return entry
+
+
+def _set_items(target, items) -> None:
+    for key, value in items.items():
+        target[key] = value
+
+
+def _load_document(path: Path):
+    import tomlkit  # noqa: PLC0415
+
+    return tomlkit.parse(path.read_text(encoding="utf-8")) if path.exists() else tomlkit.document()
+
+
+def _write_document(path: Path, toml) -> str:
+    """Write a toml document atomically and return the digest of its content."""
+    import tomlkit  # noqa: PLC0415
+
+    content = tomlkit.dumps(toml)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_file.open("w", encoding="utf-8", newline="") as f:
+        f.write(content)
+    tmp_file.replace(path)
+    return hashlib.md5(content.encode()).hexdigest()
 
 
 def _freeze(ctx_name, requirements, lock_python_version, prerelease, quiet):
-    cmd = [UV_EXE, "pip", "compile", "--universal", "--no-annotate", "--no-header"]
+    cmd = [uv_exe(), "pip", "compile", "--universal", "--no-annotate", "--no-header"]
     if lock_python_version:
         cmd += ["--python-version", lock_python_version]
     if prerelease:
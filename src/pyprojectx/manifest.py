@@ -0,0 +1,156 @@
+"""Caches the compiled pyprojectx configuration, so that warm runs don't need to parse the toml file."""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from pyprojectx.completion import index_path, write_index
+from pyprojectx.config import Config
+from pyprojectx.lock import read_lock_data
+from pyprojectx.log import logger
+from pyprojectx.wrapper.pw import VERSION
+
+MANIFEST_VERSION = 4
+MANIFESTS_DIR = "manifests"
+# files modified this recently may still be modified within the resolution of their mtime
+RACY_INTERVAL_NS = 2_000_000_000
+
+
+def load_config(toml_path: Path, install_path: Path) -> Config:
+    """Load the config from the compiled manifest in the install dir, or parse the toml file and compile it.
+
+    The manifest is valid as long as the (size, mtime, inode) of the toml file, the lock file and the scripts dir
+    are unchanged. The completion index is written together with the manifest.
+    :param toml_path: The toml config file
+    :param install_path: The path to .pyprojectx
+    :return: the Config instance
+    """
+    manifest_file = get_manifest_path(toml_path, install_path)
+    manifest = _read_manifest(manifest_file)
+    if manifest:
+        reason = _invalidation_reason(manifest, toml_path)
+        if not reason:
+            logger.info("Manifest cache hit: %s", manifest_file)
+            config = Config(toml_path, state=manifest["config"])
+            config.set_scripts(manifest["scripts"])
+            config.set_name_trie(manifest["name_trie"])
+            config.lock_data = manifest["lock"]
+            if not index_path(install_path).exists():
+                write_index(config, install_path)
+            return config
+        logger.info("Manifest cache miss (%s): %s", reason, manifest_file)
+    else:
+        logger.info("Manifest cache miss (no manifest): %s", manifest_file)
+
+    config = Config(toml_path)
+    if toml_path.exists():
+        write_manifest(config, manifest_file)
+        write_index(config, install_path)
+    return config
+
+
+class ConfigCache:
+    """Keeps a loaded config in memory for processes that run many commands, f.e. a server or an API client."""
+
+    def __init__(self, toml_path: Path, install_path: Path) -> None:
+        """Construct a ConfigCache.
+
+        :param toml_path: The toml config file
+        :param install_path: The path to .pyprojectx
+        """
+        self.toml_path = toml_path
+        self.install_path = install_path
+        self._config = None
+        self._key = None
+
+    def get(self) -> Config:
+        """Return the config, which is reloaded when the toml file, the lock file or the scripts dir change."""
+        if self._config and self._key != compute_key(
+            self._config.toml_path, self._config.lock_file, self._config.scripts_path
+        ):
+            logger.info("Config files changed, reloading %s", self.toml_path)
+            self._config = None
+        if not self._config:
+            config = load_config(self.toml_path, self.install_path)
+            key = compute_key(config.toml_path, config.lock_file, config.scripts_path)
+            # files that were modified very recently may change again without changing their key
+            if is_racy(key):
+                return config
+            self._config, self._key = config, key
+        return self._config
+
+
+def write_manifest(config: Config, manifest_file: Path) -> None:
+    """Compile the config into a manifest file."""
+    key = compute_key(config.toml_path, config.lock_file, config.scripts_path)
+    if is_racy(key):
+        logger.debug("Not writing manifest: config files were modified too recently")
+        return
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "pyprojectx": VERSION,
+        "platform": sys.platform,
+        "toml": str(config.toml_path.absolute()),
+        "key": key,
+        "config": config.to_state(),
+        "scripts": config.get_scripts(),
+        "name_trie": config.get_name_trie(),
+        "lock": read_lock_data(config, complete=True),
+    }
+    tmp_file = manifest_file.with_name(f"{manifest_file.name}.{os.getpid()}.tmp")
+    try:
+        manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_text(json.dumps(manifest), encoding="utf-8")
+        tmp_file.replace(manifest_file)
+    except OSError:
+        logger.debug("Could not write manifest %s", manifest_file, exc_info=True)
+        tmp_file.unlink(missing_ok=True)
+
+
+def get_manifest_path(toml_path: Path, install_path: Path) -> Path:
+    toml_id = hashlib.md5(str(toml_path.absolute()).encode()).hexdigest()
+    return install_path / MANIFESTS_DIR / f"{toml_id}.json"
+
+
+def compute_key(toml_path: Path, lock_file: Path, scripts_path: Path) -> dict:
+    return {"toml": _stat(toml_path), "lock": _stat(lock_file), "scripts": _stat(scripts_path)}
+
+
+def _stat(path: Path) -> Optional[list[int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def is_racy(key: dict) -> bool:
+    now = time.time_ns()
+    return any(stat and now - stat[1] < RACY_INTERVAL_NS for stat in key.values())
+
+
+def _read_manifest(manifest_file: Path) -> Optional[dict]:
+    try:
+        with manifest_file.open("rb") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _invalidation_reason(manifest: dict, toml_path: Path) -> Optional[str]:
+    if (
+        manifest.get("version") != MANIFEST_VERSION
+        or manifest.get("pyprojectx") != VERSION
+        or manifest.get("platform") != sys.platform
+    ):
+        return "other pyprojectx version or platform"
+    if manifest.get("toml") != str(toml_path.absolute()):
+        return "other toml file"
+    state = manifest["config"]
+    if manifest["key"] != compute_key(toml_path, Path(state["lock_file"]), Path(state["scripts_path"])):
+        return "config files changed"
+    return None
@@ -0,0 +1,186 @@
+"""Runs an alias graph in which the commands of parallel aliases run concurrently.
+
+The steps of a parallel alias run in a thread pool that is limited to the maximum concurrency of the alias. When a
+command fails, all running commands are killed (including the child processes of the concurrent ones) and no new
+commands are started; the exit code is the one of the first command that failed. Commands that don't run
+concurrently stay in the foreground process group of the terminal, so interactive tools keep working. The output of
+concurrent steps is prefixed with the name of the step, line by line, so that it stays readable.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Union
+
+from pyprojectx.graph import AliasNode
+from pyprojectx.jobserver import JobServer
+from pyprojectx.log import logger
+from pyprojectx.plan import PlannedCommand
+
+# composes the command, the environment and whether to use a shell for a planned command
+Prepare = Callable[[PlannedCommand], tuple[Union[str, list[str]], dict, bool]]
+
+
+class ParallelRunner:
+    """Runs all the steps of an alias graph, each node once, the steps of parallel aliases concurrently."""
+
+    def __init__(self, prepare: Prepare, jobserver: Optional[JobServer] = None) -> None:
+        """Construct a ParallelRunner.
+
+        :param prepare: composes the command, the environment and whether to use a shell for a planned command
+        :param jobserver: the jobserver to borrow a token from for each command, shared with child processes
+        """
+        self._prepare = prepare
+        self._jobserver = jobserver
+        self._lock = threading.Lock()
+        self._output_lock = threading.Lock()
+        # the running processes, and whether they run in a process group of their own
+        self._processes = {}
+        self._finished = {}
+        self._returncode = 0
+        self.cancelled = False
+
+    def run(self, graph: AliasNode) -> int:
+        """Run the graph.
+
+        :return: the exit code of the first command that failed, or 0
+        """
+        self._run_node(graph, None)
+        return self._returncode
+
+    def cancel(self) -> None:
+        """Stop the running commands and don't start new ones, f.e. when the files of a watched alias change."""
+        self.cancelled = True
+        self._fail(1)
+
+    def _run_node(self, node: AliasNode, label: Optional[str], concurrent: bool = False) -> None:
+        if node.duplicate:
+            # the node may still be running in a concurrent step
+            self._finished_event(node.key).wait()
+            return
+        try:
+            if node.parallel:
+                self._run_concurrently(node)
+            else:
+                for step in node.steps:
+                    if self._returncode:
+                        return
+                    self._run_step(step, label, concurrent=concurrent)
+        finally:
+            if not node.group:
+                self._finished_event(node.key).set()
+
+    def _run_concurrently(self, node: AliasNode) -> None:
+        logger.debug("Running %s steps of %s, at most %s at a time", len(node.steps), node.name, node.parallel)
+        concurrent = node.parallel > 1 and len(node.steps) > 1
+        # steps start in order, so a step never waits for a duplicate node in a step that didn't start yet
+        with ThreadPoolExecutor(max_workers=node.parallel, thread_name_prefix=node.name) as pool:
+            futures = [
+                pool.submit(self._run_step, step, _label(step) if node.prefix else None, concurrent)
+                for step in node.steps
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # stop the other steps (f.e. on Ctrl-C) before the pool waits for them
+                self._fail(1)
+                raise
+
+    def _run_step(self, step: Union[AliasNode, PlannedCommand], label: Optional[str], concurrent: bool = False) -> None:
+        if self._returncode:
+            return
+        if isinstance(step, AliasNode):
+            self._run_node(step, label, concurrent)
+        else:
+            self._run_command(step, label, concurrent)
+
+    def _run_command(self, command: PlannedCommand, label: Optional[str], concurrent: bool) -> None:
+        cmd, env, shell = self._prepare(command)
+        token = self._jobserver.acquire() if self._jobserver else None
+        try:
+            self._run_process(cmd, env, shell, command.cwd, label, concurrent)
+        finally:
+            if self._jobserver:
+                self._jobserver.release(token)
+
+    def _run_process(self, cmd, env, shell, cwd, label: Optional[str], concurrent: bool) -> None:  # noqa: PLR0913
+        logger.info("Running %s", cmd)
+        with self._lock:
+            if self._returncode:
+                return
+            proc = subprocess.Popen(
+                cmd,
+                env=env,
+                cwd=cwd,
+                shell=shell,
+                stdout=subprocess.PIPE if label else None,
+                stderr=subprocess.STDOUT if label else None,
+                text=True,
+                errors="replace",
+                # a process group that can be killed with all its child processes; commands that run one at a time
+                # stay in the foreground process group, so that they can read the terminal and receive Ctrl-C
+                start_new_session=concurrent and os.name == "posix",
+                pass_fds=self._jobserver.pass_fds if self._jobserver else (),
+            )
+            self._processes[proc] = concurrent
+        try:
+            if label:
+                for line in proc.stdout:
+                    text = line.rstrip("\n")
+                    self._write(f"[{label}] {text}\n")
+            returncode = proc.wait()
+        except KeyboardInterrupt:
+            self._fail(1)
+            raise
+        finally:
+            with self._lock:
+                self._processes.pop(proc, None)
+        if returncode and not self._returncode:
+            logger.info("%s failed with exit code %s, stopping the other commands", cmd, returncode)
+            self._fail(returncode)
+
+    def _write(self, line: str) -> None:
+        with self._output_lock:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+    def _fail(self, returncode: int) -> None:
+        with self._lock:
+            if not self._returncode:
+                self._returncode = returncode
+            for proc, group in self._processes.items():
+                _kill(proc, group)
+            # release the duplicate nodes that wait for a node that will not run anymore
+            for event in self._finished.values():
+                event.set()
+
+    def _finished_event(self, key) -> threading.Event:
+        with self._lock:
+            event = self._finished.get(key)
+            if not event:
+                event = self._finished[key] = threading.Event()
+                if self._returncode:
+                    event.set()
+            return event
+
+
+def _label(step: Union[AliasNode, PlannedCommand]) -> str:
+    if isinstance(step, AliasNode):
+        return _label(step.steps[0]) if step.group and step.steps else step.name
+    # the command of an alias, or the last argument of the shell that runs it
+    words = str(step.cmd if isinstance(step.cmd, str) else step.cmd[-1]).split()
+    return words[0] if words else ""
+
+
+def _kill(proc: subprocess.Popen, group: bool) -> None:
+    try:
+        if group and os.name == "posix":
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            proc.terminate()
+    except OSError:
+        logger.debug("Could not kill process %s", proc.pid, exc_info=True)
@@ -0,0 +1,246 @@
+"""Plans the commands that pyprojectx runs for an alias, a script or a tool context command, without running them.
+
+This module is shared by the cli, the alias graph, the server and the Python API: it expands alias commands into
+planned commands, resolves the references to other aliases and scripts (`@alias`, `pw@alias`) into pyprojectx
+commands and parses the pyprojectx arguments. The API runs commands and installs tool contexts with dispatch and
+ensure_context, which hand over to the cli, so that it behaves exactly like `pw`.
+"""
+
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Union
+
+from pyprojectx.config import AliasCommand
+from pyprojectx.env import IsolatedVirtualEnv, exec_args
+from pyprojectx.lock import get_locked_requirements
+from pyprojectx.wrapper import pw
+
+alias_regex = re.compile(r"(pw)?@([\w-]+)")
+
+
+@dataclass
+class PlannedCommand:
+    """A command that pyprojectx runs, inside the virtual environment of ctx if set, else in a shell."""
+
+    cmd: Union[str, list[str]]
+    ctx: Optional[str]
+    env: dict[str, str] = field(default_factory=dict)
+    cwd: Optional[str] = None
+    # whether the command starts pyprojectx again (alias references), which then inherits the resolved state
+    nested: bool = False
+
+
+def parse_options(args: list[str]):
+    """Parse the pyprojectx arguments, without changing the logging configuration.
+
+    :param args: the pyprojectx arguments, without the pyprojectx script itself
+    :return: the options, with the command (cmd) and its arguments (cmd_args) split off
+    """
+    options = pw.get_options(args)
+    if options.command:
+        options.cmd, *options.cmd_args = options.command
+    else:
+        options.cmd = None
+        options.cmd_args = []
+    options.venvs_dir = options.install_path / "venvs"
+    options.state = None
+    # False when pyprojectx runs the command more than once, f.e. for batches of changed files
+    options.replace_process = True
+    return options
+
+
+def python_version(config, ctx: str, options) -> Optional[str]:
+    """Return the Python version of the venv of a tool context: --python, else the python option of the context."""
+    return options.python or config.get_python_version(ctx)
+
+
+def plan_commands(config, name: str, pw_args: list[str], cmd_args: list[str]) -> list[PlannedCommand]:
+    """Expand an alias, a script or a tool context command into the commands that it runs, without running them.
+
+    :param config: the config of the project
+    :param name: the full (not abbreviated) name of an alias or a script, or the command to run in a tool context
+    :param pw_args: the pyprojectx arguments before the command, used to resolve references to other aliases
+    :param cmd_args: the arguments that are passed to the alias, script or command
+    :return: the commands, or an empty list if there is nothing to run for the name
+    """
+    commands = []
+    for alias_cmd in config.get_alias(name):
+        full_cmd, alias_env = alias_full_cmd(alias_cmd, pw_args, cmd_args, config)
+        nested = starts_pyprojectx(alias_cmd.cmd, config)
+        commands.append(PlannedCommand(full_cmd, alias_cmd.ctx, alias_env, alias_cmd.cwd, nested))
+    if commands:
+        return commands
+    if config.is_script(name):
+        full_cmd = ["python", config.get_script_path(name), *cmd_args]
+        return [PlannedCommand(full_cmd, config.scripts_context, config.env, config.cwd)]
+    ctx = config.get_ctx_or_main(name)
+    if ctx:
+        return [PlannedCommand([name, *cmd_args], ctx, config.env, config.get_cwd())]
+    return []
+
+
+def resolve_command(argv: list[str], config, environ: dict) -> Optional[tuple[list[str], dict, str]]:  # noqa: PLR0911
+    """Resolve the command that argv would finally run, without running or installing anything.
+
+    Used by the pyprojectx server to hand over a command to its client.
+    :param argv: the pyprojectx arguments, including the pyprojectx script itself
+    :param config: the config of the project
+    :param environ: the environment of the client
+    :return: the exec arguments, the complete environment and the cwd of the command, or None if argv has side
+        effects or runs more than one command (installing or locking contexts, options, alias lists, aliases with
+        inputs or outputs, ...)
+    """
+    options = parse_options(argv[1:])
+    if not options.cmd or options.clean or options.force_install or options.upgrade:
+        return None
+    if (
+        options.info
+        or options.plan
+        or options.changed
+        or options.watch
+        or options.all
+        or options.add
+        or options.install_context
+        or options.env
+        or options.completion
+        or options.lock
+        or options.install_px
+    ):
+        return None
+    candidates = config.find_aliases_or_scripts(options.cmd)
+    if len(candidates) > 1:
+        return None
+    if candidates and any(
+        alias_cmd.fingerprinted or (alias_cmd.python and not options.python)
+        for alias_cmd in config.get_alias(candidates[0])
+    ):
+        # the up-to-date check, the cache, storing the fingerprint afterwards and python matrices need pyprojectx
+        return None
+    if candidates and not config.is_alias(candidates[0]) and config.get_preload_modules(config.scripts_context):
+        # scripts run in the forkserver of the scripts context
+        return None
+    pw_args = argv[: argv.index(options.cmd)]
+    commands = plan_commands(config, candidates[0] if candidates else options.cmd, pw_args, options.cmd_args)
+    if len(commands) != 1:
+        return None
+    command = commands[0]
+    if not command.ctx:
+        # same as running a command without venv in the cli
+        return exec_args(command.cmd, shell=True), {**environ, **command.env}, command.cwd
+    requirements = get_locked_requirements(command.ctx, config)
+    if requirements is None:
+        return None
+    venv = IsolatedVirtualEnv(
+        options.venvs_dir,
+        command.ctx,
+        requirements,
+        prerelease=config.prerelease,
+        python=python_version(config, command.ctx, options),
+    )
+    if not venv.is_installed:
+        return None
+    full_cmd, env, shell = venv.prepare(command.cmd, command.env, environ)
+    return exec_args(full_cmd, shell), env, command.cwd
+
+
+def dispatch(config, name: str, args: list[str], pw_args: list[str], options) -> int:
+    """Run an alias, a script or a tool context command in the current process, like `pw <name> <args>` does.
+
+    Up-to-date checks, the cache, python matrices and parallel steps are handled by the cli. The commands run in
+    subprocesses: the current process is never replaced.
+    :param config: the config of the project
+    :param name: the (possibly abbreviated) name of an alias or a script, or the command to run in a tool context
+    :param args: the arguments that are passed to the alias, script or command
+    :param pw_args: the pyprojectx arguments before the name, used to resolve references to other aliases
+    :param options: the options, see parse_options
+    :return: the exit code of the command that failed, else 0
+    """
+    from pyprojectx.cli import run_command  # noqa: PLC0415
+
+    options.cmd, options.cmd_args = name, list(args)
+    options.replace_process = False
+    try:
+        run_command(config, name, pw_args, options)
+    except SystemExit as e:
+        return _exit_code(e)
+    return 0
+
+
+def ensure_context(config, ctx: str, pw_args: list[str], options) -> IsolatedVirtualEnv:
+    """Lock the requirements of a tool context and install its virtual environment if needed, like the cli does.
+
+    :raise Warning: if the installation failed
+    """
+    from pyprojectx.cli import ensure_ctx  # noqa: PLC0415
+
+    try:
+        return ensure_ctx(config, ctx, {}, options, pw_args)
+    except SystemExit as e:
+        msg = f"Installation of '{ctx}' failed with exit code {_exit_code(e)}"
+        raise Warning(msg) from e
+
+
+def alias_full_cmd(
+    alias_cmd: AliasCommand, pw_args: list[str], cmd_args: list[str], config
+) -> tuple[Union[str, list[str]], dict]:
+    """Return the command line of an alias command, with its references resolved and the arguments appended.
+
+    :return: the command (a list if the alias has its own shell) and the environment variables of the alias
+    """
+    quoted_args = [f'"{a}"' for a in cmd_args]
+    full_cmd = " ".join([resolve_references(alias_cmd.cmd, pw_args, config), *quoted_args])
+    if alias_cmd.shell:
+        full_cmd = [alias_cmd.shell, "-c", full_cmd]
+    return full_cmd, {**config.env, **alias_cmd.env}
+
+
+def resolve_references(alias_cmd: str, pw_args: list[str], config) -> str:
+    """Resolve all @alias and pw@ references."""
+    alias_refs = alias_regex.findall(alias_cmd)
+    for optional_pw, alias in alias_refs:
+        if config.is_alias(alias) or config.is_script(alias):
+            alias_cmd = alias_cmd.replace(f"{optional_pw}@{alias}", f"pw@{alias}")
+    is_path = True
+    skip = False
+    absolute_pw_args = []
+    if pw_args and pw_args[0].endswith(".pyz"):
+        # the pyprojectx zipapp is not executable itself
+        absolute_pw_args.append(sys.executable)
+    for arg in pw_args:
+        if arg in ["-t", "--toml", "-i", "--install-dir"]:
+            is_path = True
+            absolute_pw_args.append(arg)
+        elif arg == "--install-context":
+            skip = True
+        elif is_path:
+            absolute_pw_args.append(str(Path(arg).absolute()))
+            is_path = False
+        elif skip:
+            skip = False
+        else:
+            absolute_pw_args.append(arg)
+    replacement = " ".join([_quote(arg) for arg in absolute_pw_args]) + " "
+    return alias_cmd.replace("pw@", replacement)
+
+
+def starts_pyprojectx(alias_cmd: str, config) -> bool:
+    """Check whether a command contains references that resolve_references replaces with a pyprojectx command."""
+    return any(
+        optional_pw or config.is_alias(alias) or config.is_script(alias)
+        for optional_pw, alias in alias_regex.findall(alias_cmd)
+    )
+
+
+def _exit_code(e: SystemExit) -> int:
+    if e.code is None or isinstance(e.code, int):
+        return e.code or 0
+    # a message instead of an exit code
+    return 1
+
+
+def _quote(arg):
+    if " " in arg:
+        return f'"{arg}"'
+    return arg
@@ -0,0 +1,163 @@
+"""A resident, per-project pyprojectx server that resolves commands for the pw wrapper script.
+
+The server keeps the config, the lock data and the scripts of a project in memory. pw sends it the pyprojectx
+arguments, the cwd and the environment over a Unix socket in the install dir, and execs the command line that
+the server returns, so that pyprojectx itself doesn't need to start. Anything that the server can't resolve without
+side effects, is answered with a fallback, after which pw runs pyprojectx as usual.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+from pyprojectx.log import logger
+from pyprojectx.manifest import ConfigCache
+from pyprojectx.plan import resolve_command
+from pyprojectx.wrapper import pw
+
+DEFAULT_IDLE_TIMEOUT = 900
+LOCK_FILE = "server.lock"
+REQUEST_TIMEOUT = 5
+
+
+class DispatchServer:
+    """Resolves commands on a Unix socket until no requests were received during the idle timeout."""
+
+    def __init__(self, toml_path: Path, install_path: Path, idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> None:
+        """Construct a DispatchServer.
+
+        :param toml_path: The toml config file of the project
+        :param install_path: The path to .pyprojectx
+        :param idle_timeout: The number of seconds without requests after which the server stops
+        """
+        self.toml_path = toml_path.absolute()
+        self.install_path = install_path.absolute()
+        self.idle_timeout = idle_timeout
+        self.socket_path = pw.server_socket_path(self.install_path)
+        self.pyprojectx_script = str(Path(sys.argv[0]).absolute())
+        self._config_cache = ConfigCache(self.toml_path, self.install_path)
+        self._stopped = False
+
+    def serve(self) -> None:
+        """Serve requests until the server is idle or until another pyprojectx version is used."""
+        if not self.socket_path:
+            logger.warning("The install dir path is too long for a Unix socket: %s", self.install_path)
+            return
+        lock = _try_lock(self.install_path / LOCK_FILE)
+        if not lock:
+            logger.info("A pyprojectx server is already running for %s", self.install_path)
+            return
+        try:
+            Path(self.socket_path).unlink(missing_ok=True)
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+                server.bind(self.socket_path)
+                Path(self.socket_path).chmod(0o600)
+                server.listen()
+                server.settimeout(self.idle_timeout)
+                logger.info("pyprojectx server listening on %s", self.socket_path)
+                try:
+                    self._accept_requests(server)
+                finally:
+                    Path(self.socket_path).unlink(missing_ok=True)
+        finally:
+            lock.close()
+
+    def _accept_requests(self, server: socket.socket) -> None:
+        while not self._stopped:
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                logger.info("pyprojectx server stopped after %s idle seconds", self.idle_timeout)
+                return
+            with connection:
+                connection.settimeout(REQUEST_TIMEOUT)
+                try:
+                    request = json.loads(b"".join(iter(lambda c=connection: c.recv(65536), b"")))
+                    connection.sendall(json.dumps(self.dispatch(request)).encode())
+                except (OSError, ValueError):
+                    logger.debug("Invalid request", exc_info=True)
+
+    def dispatch(self, request: dict) -> dict:
+        """Resolve the command for a request from pw.
+
+        :param request: the pyprojectx arguments (argv), the working directory (cwd) and the environment (env) of pw
+        :return: the arguments, environment and working directory to exec, or the reason to fall back to pyprojectx
+        """
+        argv, cwd, environ = request["argv"], request["cwd"], request["env"]
+        try:
+            # relative paths in the arguments and the config are relative to the working directory of the client
+            os.chdir(cwd)
+            if str(Path(argv[0]).absolute()) != self.pyprojectx_script:
+                self._stopped = True
+                return {"fallback": "another pyprojectx version is used, stopping the server"}
+            resolved = self._resolve(argv, environ)
+        except (Exception, SystemExit) as e:  # noqa: BLE001
+            logger.debug("Could not resolve %s", argv, exc_info=True)
+            return {"fallback": str(e)}
+        if not resolved:
+            return {"fallback": "the command can't be resolved without running pyprojectx"}
+        args, env, command_cwd = resolved
+        logger.info("Resolved %s: %s", argv, args)
+        return {"exec": args, "env": env, "cwd": command_cwd}
+
+    def _resolve(self, argv: list[str], environ: dict) -> Optional[tuple[list[str], dict, str]]:
+        config = self._config_cache.get()
+        if "-t" in argv or "--toml" in argv:
+            index = argv.index("-t") if "-t" in argv else argv.index("--toml")
+            if Path(argv[index + 1]).absolute() != self.toml_path:
+                return None
+        return resolve_command(argv, config, environ)
+
+
+def serve(options) -> None:
+    """Run the server for the project in the foreground."""
+    idle_timeout = float(os.environ.get(pw.PYPROJECTX_SERVER_IDLE_TIMEOUT_ENV_VAR, DEFAULT_IDLE_TIMEOUT))
+    DispatchServer(options.toml_path, options.install_path, idle_timeout).serve()
+
+
+def start_server(options) -> None:
+    """Start the server for the project in the background, unless it is already running."""
+    if os.name != "posix" or not pw.server_socket_path(options.install_path):
+        return
+    lock = _try_lock(options.install_path / LOCK_FILE)
+    if not lock:
+        return
+    lock.close()
+    logger.info("Starting a pyprojectx server for %s", options.install_path)
+    subprocess.Popen(
+        [
+            sys.executable,
+            str(Path(sys.argv[0]).absolute()),
+            "--toml",
+            str(options.toml_path.absolute()),
+            "--install-dir",
+            str(options.install_path.absolute()),
+            "--server",
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        cwd=options.install_path,
+        start_new_session=True,
+    )
+
+
+def _try_lock(lock_file: Path):
+    """Acquire the lock without waiting; closing the returned file releases it.
+
+    :return: the locked file or None if it is locked by another process
+    """
+    import fcntl  # noqa: PLC0415
+
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    f = lock_file.open("a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
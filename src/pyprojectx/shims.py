@@ -0,0 +1,132 @@
+"""Shims in _.pyprojectx/bin_ that run the tools of the tool contexts without starting pyprojectx.
+
+Each console script of a tool context gets a small shell script with the same name, that execs the console script
+in the virtual environment of the context. The shims of a context are written together with a stamp file, after
+pyprojectx verified the context against the lock file. As long as the stamp is newer than _pw.lock_ and
+_pyproject.toml_, a shim execs the tool right away; otherwise it lets pyprojectx install the context again, which
+rewrites the shims, and runs the rewritten shim. When several contexts contain the same tool, the main context wins,
+else the context that was installed first.
+"""
+
+import os
+import shlex
+from pathlib import Path
+
+from pyprojectx.config import MAIN
+from pyprojectx.log import logger
+
+SHIMS_DIR = "bin"
+STAMPS_DIR = ".stamps"
+SHIM_MARKER = "# pyprojectx shim of tool context "
+# set by a shim after it let pyprojectx refresh the shims, so that it doesn't check the stamp again
+REFRESHED_ENV_VAR = "PYPROJECTX_SHIM_REFRESHED"
+# scripts of the virtual environment itself, not of the tools that are installed in it
+VENV_SCRIPTS = {"activate", "deactivate", "pydoc", "python", "python3"}
+
+
+def is_up_to_date(install_path: Path, ctx: str, scripts_path: Path, watched: list[Path]) -> bool:
+    """Check if the shims of a tool context were written for its virtual environment after the watched files changed.
+
+    :param install_path: the path to .pyprojectx
+    :param ctx: the name of the tool context
+    :param scripts_path: the absolute scripts dir of the virtual environment of the context
+    :param watched: the files that make the shims stale when they change, f.e. pw.lock and pyproject.toml
+    """
+    stamp = _stamp(install_path, ctx)
+    stamped = _read_stamp(stamp)
+    return bool(stamped) and stamped[0] == str(scripts_path) and _is_newer(stamp, watched)
+
+
+def write_shims(install_path: Path, ctx: str, scripts_path: Path, fallback: list[str], watched: list[Path]) -> None:
+    """Write a shim for each console script of a tool context, and remove the shims of the scripts that it lost.
+
+    :param install_path: the path to .pyprojectx
+    :param ctx: the name of the tool context
+    :param scripts_path: the absolute scripts dir of the virtual environment of the context
+    :param fallback: the pyprojectx command (without the --install-context option) that a stale shim runs
+    :param watched: the files that make the shims stale when they change
+    """
+    shims_dir = install_path / SHIMS_DIR
+    stamp = _stamp(install_path, ctx)
+    logger.debug("Writing the shims of %s in %s", ctx, shims_dir)
+    stamp.parent.mkdir(parents=True, exist_ok=True)
+    previous = _read_stamp(stamp) or []
+    tools = console_scripts(scripts_path)
+    for tool in set(previous[1:]) - set(tools):
+        if _owner(shims_dir / tool) == ctx:
+            (shims_dir / tool).unlink(missing_ok=True)
+    for tool in tools:
+        if ctx == MAIN or _owner(shims_dir / tool) in (None, ctx):
+            _write(shims_dir / tool, _shim(ctx, scripts_path / tool, stamp, watched, fallback))
+    # the stamp is written last: it must be newer than the shims
+    _write(stamp, "\n".join([str(scripts_path), *tools]) + "\n")
+
+
+def console_scripts(scripts_path: Path) -> list[str]:
+    """Return the names of the console scripts of the tools in a virtual environment."""
+    try:
+        entries = sorted(os.scandir(scripts_path), key=lambda entry: entry.name)
+    except OSError:
+        return []
+    return [
+        entry.name
+        for entry in entries
+        if not Path(entry.name).suffix
+        and entry.name not in VENV_SCRIPTS
+        and entry.is_file()
+        and os.access(entry.path, os.X_OK)
+    ]
+
+
+def _shim(ctx: str, tool: Path, stamp: Path, watched: list[Path], fallback: list[str]) -> str:
+    # 'a -nt b' is also true when b doesn't exist
+    fresh = " && ".join(f"[ {shlex.quote(str(stamp))} -nt {shlex.quote(str(path))} ]" for path in watched)
+    install = shlex.join([*fallback, "--install-context", ctx])
+    return f"""#!/bin/sh
+{SHIM_MARKER}{ctx}
+if [ -n "${REFRESHED_ENV_VAR}" ] || {{ {fresh}; }}; then
+    exec {shlex.quote(str(tool))} "$@"
+fi
+{REFRESHED_ENV_VAR}=1 {install} >&2 && {REFRESHED_ENV_VAR}=1 exec "$0" "$@"
+"""
+
+
+def _stamp(install_path: Path, ctx: str) -> Path:
+    return install_path / SHIMS_DIR / STAMPS_DIR / ctx
+
+
+def _owner(shim: Path):
+    try:
+        with shim.open(encoding="utf-8") as f:
+            f.readline()
+            marker = f.readline().rstrip("\n")
+    except (OSError, UnicodeDecodeError):
+        return None
+    return marker[len(SHIM_MARKER) :] if marker.startswith(SHIM_MARKER) else None
+
+
+def _read_stamp(stamp: Path):
+    try:
+        return stamp.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+
+
+def _is_newer(stamp: Path, watched: list[Path]) -> bool:
+    stamp_mtime = stamp.stat().st_mtime_ns
+    # like 'test -nt', a file that doesn't exist is older
+    return all(_mtime(path) < stamp_mtime for path in watched)
+
+
+def _mtime(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _write(path: Path, content: str) -> None:
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_file.write_text(content, encoding="utf-8")
+    tmp_file.chmod(0o755)
+    tmp_file.replace(path)
@@ -0,0 +1,85 @@
+"""Passes the resolved state of a pyprojectx process on to the nested pyprojectx processes of its aliases.
+
+Aliases that reference other aliases (`@alias`, `pw@alias`) start pyprojectx again for each reference. The
+parent passes the key of the config files and the tool contexts that it verified (locked and installed) in the
+PYPROJECTX_STATE environment variable of these commands only, so that nested processes in the same project don't need
+to verify them again. The other commands, f.e. the tools, don't receive it, and a nested process removes it from its
+own environment. The state is ignored as soon as the toml file, the lock file or the scripts dir change.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from pyprojectx.log import logger
+from pyprojectx.manifest import compute_key, is_racy
+
+PYPROJECTX_STATE_ENV_VAR = "PYPROJECTX_STATE"
+
+
+class ResolvedState:
+    """The verified tool contexts of a project, valid as long as the config files are unchanged."""
+
+    def __init__(self, toml_path: Path, install_path: Path, key: dict, venvs: Optional[dict] = None) -> None:
+        """Construct a ResolvedState.
+
+        :param toml_path: The toml config file
+        :param install_path: The path to .pyprojectx
+        :param key: The key of the config files, see manifest.compute_key
+        :param venvs: The paths of the verified virtual environments by tool context
+        """
+        self.toml_path = str(toml_path.absolute())
+        self.install_path = str(install_path.absolute())
+        self.key = key
+        self.venvs = venvs or {}
+
+    @classmethod
+    def inherit(cls, config, install_path: Path) -> "ResolvedState":
+        """Take over the state of the parent pyprojectx process if it is still valid, else start a new state.
+
+        :param config: the config of the project
+        :param install_path: The path to .pyprojectx
+        """
+        key = compute_key(config.toml_path, config.lock_file, config.scripts_path)
+        state = cls(config.toml_path, install_path, key)
+        inherited = _take_state()
+        if inherited and (inherited.get("toml"), inherited.get("install")) == (state.toml_path, state.install_path):
+            if inherited.get("key") == key:
+                logger.debug("Inherited resolved state of tool contexts %s", ", ".join(inherited["venvs"]))
+                state.venvs = inherited["venvs"]
+            else:
+                logger.info("Config files changed, not using the inherited resolved state")
+        return state
+
+    def venv_path(self, ctx: str) -> Optional[str]:
+        """Return the path of the virtual environment of a verified tool context, or None if it isn't verified."""
+        return self.venvs.get(ctx)
+
+    def add_venv(self, ctx: str, path: Path) -> None:
+        """Mark a tool context as verified."""
+        self.venvs[ctx] = str(path.absolute())
+
+    def env(self) -> dict[str, str]:
+        """Return the environment variables that pass the state to a nested pyprojectx process."""
+        # files that were modified very recently may change again without changing their key
+        if is_racy(self.key):
+            return {}
+        value = json.dumps(
+            {"toml": self.toml_path, "install": self.install_path, "key": self.key, "venvs": self.venvs},
+            separators=(",", ":"),
+        )
+        return {PYPROJECTX_STATE_ENV_VAR: value}
+
+
+def _take_state() -> Optional[dict]:
+    # the commands of this process only receive the state if they start pyprojectx again, see ResolvedState.env
+    value = os.environ.pop(PYPROJECTX_STATE_ENV_VAR, None)
+    if not value:
+        return None
+    try:
+        state = json.loads(value)
+    except ValueError:
+        logger.debug("Invalid %s: %s", PYPROJECTX_STATE_ENV_VAR, value)
+        return None
+    return state if isinstance(state, dict) and isinstance(state.get("venvs"), dict) else None
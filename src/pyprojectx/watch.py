@@ -0,0 +1,359 @@
+"""Runs an alias again whenever the files that it watches change (`--watch`).
+
+The files are watched with inotify on Linux and by polling their stat data elsewhere. A burst of changes (f.e. an
+editor that saves several files) only starts one run: the watcher waits until no more changes arrive for a short
+while. A run that is still busy when files change is cancelled and started again. The config and the verified tool
+contexts are kept in memory between runs, so a run doesn't load the config or verify the lock file and the virtual
+environments again, unless the config files change.
+
+The outputs of the alias are never watched. When an alias doesn't select the files to watch, all files are watched,
+including the ones that the alias writes itself. The files that change while it runs then start a new run when it
+ended, unless they also changed during the previous run: those were probably written by the alias itself.
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Callable, Optional
+
+from pyprojectx.graph import AliasNode
+from pyprojectx.log import logger
+from pyprojectx.parallel import ParallelRunner
+from pyprojectx.wrapper.pw import BLUE, CYAN, RED, RESET
+
+# the time without changes that ends a burst of changes
+DEBOUNCE_SECONDS = 0.3
+POLL_INTERVAL_SECONDS = 0.5
+# directories that never contain files to watch
+IGNORED_DIRS = {"__pycache__", "node_modules"}
+
+
+class Watcher(ABC):
+    """Watches the files in a directory tree that match glob patterns."""
+
+    # the maximum time between a change and its report
+    latency = 0.0
+
+    def __init__(self, root: Path, patterns: list[str], excludes: Optional[list[str]] = None) -> None:
+        """Construct a Watcher.
+
+        :param root: the directory to watch
+        :param patterns: the glob patterns of the files to watch, relative to root, or an empty list for all files
+        :param excludes: the glob patterns of the files not to watch, f.e. the outputs of the alias
+        """
+        self.root = root
+        self.patterns = patterns
+        self.excludes = excludes or []
+        # when the first change of the last reported changes arrived (time.monotonic)
+        self.changed_at = 0.0
+
+    def wait(self, debounce: float = DEBOUNCE_SECONDS, timeout: Optional[float] = None) -> set[str]:
+        """Wait for changes, until no more changes arrive during the debounce time.
+
+        :param timeout: the maximum time to wait for the first change, or None to wait indefinitely
+        :return: the changed files, relative to root, or an empty set if no changes arrived within the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changes = set()
+        while not changes:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return changes
+            changes |= self._changes(remaining)
+        self.changed_at = time.monotonic()
+        while more := self._changes(debounce):
+            changes |= more
+        return changes
+
+    def close(self) -> None:  # noqa: B027
+        """Release the resources of the watcher, if it has any."""
+
+    @abstractmethod
+    def _changes(self, timeout: Optional[float]) -> set[str]:
+        """Return the changes that arrive within the timeout (None to wait indefinitely), or an empty set."""
+
+    def _matches(self, name: str) -> bool:
+        return (not self.patterns or _match_any(name, self.patterns)) and not _match_any(name, self.excludes)
+
+    def _dirs(self, top: Path) -> Iterator[Path]:
+        for path, dirs, _ in os.walk(top):
+            # hidden directories, like .git and .pyprojectx, are not watched
+            dirs[:] = [d for d in dirs if not d.startswith(".") and d not in IGNORED_DIRS]
+            yield Path(path)
+
+
+class PollingWatcher(Watcher):
+    """Detects changes by comparing the stat data of the files at regular intervals."""
+
+    def __init__(
+        self,
+        root: Path,
+        patterns: list[str],
+        excludes: Optional[list[str]] = None,
+        interval: float = POLL_INTERVAL_SECONDS,
+    ) -> None:
+        """Construct a PollingWatcher.
+
+        :param interval: the time between two scans of the directory tree, in seconds
+        """
+        super().__init__(root, patterns, excludes)
+        self._interval = interval
+        self.latency = interval
+        self._snapshot = self._scan()
+
+    def _changes(self, timeout: Optional[float]) -> set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changes = {
+                name
+                for name in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(name) != self._snapshot.get(name)
+            }
+            self._snapshot = snapshot
+            remaining = self._interval if deadline is None else deadline - time.monotonic()
+            if changes or remaining <= 0:
+                return changes
+            time.sleep(min(self._interval, remaining))
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for path in self._dirs(self.root):
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+            for entry in entries:
+                name = Path(entry.path).relative_to(self.root).as_posix()
+                if entry.is_file() and self._matches(name):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[name] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+
+class InotifyWatcher(Watcher):
+    """Receives the changes from the Linux kernel with inotify, without scanning the directory tree."""
+
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    MASK = (
+        IN_MODIFY
+        | IN_ATTRIB
+        | IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+        | IN_DELETE_SELF
+        | IN_MOVE_SELF
+    )
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, root: Path, patterns: list[str], excludes: Optional[list[str]] = None) -> None:
+        """Construct an InotifyWatcher.
+
+        :raise OSError: if inotify is not available
+        """
+        super().__init__(root, patterns, excludes)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._dirs_by_wd = {}
+        self._add_watches(root)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def _add_watches(self, top: Path) -> list[Path]:
+        """Watch a directory tree.
+
+        :return: the files that are already in the tree
+        """
+        files = []
+        for path in self._dirs(top):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.MASK)
+            if wd < 0:
+                # f.e. removed concurrently, or the maximum number of watches is reached
+                logger.debug("Could not watch %s: %s", path, os.strerror(ctypes.get_errno()))
+                continue
+            self._dirs_by_wd[wd] = path
+            files.extend(entry for entry in path.iterdir() if entry.is_file())
+        return files
+
+    def _changes(self, timeout: Optional[float]) -> set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # events for files that are not watched don't count
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if not readable:
+                return set()
+            changes = self._read_events()
+            if changes:
+                return changes
+
+    def _read_events(self) -> set[str]:
+        data = os.read(self._fd, 64 * 1024)
+        changes = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                # events were lost: consider everything changed
+                changes.add(".")
+                continue
+            if mask & (self.IN_IGNORED | self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                self._remove_watch(wd, mask)
+                continue
+            directory = self._dirs_by_wd.get(wd)
+            if directory is None or not name:
+                continue
+            paths = [directory / os.fsdecode(name)]
+            if mask & self.IN_ISDIR:
+                new_dir = mask & (self.IN_CREATE | self.IN_MOVED_TO) and not paths[0].name.startswith(".")
+                # files can be created in a new directory before it is watched
+                paths = self._add_watches(paths[0]) if new_dir else []
+            for path in paths:
+                relative = path.relative_to(self.root).as_posix()
+                if self._matches(relative):
+                    changes.add(relative)
+        return changes
+
+    def _remove_watch(self, wd: int, mask: int) -> None:
+        """Forget the watch of a directory that was removed, or moved out of the tree."""
+        directory = self._dirs_by_wd.get(wd)
+        if directory is None:
+            return
+        if mask & self.IN_MOVE_SELF and directory.is_dir():
+            # moved within the tree: the watch was already added again for the new path, with the same descriptor
+            return
+        del self._dirs_by_wd[wd]
+        # the subdirectories of a moved directory don't receive an event of their own
+        for sub_wd, path in list(self._dirs_by_wd.items()):
+            if path.is_relative_to(directory) and not path.is_dir():
+                del self._dirs_by_wd[sub_wd]
+                self._libc.inotify_rm_watch(self._fd, sub_wd)
+        if mask & self.IN_MOVE_SELF:
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+
+def create_watcher(root: Path, patterns: list[str], excludes: Optional[list[str]] = None) -> Watcher:
+    """Create an inotify watcher on Linux, or a polling watcher if inotify is not available."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, patterns, excludes)
+        except (OSError, AttributeError):
+            logger.debug("inotify is not available, polling for changes", exc_info=True)
+    return PollingWatcher(root, patterns, excludes)
+
+
+def watch(plan: Callable[[], tuple[ParallelRunner, AliasNode]], watcher: Watcher, name: str) -> None:
+    """Run the planned graph, and plan and run it again whenever the watcher reports changes, until interrupted.
+
+    :param plan: (re)plans the graph and the runner for the next run; it loads the config again if it changed
+    :param watcher: the watcher of the files
+    :param name: the name of the alias or command, to report
+    """
+    runner = run = None
+    # when the last run ended (time.monotonic)
+    ended = [0.0]
+    # the files that changed during the last run, without patterns
+    written = set()
+    try:
+        while True:
+            try:
+                runner, graph = plan()
+            except Warning as e:
+                # f.e. an invalid config while it is being edited
+                print(f"{RED}{e}{RESET}", file=sys.stderr)
+                runner = None
+            if runner:
+                ended[0] = float("inf")
+                run = threading.Thread(target=_run, args=(runner, graph, name, ended), daemon=True)
+                run.start()
+            changes = watcher.wait()
+            # without patterns, all files are watched, including the ones that the run writes itself
+            if not watcher.patterns and run:
+                while not (changes := _external_changes(watcher, run, ended, changes, written)):
+                    changes = watcher.wait()
+            logger.info("Changed: %s", ", ".join(sorted(changes)))
+            if run and run.is_alive():
+                print(f"{BLUE}Files changed, restarting {CYAN}{name}{RESET}", file=sys.stderr)
+                runner.cancel()
+                run.join()
+    finally:
+        watcher.close()
+        if run and run.is_alive():
+            # f.e. on Ctrl-C: concurrent commands run in their own process groups, so they don't receive it
+            runner.cancel()
+            run.join()
+
+
+def _external_changes(
+    watcher: Watcher, run: threading.Thread, ended: list[float], changes: set[str], written: set[str]
+) -> set[str]:
+    """Return the changes that the run probably didn't make itself.
+
+    The changes that arrive while the run is busy are collected until it ended. A file that also changed during the
+    previous run is considered to be written by the run, the others start a new run.
+    :param written: the files that changed during the previous run; replaced by the ones that changed during this run
+    """
+    during = set()
+    while changes and watcher.changed_at <= ended[0] + watcher.latency:
+        during |= changes
+        run.join()
+        # the last writes of the run may not be reported yet
+        changes = watcher.wait(timeout=max(0.0, ended[0] + watcher.latency - time.monotonic()) + DEBOUNCE_SECONDS)
+    external = changes | (during - written)
+    if during & written:
+        logger.info("Ignoring the changes that the run made itself: %s", ", ".join(sorted(during & written)))
+    if during:
+        written.clear()
+        written.update(during)
+    return external
+
+
+def _run(runner: ParallelRunner, graph: AliasNode, name: str, ended: list[float]) -> None:
+    try:
+        returncode = runner.run(graph)
+    finally:
+        ended[0] = time.monotonic()
+    if runner.cancelled:
+        return
+    result = f"failed with exit code {returncode}" if returncode else "succeeded"
+    print(f"{CYAN}{name} {BLUE}{result}, watching for changes...{RESET}", file=sys.stderr)
+
+
+def _match_any(name: str, patterns: list[str]) -> bool:
+    # '**/' also matches no directory at all, like in pathlib globs
+    return any(
+        fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(name, pattern.replace("**/", ""))
+        for pattern in patterns
+    )
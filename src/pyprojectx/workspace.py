@@ -0,0 +1,59 @@
+"""Runs an alias in all the sub-projects (members) of a workspace (`--all`).
+
+The `workspace` option of a project lists the toml files of its members as glob patterns, relative to the project.
+Without it, all the sub-directories with a _pyproject.toml_ that contains a `[tool.pyprojectx]` section are members.
+Each member runs in its own pyprojectx process, at most PYPROJECTX_JOBS (by default the number of CPUs) at a time.
+All members use the install dir of the workspace: members with the same (locked) requirements share the virtual
+environments of their tool contexts, which are installed once, before the members start. The output of the members
+is prefixed with their name, line by line, and a summary with the exit code and the duration of each member is
+printed at the end.
+"""
+
+import os
+from pathlib import Path
+
+from pyprojectx.log import logger
+from pyprojectx.wrapper.pw import PYPROJECT_TOML
+
+# directories that never contain members
+IGNORED_DIRS = {"__pycache__", "node_modules"}
+
+
+def find_members(config) -> list[Path]:
+    """Return the toml files of the members of a workspace, sorted by path.
+
+    :param config: the config of the workspace
+    :raise Warning: if the workspace has no members
+    """
+    root = Path(config.project_dir)
+    if config.workspace is None:
+        members = [toml for toml in _discover(root) if toml.parent != root]
+    else:
+        members = {toml for pattern in config.workspace for toml in root.glob(pattern) if toml.is_file()}
+    if not members:
+        msg = (
+            f"No workspace members found in {root}: list their toml files with the 'workspace' option, or add a "
+            "[tool.pyprojectx] section to the pyproject.toml files of the sub-projects"
+        )
+        raise Warning(msg)
+    return sorted(members)
+
+
+def member_name(config, toml: Path) -> str:
+    """Return the name of a member: the path of its directory relative to the workspace."""
+    return toml.parent.relative_to(config.project_dir).as_posix()
+
+
+def _discover(root: Path) -> list[Path]:
+    members = []
+    for path, dirs, files in os.walk(root):
+        # hidden directories, like .git and .pyprojectx, don't contain members
+        dirs[:] = [d for d in dirs if not d.startswith(".") and d not in IGNORED_DIRS]
+        if PYPROJECT_TOML in files:
+            toml = Path(path, PYPROJECT_TOML)
+            try:
+                if "[tool.pyprojectx" in toml.read_text(encoding="utf-8"):
+                    members.append(toml)
+            except (OSError, UnicodeDecodeError):
+                logger.debug("Could not read %s", toml, exc_info=True)
+    return members
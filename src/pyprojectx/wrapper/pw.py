@@ -8,20 +8,10 @@
 #                                                                                #
 # Licensed under the MIT license                                                 #
 ##################################################################################
-import argparse
+# Only modules that are needed to forward the arguments to an installed pyprojectx are imported here:
+# this script runs for every single command. Other modules are imported when they are needed.
 import os
-import subprocess
 import sys
-import sysconfig
-import zipfile
-from pathlib import Path
-from urllib import request
-
-try:
-    from venv import EnvBuilder
-except ImportError:
-    EnvBuilder = None
-
 
 VERSION = "__version__"
 UV_VERSION = "__uv_version__"
@@ -29,10 +19,34 @@ UV_VERSION = "__uv_version__"
 PYPROJECTX_INSTALL_DIR_ENV_VAR = "PYPROJECTX_INSTALL_DIR"
 PYPROJECTX_PACKAGE_ENV_VAR = "PYPROJECTX_PACKAGE"
 PYPROJECTX_USE_UV_ENV_VAR = "PYPROJECTX_USE_UV"
+PYPROJECTX_SHARED_DIR_ENV_VAR = "PYPROJECTX_SHARED_DIR"
+# the location of the uv binary when pyprojectx runs from the zipapp, which doesn't contain uv
+PYPROJECTX_UV_BIN_ENV_VAR = "PYPROJECTX_UV_BIN"
+# opt in to a resident pyprojectx server per project, see pyprojectx.server
+PYPROJECTX_SERVER_ENV_VAR = "PYPROJECTX_SERVER"
+PYPROJECTX_SERVER_IDLE_TIMEOUT_ENV_VAR = "PYPROJECTX_SERVER_IDLE_TIMEOUT"
+SERVER_SOCKET = "server.sock"
+# the length of sun_path in sockaddr_un is 104 on macOS and 108 on Linux, including the terminating null byte
+MAX_SOCKET_PATH = 103
+# opt in to downloading the pyprojectx zipapp: 1 for the GitHub release, or a URL with {version}, f.e. of a mirror
+PYPROJECTX_ZIPAPP_ENV_VAR = "PYPROJECTX_ZIPAPP"
+ZIPAPP_URL = "https://github.com/pyprojectx/pyprojectx/releases/download/{version}/pyprojectx-{version}.pyz"
+ZIPAPP_DOWNLOAD_TIMEOUT = 30
 PYPROJECT_TOML = "pyproject.toml"
 DEFAULT_INSTALL_DIR = ".pyprojectx"
-SCRIPTS_DIR = Path(sysconfig.get_path("scripts")).name
-EXE = sysconfig.get_config_var("EXE")
+# written by ensure_pyprojectx, so that the px and pxg scripts can start pyprojectx without running this script
+PX_RESOLUTION_FILE = "px.env"
+# marks a completely installed pyprojectx venv in the shared bootstrap store
+SHARED_READY_MARKER = ".pyprojectx-ready"
+SCRIPTS_DIR = "Scripts" if sys.platform == "win32" else "bin"
+EXE = ".exe" if sys.platform == "win32" else ""
+
+# options that can be forwarded to pyprojectx without parsing the arguments with argparse
+FORWARDED_FLAGS = {
+    *("-q", "--quiet", "--verbose", "-f", "--force-install", "-c", "--clean", "-i", "--info", "--lock", "--install-px"),
+    *("--server", "--plan", "--changed", "--watch", "--all"),
+}
+FORWARDED_OPTIONS = {"-t", "--toml", "--install-dir", "--add", "--install-context", "--env", "--python", "--completion"}
 
 CYAN = "\033[96m"
 BLUE = "\033[94m"
@@ -43,6 +57,15 @@ if sys.platform.startswith("win"):
 
 
 def run(args):
+    pyprojectx_script, explicit_options, install_path = _fast_path(args)
+    if pyprojectx_script:
+        if os.environ.get(PYPROJECTX_SERVER_ENV_VAR) and os.name == "posix":
+            _dispatch(install_path, [pyprojectx_script, *explicit_options, *args])
+        _forward(pyprojectx_script, explicit_options, args)
+        return
+
+    import subprocess  # noqa: PLC0415
+
     try:
         options = get_options(args)
         if options.upgrade:
@@ -55,14 +78,134 @@ def run(args):
             explicit_options += ["--toml", str(options.toml_path)]
         if not options.install_dir:
             explicit_options += ["--install-dir", str(options.install_path)]
-
-        subprocess.run([str(pyprojectx_script), *explicit_options, *args], check=True)
+        _forward(pyprojectx_script, explicit_options, args)
     except subprocess.CalledProcessError as e:
         raise SystemExit(e.returncode) from e
 
 
+def _fast_path(args):  # noqa: C901
+    """Resolve the installed pyprojectx script without argparse and without importing any other modules.
+
+    :return: the pyprojectx script, the options to add to args and the install path, or (None, None, None) if the
+        arguments contain options that need to be handled by this script or if pyprojectx is not installed yet
+    """
+    toml = install_dir = None
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        arg = args[i]
+        if arg == "--version":
+            print(VERSION)
+            raise SystemExit(0)
+        if arg in FORWARDED_OPTIONS and i + 1 < len(args):
+            if arg in ("-t", "--toml"):
+                toml = args[i + 1]
+            elif arg == "--install-dir":
+                install_dir = args[i + 1]
+            i += 2
+        elif arg in FORWARDED_FLAGS or arg.startswith("--changed=") or (len(arg) > 1 and arg.strip("v") == "-"):
+            i += 1
+        else:
+            return None, None, None
+
+    # os.path instead of pathlib: importing pathlib takes more time than running this fast path
+    pw_dir = os.path.dirname(__file__)  # noqa: PTH120
+    install_path = (
+        install_dir or os.environ.get(PYPROJECTX_INSTALL_DIR_ENV_VAR) or os.path.join(pw_dir, DEFAULT_INSTALL_DIR)  # noqa: PTH118
+    )
+    version = "development" if os.environ.get(PYPROJECTX_PACKAGE_ENV_VAR) else VERSION
+    venv_name = f"{version}-py{sys.version_info.major}.{sys.version_info.minor}"
+    pyprojectx_script = os.path.join(install_path, "pyprojectx", venv_name, SCRIPTS_DIR, f"pyprojectx{EXE}")  # noqa: PTH118
+    if not os.path.isfile(pyprojectx_script):  # noqa: PTH113
+        pyprojectx_script = os.path.join(install_path, "pyprojectx", f"pyprojectx-{version}.pyz")  # noqa: PTH118
+        if not os.path.isfile(pyprojectx_script):  # noqa: PTH113
+            return None, None, None
+    if _writes_px_resolution(toml, install_dir) and _px_resolution_is_stale(install_path):
+        return None, None, None
+    explicit_options = []
+    if not toml:
+        explicit_options += ["--toml", os.path.join(pw_dir, PYPROJECT_TOML)]  # noqa: PTH118
+    if not install_dir:
+        explicit_options += ["--install-dir", install_path]
+    return pyprojectx_script, explicit_options, install_path
+
+
+def _writes_px_resolution(toml, install_dir):
+    # the px scripts only know the default locations and don't run on Windows
+    return os.name == "posix" and not (toml or install_dir or os.environ.get(PYPROJECTX_INSTALL_DIR_ENV_VAR))
+
+
+def _px_resolution_is_stale(install_path):
+    try:
+        resolution_mtime = os.stat(os.path.join(install_path, PX_RESOLUTION_FILE)).st_mtime  # noqa: PTH116, PTH118
+    except OSError:
+        return True
+    return os.stat(__file__).st_mtime > resolution_mtime  # noqa: PTH116
+
+
+def server_socket_path(install_path):
+    """Return the Unix socket of the pyprojectx server, or None if the path is too long for a Unix socket."""
+    path = os.path.join(os.path.abspath(install_path), SERVER_SOCKET)  # noqa: PTH100, PTH118
+    return path if len(path.encode()) <= MAX_SOCKET_PATH else None
+
+
+def _dispatch(install_path, cmd):
+    """Exec the command that a running pyprojectx server resolves for cmd, without starting pyprojectx.
+
+    Returns if no server is running or if the server can't resolve the command.
+    """
+    socket_path = server_socket_path(install_path)
+    if not socket_path or not os.path.exists(socket_path):  # noqa: PTH110
+        return
+    import json  # noqa: PLC0415
+    import socket  # noqa: PLC0415
+
+    request = {"argv": [str(arg) for arg in cmd], "cwd": os.getcwd(), "env": dict(os.environ)}  # noqa: PTH109
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(5)
+            client.connect(socket_path)
+            client.sendall(json.dumps(request).encode())
+            client.shutdown(socket.SHUT_WR)
+            response = json.loads(b"".join(iter(lambda: client.recv(65536), b"")))
+    except (OSError, ValueError):
+        return
+    if "exec" in response:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.chdir(response["cwd"])
+        os.execvpe(response["exec"][0], response["exec"], response["env"])  # noqa: S606
+
+
+def _forward(pyprojectx_script, explicit_options, args):
+    cmd = [str(pyprojectx_script), *explicit_options, *args]
+    if cmd[0].endswith(".pyz"):
+        cmd.insert(0, sys.executable)
+        uv = _zipapp_uv(pyprojectx_script)
+        if uv:
+            os.environ.setdefault(PYPROJECTX_UV_BIN_ENV_VAR, uv)
+    if os.name == "posix":
+        # hand over to pyprojectx instead of keeping this interpreter alive while it runs
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execv(cmd[0], cmd)  # noqa: S606
+    import subprocess  # noqa: PLC0415
+
+    returncode = subprocess.run(cmd, check=False).returncode
+    if returncode:
+        raise SystemExit(returncode)
+
+
+def _zipapp_uv(zipapp):
+    """Return the uv binary that was installed for the zipapp or None if uv is expected on the PATH."""
+    install_path = os.path.dirname(os.path.dirname(zipapp))  # noqa: PTH120
+    uv = os.path.join(install_path, f"uv-{UV_VERSION}", f"uv{EXE}")  # noqa: PTH118
+    return uv if os.path.isfile(uv) else None  # noqa: PTH113
+
+
 def get_options(args):
-    options = arg_parser().parse_args(args)
+    from pathlib import Path  # noqa: PLC0415
+
+    options = arg_parser().parse_args(_with_changed_ref(args))
     options.install_path = Path(
         options.install_dir
         or os.environ.get(PYPROJECTX_INSTALL_DIR_ENV_VAR, Path(__file__).with_name(DEFAULT_INSTALL_DIR))
@@ -78,7 +221,19 @@ def get_options(args):
     return options
 
 
+def _with_changed_ref(args):
+    # '--changed' without a ref must not take the command as its ref
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        if args[i] == "--changed":
+            return [*args[:i], "--changed=HEAD", *args[i + 1 :]]
+        i += 2 if args[i] in FORWARDED_OPTIONS else 1
+    return args
+
+
 def arg_parser():
+    import argparse  # noqa: PLC0415
+
     parser = argparse.ArgumentParser(
         prog="pw",
         description="Execute commands or aliases defined in the [tool.pyprojectx] section of pyproject.toml. "
@@ -118,6 +273,19 @@ def arg_parser():
         metavar="tool-context",
         help="Install a tool context without actually running any command.",
     )
+    parser.add_argument(
+        "--env",
+        action="store",
+        metavar="tool-context[,tool-context...]",
+        help="Install the tool contexts and print the shell commands that add their scripts to the PATH, "
+        'f.e. eval "$(./pw --env main)".',
+    )
+    parser.add_argument(
+        "--completion",
+        action="store",
+        choices=["bash", "zsh", "fish"],
+        help='Print the shell completion script for px and pw, f.e. eval "$(px --completion bash)".',
+    )
     parser.add_argument(
         "--verbose",
         "-v",
@@ -138,6 +306,40 @@ def arg_parser():
         help="Show the configuration details of a command instead of running it. "
         "If no command is specified, a list with all available tools and aliases is shown.",
     )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Show the commands that an alias runs, including the aliases that it references, and the tool contexts "
+        "that they need, without running or installing anything.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Run the command again whenever files change, until interrupted with Ctrl-C. The 'watch' option of "
+        "an alias (or its 'inputs') selects the files to watch.",
+    )
+    parser.add_argument(
+        "--changed",
+        nargs="?",
+        const="HEAD",
+        metavar="REF",
+        help="Only pass the files that changed since the git ref (default: HEAD, the uncommitted changes), including "
+        "untracked files, to the command. The 'files' option of an alias filters them. The command is skipped if no "
+        "files changed. Use --changed=REF to specify the ref.",
+    )
+    parser.add_argument(
+        "--python",
+        action="store",
+        metavar="VERSION",
+        help="Run the command in tool contexts with this Python version (f.e. 3.12) instead of the Python version "
+        "that runs pyprojectx. Aliases with a 'python' matrix only run with this version.",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Run the command in all members of the workspace: the projects that are listed in the 'workspace' option, "
+        "or else all sub-directories with a pyproject.toml that contains a [tool.pyprojectx] section.",
+    )
     parser.add_argument(
         "--add",
         action="store",
@@ -154,6 +356,14 @@ def arg_parser():
     parser.add_argument(
         "--install-px", action="store_true", help="Install the px and pxg scripts in your home directory."
     )
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        help=f"Start a resident pyprojectx server for the project, which resolves commands so that pw can run them "
+        f"without starting pyprojectx. pw starts it automatically when the {PYPROJECTX_SERVER_ENV_VAR} environment "
+        f"variable is set (on Linux and Mac only). It stops after {PYPROJECTX_SERVER_IDLE_TIMEOUT_ENV_VAR} seconds "
+        f"without requests (default 900).",
+    )
     parser.add_argument(
         "--upgrade",
         action="store_true",
@@ -165,87 +375,270 @@ def arg_parser():
     return parser
 
 
-def ensure_pyprojectx(options):  # noqa: C901, PLR0912
+def ensure_pyprojectx(options):
+    import subprocess  # noqa: PLC0415
+    from pathlib import Path  # noqa: PLC0415
+
     venv_dir = (
         options.install_path / "pyprojectx" / f"{options.version}-py{sys.version_info.major}.{sys.version_info.minor}"
     )
     pyprojectx_script = venv_dir / SCRIPTS_DIR / f"pyprojectx{EXE}"
+    zipapp = options.install_path / "pyprojectx" / f"pyprojectx-{options.version}.pyz"
 
     if not pyprojectx_script.is_file():
-        if options.quiet:
-            out = subprocess.DEVNULL
+        out = subprocess.DEVNULL if options.quiet else sys.stderr
+        shared_dir = os.environ.get(PYPROJECTX_SHARED_DIR_ENV_VAR)
+        # a development version is installed in editable mode from a project specific location
+        if shared_dir and options.version != "development":
+            pyprojectx_script = _ensure_shared_pyprojectx(Path(shared_dir), venv_dir, options, out)
+        elif zipapp.is_file() or _install_zipapp(zipapp, options, out):
+            pyprojectx_script = zipapp
         else:
-            out = sys.stderr
-            print(f"{CYAN}creating pyprojectx venv in {BLUE}{venv_dir}{RESET}", file=sys.stderr)
+            _install_pyprojectx(venv_dir, options, out)
+        # create .gitignore file
+        gitignore_file = options.install_path / ".gitignore"
+        if not gitignore_file.is_file():
+            gitignore_file.write_text("*\n")
 
-        use_uv_install_script = not EnvBuilder or os.environ.get(PYPROJECTX_USE_UV_ENV_VAR)
-        if not use_uv_install_script:
-            env_builder = EnvBuilder(with_pip=True)
-            env_context = env_builder.ensure_directories(venv_dir)
-            try:
-                env_builder.create(venv_dir)
-            except (SystemExit, subprocess.CalledProcessError) as e:
-                print(f"failed to create virtualenv, falling back to uv install script ({e})")
-                use_uv_install_script = True
-            else:
-                pip_cmd = [env_context.env_exe, "-m", "pip", "install", "--pre"]
-                subprocess.run(
-                    [*pip_cmd, "--upgrade", "pip"],
-                    stdout=out,
-                    check=True,
-                )
-        if use_uv_install_script:  # download and use uv to create the pyprojectx venv
-            uv_dir = Path(options.install_path) / f"uv-{UV_VERSION}"
-            release_base_url = (
-                "https://github.com/astral-sh/uv/releases/latest/download"
-                if UV_VERSION == "__uv_version__"
-                else f"https://github.com/astral-sh/uv/releases/download/{UV_VERSION}"
-            )
-            if sys.platform == "win32":
-                # https://github.com/PowerShell/PowerShell/issues/18530#issuecomment-1325691850
-                os.environ["PSMODULEPATH"] = ""
-                install_uv_cmd = (
-                    f'powershell -ExecutionPolicy Bypass -c "irm {release_base_url}/uv-installer.ps1 | iex"'
-                )
-            else:
-                install_uv_cmd = f"curl --proto '=https' --tlsv1.2 -LsSf irm {release_base_url}/uv-installer.sh | sh"
-            subprocess.run(
-                install_uv_cmd,
-                stdout=out,
-                check=True,
-                shell=True,
-                env={**os.environ, "UV_BUILD_UNMANAGED_INSTALL": str(uv_dir), "UV_UNMANAGED_INSTALL": str(uv_dir)},
-            )
-            uv = uv_dir / f"uv{EXE}"
+    if _writes_px_resolution(options.toml, options.install_dir):
+        write_px_resolution(options, pyprojectx_script)
+    return pyprojectx_script
+
+
+def _install_pyprojectx(venv_dir, options, out, uv=None):  # noqa: C901
+    """Create the pyprojectx venv and install pyprojectx in it.
+
+    :param uv: an installed uv executable to create the venv with, if any
+    """
+    import subprocess  # noqa: PLC0415
+
+    try:
+        from venv import EnvBuilder  # noqa: PLC0415
+    except ImportError:
+        EnvBuilder = None  # noqa: N806
+
+    if not options.quiet:
+        print(f"{CYAN}creating pyprojectx venv in {BLUE}{venv_dir}{RESET}", file=sys.stderr)
+
+    use_uv_install_script = not uv and (not EnvBuilder or os.environ.get(PYPROJECTX_USE_UV_ENV_VAR))
+    if not (uv or use_uv_install_script):
+        env_builder = EnvBuilder(with_pip=True)
+        env_context = env_builder.ensure_directories(venv_dir)
+        try:
+            env_builder.create(venv_dir)
+        except (SystemExit, subprocess.CalledProcessError) as e:
+            print(f"failed to create virtualenv, falling back to uv install script ({e})")
+            use_uv_install_script = True
+        else:
+            pip_cmd = [env_context.env_exe, "-m", "pip", "install", "--pre"]
             subprocess.run(
-                [uv, "venv", str(venv_dir), "--python", sys.executable, "--clear"],
+                [*pip_cmd, "--upgrade", "pip"],
                 stdout=out,
                 check=True,
             )
-            pip_cmd = [uv, "pip", "install", "--pre", "--python", str(venv_dir / SCRIPTS_DIR / f"python{EXE}")]
+    if use_uv_install_script:  # download and use uv to create the pyprojectx venv
+        uv = _install_uv(options.install_path, out)
+    if uv:
+        subprocess.run(
+            [uv, "venv", str(venv_dir), "--python", sys.executable, "--clear"],
+            stdout=out,
+            check=True,
+        )
+        pip_cmd = [uv, "pip", "install", "--pre", "--python", str(venv_dir / SCRIPTS_DIR / f"python{EXE}")]
 
+    if not options.quiet:
+        print(
+            f"{CYAN}installing pyprojectx {BLUE}{options.version}: {options.pyprojectx_package} {RESET}",
+            file=sys.stderr,
+        )
+    if options.version == "development":
         if not options.quiet:
             print(
-                f"{CYAN}installing pyprojectx {BLUE}{options.version}: {options.pyprojectx_package} {RESET}",
+                f"{RED}WARNING: {options.pyprojectx_package} is installed in editable mode{RESET}",
                 file=sys.stderr,
             )
-        if options.version == "development":
-            if not options.quiet:
-                print(
-                    f"{RED}WARNING: {options.pyprojectx_package} is installed in editable mode{RESET}",
-                    file=sys.stderr,
-                )
-            pip_cmd.append("-e")
-        subprocess.run([*pip_cmd, options.pyprojectx_package], stdout=out, check=True)
-        # create .gitignore file
-        gitignore_file = options.install_path / ".gitignore"
-        if not gitignore_file.is_file():
-            gitignore_file.write_text("*\n")
+        pip_cmd.append("-e")
+    subprocess.run([*pip_cmd, options.pyprojectx_package], stdout=out, check=True)
 
-    return pyprojectx_script
+
+def _install_uv(install_path, out):
+    """Install uv with its install script in the install dir.
+
+    :return: the uv binary
+    """
+    import subprocess  # noqa: PLC0415
+    from pathlib import Path  # noqa: PLC0415
+
+    uv_dir = Path(install_path) / f"uv-{UV_VERSION}"
+    release_base_url = (
+        "https://github.com/astral-sh/uv/releases/latest/download"
+        if UV_VERSION == "__uv_version__"
+        else f"https://github.com/astral-sh/uv/releases/download/{UV_VERSION}"
+    )
+    if sys.platform == "win32":
+        # https://github.com/PowerShell/PowerShell/issues/18530#issuecomment-1325691850
+        os.environ["PSMODULEPATH"] = ""
+        install_uv_cmd = f'powershell -ExecutionPolicy Bypass -c "irm {release_base_url}/uv-installer.ps1 | iex"'
+    else:
+        install_uv_cmd = f"curl --proto '=https' --tlsv1.2 -LsSf irm {release_base_url}/uv-installer.sh | sh"
+    subprocess.run(
+        install_uv_cmd,
+        stdout=out,
+        check=True,
+        shell=True,
+        env={**os.environ, "UV_BUILD_UNMANAGED_INSTALL": str(uv_dir), "UV_UNMANAGED_INSTALL": str(uv_dir)},
+    )
+    return uv_dir / f"uv{EXE}"
+
+
+def _install_zipapp(zipapp, options, out):
+    """Download the pyprojectx zipapp of a released version, together with uv if it is not on the PATH.
+
+    Only when PYPROJECTX_ZIPAPP is set: by default, pw only downloads from the package index.
+    The zipapp is verified against the sha256 checksum that is published with it.
+    :return: False if the zipapp is not available, f.e. for development versions, when offline or when the download
+        is too slow
+    """
+    location = os.environ.get(PYPROJECTX_ZIPAPP_ENV_VAR)
+    if not location or not options.version.replace(".", "").isdigit():
+        return False
+    import hashlib  # noqa: PLC0415
+    import shutil  # noqa: PLC0415
+    import subprocess  # noqa: PLC0415
+    from http.client import HTTPException  # noqa: PLC0415
+
+    url = (location if "://" in location else ZIPAPP_URL).format(version=options.version)
+    tmp_file = zipapp.with_name(f"{zipapp.name}.{os.getpid()}.tmp")
+    try:
+        checksum = _download(f"{url}.sha256", ZIPAPP_DOWNLOAD_TIMEOUT).decode().split()[0]
+        if not options.quiet:
+            print(f"{CYAN}downloading pyprojectx {BLUE}{options.version}{CYAN} zipapp{RESET}", file=sys.stderr)
+        content = _download(url, ZIPAPP_DOWNLOAD_TIMEOUT)
+        if hashlib.sha256(content).hexdigest() != checksum:
+            return False
+        zipapp.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_bytes(content)
+        if not shutil.which("uv") and not _zipapp_uv(zipapp):
+            _install_uv(options.install_path, out)
+        tmp_file.replace(zipapp)
+    except (OSError, ValueError, IndexError, HTTPException, subprocess.CalledProcessError):
+        # f.e. offline or a truncated response: the venv is installed from the package index instead
+        tmp_file.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def _download(url, timeout):
+    """Download a (small) file in memory.
+
+    :param timeout: the maximum number of seconds for the whole download
+    :raise TimeoutError: if the download takes longer
+    """
+    import time  # noqa: PLC0415
+    from urllib import request  # noqa: PLC0415
+
+    deadline = time.monotonic() + timeout
+    chunks = []
+    with request.urlopen(url, timeout=timeout) as response:  # noqa: S310
+        while chunk := response.read(65536):
+            if time.monotonic() > deadline:
+                msg = f"downloading {url} took more than {timeout} seconds"
+                raise TimeoutError(msg)
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _ensure_shared_pyprojectx(shared_path, venv_dir, options, out):
+    """Install pyprojectx once in the shared bootstrap store and link the pyprojectx venv of the project to it.
+
+    The installation is guarded by a lock file, so that several projects can bootstrap at the same time.
+    :return: the pyprojectx script
+    """
+    import shutil  # noqa: PLC0415
+
+    shared_venv_dir = shared_path.absolute() / "pyprojectx" / venv_dir.name
+    ready_marker = shared_venv_dir / SHARED_READY_MARKER
+    if not ready_marker.is_file():
+        shared_venv_dir.parent.mkdir(parents=True, exist_ok=True)
+        lock = _acquire_lock(shared_venv_dir.with_name(f"{venv_dir.name}.lock"))
+        try:
+            # another process may have finished the installation while waiting for the lock
+            if not ready_marker.is_file():
+                shutil.rmtree(shared_venv_dir, ignore_errors=True)
+                _install_pyprojectx(shared_venv_dir, options, out, uv=shutil.which("uv"))
+                ready_marker.touch()
+        finally:
+            lock.close()
+
+    if not options.quiet:
+        print(f"{CYAN}using shared pyprojectx venv {BLUE}{shared_venv_dir}{RESET}", file=sys.stderr)
+    venv_dir.parent.mkdir(parents=True, exist_ok=True)
+    if venv_dir.is_dir() and not venv_dir.is_symlink():
+        shutil.rmtree(venv_dir)
+    tmp_link = venv_dir.with_name(f"{venv_dir.name}.{os.getpid()}.tmp")
+    try:
+        tmp_link.symlink_to(shared_venv_dir, target_is_directory=True)
+        tmp_link.replace(venv_dir)
+    except OSError:  # f.e. creating symlinks requires extra privileges on Windows
+        tmp_link.unlink(missing_ok=True)
+        return shared_venv_dir / SCRIPTS_DIR / f"pyprojectx{EXE}"
+    return venv_dir / SCRIPTS_DIR / f"pyprojectx{EXE}"
+
+
+def _acquire_lock(lock_file):
+    """Block until an exclusive lock on the lock file is acquired; closing the returned file releases it."""
+    f = lock_file.open("a+")
+    if sys.platform == "win32":
+        import msvcrt  # noqa: PLC0415
+
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:  # LK_LOCK gives up after 10 seconds
+                pass
+    else:
+        import fcntl  # noqa: PLC0415
+
+        fcntl.flock(f, fcntl.LOCK_EX)
+    return f
+
+
+def write_px_resolution(options, pyprojectx_script):
+    """Write the resolved pyprojectx script and locations as a file that can be sourced by the px and pxg scripts.
+
+    px execs the pyprojectx script directly as long as this file is newer than the pw script.
+    """
+    is_zipapp = pyprojectx_script.suffix == ".pyz"
+    values = {
+        "PX_VERSION": options.version,
+        "PX_PYPROJECTX_PACKAGE": os.environ.get(PYPROJECTX_PACKAGE_ENV_VAR, ""),
+        "PX_SCRIPT": pyprojectx_script.absolute(),
+        # the zipapp is started with the Python interpreter that runs pw
+        "PX_PYTHON": sys.executable if is_zipapp else "",
+        "PX_UV_BIN": (is_zipapp and _zipapp_uv(pyprojectx_script.absolute())) or "",
+        "PX_TOML": options.toml_path.absolute(),
+        "PX_INSTALL_DIR": options.install_path.absolute(),
+    }
+    resolution_file = options.install_path / PX_RESOLUTION_FILE
+    tmp_file = resolution_file.with_name(f"{PX_RESOLUTION_FILE}.{os.getpid()}.tmp")
+    try:
+        tmp_file.write_text("".join(f"{k}='{_sh_escape(v)}'\n" for k, v in values.items()))
+        tmp_file.replace(resolution_file)
+    except OSError:
+        tmp_file.unlink(missing_ok=True)
+
+
+def _sh_escape(value):
+    return str(value).replace("'", "'\\''")
 
 
 def download_wrappers():
+    import zipfile  # noqa: PLC0415
+    from pathlib import Path  # noqa: PLC0415
+    from urllib import request  # noqa: PLC0415
+
     latest = "https://github.com/pyprojectx/pyprojectx/releases/latest/download/wrappers.zip"
     zip_file, _ = request.urlretrieve(latest)  # noqa: S310
     with zipfile.ZipFile(zip_file, "r") as zip_ref:
@@ -1,3 +1,4 @@
+import logging
 import os
 import shutil
 import stat
@@ -17,6 +18,23 @@ def tmp_dir():
     shutil.rmtree(path)
 
 
+@pytest.fixture(autouse=True)
+def _no_inherited_state(monkeypatch):
+    # pyprojectx exports its resolved state for nested processes, which must not leak into other tests
+    monkeypatch.delenv("PYPROJECTX_STATE", raising=False)
+
+
+@pytest.fixture(autouse=True)
+def _restore_logging():
+    # the cli configures logging (set_verbosity), with handlers that write to the captured output of a single test
+    loggers = [logging.getLogger(), logging.getLogger("pyprojectx.log")]
+    saved = [(list(logger.handlers), logger.level) for logger in loggers]
+    yield
+    for logger, (handlers, level) in zip(loggers, saved):
+        logger.handlers[:] = handlers
+        logger.setLevel(level)
+
+
 def create_tmp_project(tmp_project_dir):
     shutil.copyfile(data_dir / "pw-test.toml", tmp_project_dir / pw.PYPROJECT_TOML)
     shutil.copy(data_dir / "pw-requirements.txt", tmp_project_dir)
@@ -4,10 +4,15 @@ import shutil
 import subprocess
 import sys
 import sysconfig
+import time
+import zipapp
 from pathlib import Path
 
+import click
 import pytest
 import tomlkit
+import userpath
+import uv
 
 from pyprojectx.wrapper import pw
 
@@ -433,6 +438,85 @@ def test_upgrade(sessionless_tmp_project):
     assert re.search(r"\d+\.\d+\.\d+", proc_result.stdout.decode("utf-8").strip())
 
 
+def test_warm_version_fast_path_imports(tmp_project):
+    project_dir, env = tmp_project
+    subprocess.run([sys.executable, f"{SCRIPT_PREFIX}pw", "--version"], cwd=project_dir, env=env, check=True)
+
+    cmd = [sys.executable, "-X", "importtime", f"{SCRIPT_PREFIX}pw", "--version"]
+    proc_result = subprocess.run(cmd, capture_output=True, cwd=project_dir, env=env, check=True, text=True)
+
+    assert proc_result.stdout.strip()
+    # only the imports of the wrapper are traced: pyprojectx itself runs in another interpreter
+    modules = {
+        line.split("|")[-1].strip() for line in proc_result.stderr.splitlines() if line.startswith("import time:")
+    }
+    assert "os" in modules
+    assert not modules.intersection(
+        ["argparse", "pathlib", "subprocess", "sysconfig", "tomllib", "tomlkit", "urllib.request", "uv", "zipfile"]
+    )
+
+
+def test_forward_does_not_import_bootstrap_modules(tmp_project):
+    project_dir, env = tmp_project
+    subprocess.run(f"{SCRIPT_PREFIX}pw -q pycowsay warm", shell=True, cwd=project_dir, env=env, check=True)
+
+    cmd = [sys.executable, "-X", "importtime", f"{SCRIPT_PREFIX}pw", "-q", "pycowsay", "forwarded"]
+    proc_result = subprocess.run(cmd, capture_output=True, cwd=project_dir, env=env, check=True, text=True)
+    assert "forwarded" in proc_result.stdout
+    # only the imports of the wrapper are traced: pyprojectx itself runs in another interpreter
+    modules = {
+        line.split("|")[-1].strip() for line in proc_result.stderr.splitlines() if line.startswith("import time:")
+    }
+    assert not modules.intersection(["argparse", "pathlib", "sysconfig", "urllib.request", "venv", "zipfile"])
+
+
+def test_zipapp(sessionless_tmp_project, tmp_path):
+    project_dir, env = sessionless_tmp_project
+    del env[pw.PYPROJECTX_PACKAGE_ENV_VAR]
+    env[pw.PYPROJECTX_UV_BIN_ENV_VAR] = uv.find_uv_bin()
+    build_dir = tmp_path / "zipapp"
+    shutil.copytree(Path(__file__).parents[2] / "src/pyprojectx", build_dir / "pyprojectx")
+    for module in (tomlkit, userpath, click):
+        shutil.copytree(Path(module.__file__).parent, build_dir / module.__name__)
+    pyprojectx_dir = project_dir / pw.DEFAULT_INSTALL_DIR / "pyprojectx"
+    pyprojectx_dir.mkdir(parents=True)
+    zipapp.create_archive(build_dir, pyprojectx_dir / f"pyprojectx-{pw.VERSION}.pyz", main="pyprojectx.cli:main")
+
+    cmd = f"{SCRIPT_PREFIX}pw -q pycowsay zipapp"
+    proc_result = subprocess.run(cmd, shell=True, capture_output=True, cwd=project_dir, env=env, check=False)
+    if proc_result.returncode:
+        print(proc_result.stderr.decode("utf-8"))
+    assert "< zipapp >" in proc_result.stdout.decode("utf-8")
+    # no pyprojectx venv is needed
+    assert [f.name for f in pyprojectx_dir.iterdir()] == [f"pyprojectx-{pw.VERSION}.pyz"]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="the pyprojectx server uses a Unix socket")
+def test_server(sessionless_tmp_project):
+    project_dir, env = sessionless_tmp_project
+    env[pw.PYPROJECTX_SERVER_ENV_VAR] = "1"
+    env[pw.PYPROJECTX_SERVER_IDLE_TIMEOUT_ENV_VAR] = "2"
+    cmd = f"{SCRIPT_PREFIX}pw -q pycowsay started"
+    subprocess.run(cmd, shell=True, capture_output=True, cwd=project_dir, env=env, check=True)
+    socket_path = Path(pw.server_socket_path(project_dir / pw.DEFAULT_INSTALL_DIR))
+    deadline = time.monotonic() + 30
+    while not socket_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert socket_path.exists()
+
+    cmd = f"{SCRIPT_PREFIX}pw -vv pycowsay served"
+    proc_result = subprocess.run(cmd, shell=True, capture_output=True, cwd=project_dir, env=env, check=True)
+    assert "< served >" in proc_result.stdout.decode("utf-8")
+    # pyprojectx didn't run, so it didn't log anything
+    assert "Parsed cli arguments" not in proc_result.stderr.decode("utf-8")
+
+    # the server stops when it is idle
+    deadline = time.monotonic() + 30
+    while socket_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not socket_path.exists()
+
+
 @pytest.mark.skipif(not sys.platform.startswith("win"), reason="bat and ps1 test")
 def test_argument_containing_less_then(tmp_lock_project):
     project_dir, env = tmp_lock_project
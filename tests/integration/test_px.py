@@ -1,8 +1,14 @@
+import os
 import shutil
 import subprocess
 import sys
+import time
 from pathlib import Path
 
+import pytest
+
+from pyprojectx.wrapper import pw
+
 SCRIPT_PREFIX = ".\\" if sys.platform.startswith("win") else "./"
 
 
@@ -17,6 +23,38 @@ def test_px_invoked_from_sub_directory(tmp_project):
     assert "< hello >" in proc_result.stdout.decode("utf-8")
 
 
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="px.bat always runs pw")
+def test_px_starts_pyprojectx_without_pw(tmp_project):
+    project_dir, env = tmp_project
+    cwd = project_dir.joinpath("subdir")
+    copy_px(cwd)
+    subprocess.run(f"{SCRIPT_PREFIX}px -q pycowsay resolve", shell=True, cwd=cwd, env=env, check=True)
+
+    resolution = project_dir.joinpath(".pyprojectx", pw.PX_RESOLUTION_FILE).read_text()
+    assert f"PX_TOML='{project_dir / pw.PYPROJECT_TOML}'" in resolution
+    assert f"PX_INSTALL_DIR='{project_dir / pw.DEFAULT_INSTALL_DIR}'" in resolution
+
+    pw_script = project_dir.joinpath("pw")
+    pw_content = pw_script.read_bytes()
+    pw_stat = pw_script.stat()
+    try:
+        # a broken pw script that is older than the resolution file is not used
+        pw_script.write_text("raise SystemExit(99)")
+        os.utime(pw_script, ns=(pw_stat.st_atime_ns, pw_stat.st_mtime_ns))
+        cmd = f"{SCRIPT_PREFIX}px -q pycowsay direct"
+        proc_result = subprocess.run(cmd, shell=True, capture_output=True, cwd=cwd, env=env, check=True)
+        assert "< direct >" in proc_result.stdout.decode("utf-8")
+
+        # px falls back to pw when it is newer than the resolution file
+        future = time.time() + 10
+        os.utime(pw_script, (future, future))
+        proc_result = subprocess.run(cmd, shell=True, capture_output=True, cwd=cwd, env=env, check=False)
+        assert proc_result.returncode == 99
+    finally:
+        pw_script.write_bytes(pw_content)
+        os.utime(pw_script, ns=(pw_stat.st_atime_ns, pw_stat.st_mtime_ns))
+
+
 def test_install_px(tmp_project):
     project_dir, env = tmp_project
     cwd = project_dir.joinpath("global")
@@ -0,0 +1,126 @@
+import logging
+import shutil
+from pathlib import Path
+
+import pytest
+from pyprojectx.api import ALIAS, COMMAND, SCRIPT, Project
+from pyprojectx.env import IsolatedVirtualEnv
+
+data_dir = Path(__file__).parent.with_name("data")
+
+
+@pytest.fixture
+def project(tmp_dir):
+    shutil.copyfile(data_dir / "test.toml", tmp_dir / "pyproject.toml")
+    shutil.copytree(data_dir / "scripts", tmp_dir / "scripts")
+    return Project(tmp_dir)
+
+
+@pytest.fixture
+def runnable_project(tmp_dir, mocker):
+    (tmp_dir / "pyproject.toml").write_text(
+        """
+[tool.pyprojectx]
+tool = []
+
+[tool.pyprojectx.aliases]
+hello = "echo hello"
+fail = "exit 3"
+both = ["pw@hello", "pw@fail", "pw@hello"]
+in-tool = { ctx = "tool", cmd = "echo in tool" }
+build = { cmd = "echo built", inputs = ["in.txt"] }
+"""
+    )
+    venv = IsolatedVirtualEnv(tmp_dir / ".pyprojectx" / "venvs", "tool", {"requirements": []})
+    ensure_mock = mocker.patch("pyprojectx.cli.ensure_ctx", return_value=venv)
+    project = Project(tmp_dir)
+    project.ensure_mock = ensure_mock
+    return project
+
+
+def test_resolve(project):
+    resolution = project.resolve("combAl", ["extra arg"])
+
+    assert resolution.name == "combined-alias"
+    assert resolution.kind == ALIAS
+    assert len(resolution.commands) == 2
+    assert resolution.commands[0].cmd == "tool-1 arg"
+    assert resolution.commands[1].cmd.endswith('shell-command "extra arg"')
+    assert "pw@" not in resolution.commands[1].cmd
+    assert resolution.commands[1].ctx == "main"
+    assert resolution.commands[1].env == {"ENV_VAR1": "ENV_VAR1"}
+    assert resolution.commands[1].cwd == "/cwd"
+
+    assert project.resolve("script-a").kind == SCRIPT
+    assert project.resolve("tool-1", ["arg"]).kind == COMMAND
+
+
+def test_resolve_invalid_names(project):
+    with pytest.raises(Warning, match="ambiguous"):
+        project.resolve("alias")
+    (project.toml_path).write_text("[tool.pyprojectx]\ntool = []\n")
+    with pytest.raises(Warning, match="not an alias"):
+        project.resolve("unknown-command")
+
+
+def test_plan(project):
+    commands = project.plan("alias-list")
+
+    # references to other aliases are expanded
+    assert [c.cmd for c in commands] == ["tool-1 arg", "tool-2 arg1 arg2", "ls -al"]
+    assert [c.ctx for c in commands] == ["tool-1", "tool-2", "main"]
+
+    script = project.plan("script-a", ["arg"])[0]
+    assert script.cmd == ["python", project.toml_path.parent / "scripts" / "script-a.py", "arg"]
+    assert script.ctx == "tool-1"
+
+
+def test_ensure_context_validates_ctx(project):
+    with pytest.raises(Warning, match="Invalid ctx"):
+        project.ensure_context("unknown-ctx")
+
+
+def test_run(runnable_project):
+    result = runnable_project.run("hello", capture_output=True)
+
+    assert result.returncode == 0
+    assert result.stdout.strip() == "hello"
+    runnable_project.ensure_mock.assert_not_called()
+
+
+def test_run_in_ctx(runnable_project):
+    result = runnable_project.run("in-tool", ["x"], capture_output=True)
+
+    assert result.returncode == 0
+    assert result.stdout.strip() == "in tool x"
+    runnable_project.ensure_mock.assert_called_once()
+
+
+def test_run_stops_at_first_failure(runnable_project):
+    result = runnable_project.run("both", capture_output=True)
+
+    assert result.returncode == 3
+    assert result.stdout.strip() == "hello"
+    assert [c.cmd for c in result.commands] == ["echo hello", "exit 3"]
+
+
+def test_run_like_the_cli(runnable_project):
+    (runnable_project.toml_path.parent / "in.txt").write_text("in")
+
+    assert runnable_project.run("build", capture_output=True).stdout.strip() == "built"
+    # up-to-date checks work the same way as with pw
+    result = runnable_project.run("build", capture_output=True)
+
+    assert result.returncode == 0
+    assert result.stdout == ""
+
+
+def test_api_does_not_configure_logging(runnable_project):
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    runnable_project.quiet = False
+
+    runnable_project.run("hello", capture_output=True)
+
+    assert root.handlers == handlers
+    assert root.level == level
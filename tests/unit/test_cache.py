@@ -0,0 +1,145 @@
+import os
+
+import pytest
+from pyprojectx.cache import PYPROJECTX_CACHE_ENV_VAR, DirectoryBackend, get_backend
+from pyprojectx.cli import _run
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="the aliases use posix shell commands")
+
+TOML = """
+[tool.pyprojectx.aliases]
+failing = { cmd = "echo failed && exit 3", inputs = "src/*.txt", cache = true }
+script = { cmd = "mkdir -p out && cp src/a.txt out/run.sh && chmod 755 out/run.sh", outputs = "out/*", cache = true }
+
+[tool.pyprojectx.aliases.generate]
+cmd = "mkdir -p out && cat src/*.txt > out/all.txt && echo generated && echo warning >&2"
+inputs = "src/*.txt"
+outputs = "out/*.txt"
+cache = true
+"""
+
+
+@pytest.fixture
+def shared_cache(tmp_dir, monkeypatch):
+    monkeypatch.setenv(PYPROJECTX_CACHE_ENV_VAR, str(tmp_dir / "shared"))
+
+
+def checkout(tmp_dir, name):
+    project = tmp_dir / name
+    (project / "src").mkdir(parents=True)
+    (project / "src" / "a.txt").write_text("a")
+    (project / "pyproject.toml").write_text(TOML)
+    return project
+
+
+def run(project, *args):
+    _run(["pyprojectx", "--install-dir", str(project / ".pyprojectx"), "-t", str(project / "pyproject.toml"), *args])
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_restore_from_other_checkout(tmp_dir, capfd):
+    run(checkout(tmp_dir, "a"), "generate")
+    assert capfd.readouterr().out == "generated\n"
+
+    project = checkout(tmp_dir, "b")
+    run(project, "generate")
+
+    captured = capfd.readouterr()
+    assert captured.out == "generated\n"
+    assert "\nwarning\n" in captured.err
+    assert "generate \x1b[94mwas restored from the cache" in captured.err
+    assert (project / "out" / "all.txt").read_text() == "a"
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_changed_inputs_are_not_restored(tmp_dir, capfd):
+    run(checkout(tmp_dir, "a"), "generate")
+    project = checkout(tmp_dir, "b")
+    (project / "src" / "a.txt").write_text("b")
+    capfd.readouterr()
+
+    run(project, "generate")
+
+    assert "restored" not in capfd.readouterr().err
+    assert (project / "out" / "all.txt").read_text() == "b"
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_restore_file_modes(tmp_dir, capfd):
+    run(checkout(tmp_dir, "a"), "script")
+    project = checkout(tmp_dir, "b")
+
+    run(project, "script")
+
+    assert "script \x1b[94mwas restored from the cache" in capfd.readouterr().err
+    assert (project / "out" / "run.sh").stat().st_mode & 0o777 == 0o755
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_no_restore_on_other_platform(tmp_dir, capfd, mocker):
+    run(checkout(tmp_dir, "a"), "generate")
+    mocker.patch("platform.machine", return_value="other-machine")
+    capfd.readouterr()
+
+    run(checkout(tmp_dir, "b"), "generate")
+
+    assert "restored" not in capfd.readouterr().err
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_failures_are_not_cached(tmp_dir, capfd):
+    with pytest.raises(SystemExit) as e:
+        run(checkout(tmp_dir, "a"), "failing")
+    assert e.value.code == 3
+
+    with pytest.raises(SystemExit) as e:
+        run(checkout(tmp_dir, "b"), "failing")
+
+    assert e.value.code == 3
+    captured = capfd.readouterr()
+    assert captured.out == "failed\nfailed\n"
+    assert "restored" not in captured.err
+    assert not list((tmp_dir / "shared").glob("*/*"))
+
+
+@pytest.mark.usefixtures("shared_cache")
+def test_changed_outputs_pattern_is_not_restored(tmp_dir, capfd):
+    run(checkout(tmp_dir, "a"), "generate")
+    project = checkout(tmp_dir, "b")
+    (project / "pyproject.toml").write_text(TOML.replace('outputs = "out/*.txt"', 'outputs = "out/all.txt"'))
+    capfd.readouterr()
+
+    run(project, "generate")
+
+    assert "restored" not in capfd.readouterr().err
+
+
+def test_default_cache_dir(tmp_dir, monkeypatch):
+    monkeypatch.delenv(PYPROJECTX_CACHE_ENV_VAR, raising=False)
+    project = checkout(tmp_dir, "a")
+
+    run(project, "generate")
+
+    assert len(list((project / ".pyprojectx" / "cache").glob("*/*/result.json"))) == 1
+
+
+def test_get_backend(tmp_dir, monkeypatch):
+    monkeypatch.setenv(PYPROJECTX_CACHE_ENV_VAR, f"file://{tmp_dir}/shared")
+    assert get_backend(tmp_dir).path == tmp_dir / "shared"
+
+    monkeypatch.setenv(PYPROJECTX_CACHE_ENV_VAR, "s3://bucket")
+    with pytest.raises(Warning, match="Unsupported PYPROJECTX_CACHE backend 's3', use one of: file"):
+        get_backend(tmp_dir)
+
+
+def test_directory_backend(tmp_dir):
+    backend = DirectoryBackend(tmp_dir / "cache")
+    source = tmp_dir / "source"
+    source.mkdir()
+    (source / "result.json").write_text("{}")
+
+    assert not backend.get("abcd", tmp_dir / "target")
+    backend.put("abcd", source)
+    assert backend.get("abcd", tmp_dir / "target")
+    assert (tmp_dir / "target" / "result.json").read_text() == "{}"
+    assert (tmp_dir / "cache" / "ab" / "abcd" / "result.json").exists()
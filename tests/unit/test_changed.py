@@ -0,0 +1,103 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+from pyprojectx.changed import batches, changed_files
+from pyprojectx.cli import _run
+from pyprojectx.wrapper.pw import get_options
+
+pytestmark = [
+    pytest.mark.skipif(not shutil.which("git"), reason="git is not installed"),
+    pytest.mark.skipif(os.name != "posix", reason="the aliases use posix shell commands"),
+]
+
+TOML = """
+[tool.pyprojectx.aliases]
+lint = { cmd = "echo linting", files = ["*.py"] }
+"""
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture(autouse=True)
+def _no_exec(mocker):
+    # run the command in a subprocess instead of replacing the test process
+    mocker.patch("pyprojectx.env.CAN_EXEC", new=False)
+
+
+@pytest.fixture
+def repo(tmp_dir):
+    (tmp_dir / "pyproject.toml").write_text(TOML)
+    (tmp_dir / "a.py").write_text("a")
+    (tmp_dir / "b.txt").write_text("b")
+    (tmp_dir / "pkg").mkdir()
+    (tmp_dir / "pkg" / "d.py").write_text("d")
+    git(tmp_dir, "init", "-q")
+    git(tmp_dir, "add", ".")
+    git(tmp_dir, "-c", "user.name=test", "-c", "user.email=test@test", "commit", "-q", "-m", "initial")
+    return tmp_dir
+
+
+def run(repo, *args):
+    _run(["pyprojectx", "--install-dir", str(repo / ".pyprojectx"), "-t", str(repo / "pyproject.toml"), *args])
+
+
+def test_changed_option():
+    assert get_options(["--changed", "lint"]).changed == "HEAD"
+    assert get_options(["--changed", "lint"]).command == ["lint"]
+    assert get_options(["-t", "my.toml", "--changed=origin/main", "lint"]).changed == "origin/main"
+    assert get_options(["lint", "--changed"]).changed is None
+
+
+def test_changed_files(repo):
+    (repo / "a.py").write_text("changed")
+    (repo / "b.txt").write_text("changed")
+    (repo / "pkg" / "d.py").unlink()
+    (repo / "pkg" / "c.py").write_text("untracked")
+
+    assert changed_files("HEAD", repo, []) == ["a.py", "b.txt", "pkg/c.py"]
+    assert changed_files("HEAD", repo, ["*.py"]) == ["a.py", "pkg/c.py"]
+    assert changed_files("HEAD", repo / "pkg", []) == ["c.py"]
+
+
+def test_unknown_ref(repo):
+    with pytest.raises(Warning, match="Could not list the changed files"):
+        changed_files("unknown-ref", repo, [])
+
+
+def test_batches():
+    assert batches([]) == []
+    assert batches(["a", "b", "c"], max_length=8) == [["a", "b"], ["c"]]
+    assert batches(["a-very-long-file"], max_length=8) == [["a-very-long-file"]]
+
+
+def test_run_alias_with_changed_files(repo, capfd):
+    (repo / "a.py").write_text("changed")
+    (repo / "b.txt").write_text("changed")
+
+    run(repo, "--changed", "lint", "--fix")
+
+    assert capfd.readouterr().out == "linting --fix a.py\n"
+
+
+def test_skip_alias_without_changed_files(repo, capfd):
+    (repo / "b.txt").write_text("changed")
+
+    run(repo, "--changed", "lint")
+
+    captured = capfd.readouterr()
+    assert captured.out == ""
+    assert "lint \x1b[94mis skipped: no files changed since HEAD" in captured.err
+
+
+def test_changed_since_ref(repo, capfd):
+    git(repo, "branch", "main-copy")
+    (repo / "pkg" / "d.py").write_text("changed")
+    git(repo, "-c", "user.name=test", "-c", "user.email=test@test", "commit", "-q", "-am", "change")
+
+    run(repo, "--changed=main-copy", "lint")
+
+    assert capfd.readouterr().out == "linting pkg/d.py\n"
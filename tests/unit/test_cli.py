@@ -13,6 +13,12 @@ SCRIPTS_DIR = "Scripts" if sys.platform.startswith("win") else "bin"
 UV_EXE = "uv.exe" if sys.platform.startswith("win") else "uv"
 
 
+@pytest.fixture
+def exec_mock(mocker):
+    mocker.patch("pyprojectx.env.CAN_EXEC", True)
+    return mocker.patch("pyprojectx.env.exec_process")
+
+
 def test_parse_args():
     assert _get_options(["--toml", "an-option", "my-cmd"]).toml_path == Path("an-option")
     assert _get_options(["-t", "an-option", "my-cmd"]).toml_path == Path("an-option")
@@ -40,7 +46,7 @@ def test_parse_args():
     assert _get_options(["--upgrade"]).upgrade
 
 
-def test_run_tool(tmp_dir, mocker):
+def test_run_tool(tmp_dir, mocker, exec_mock):
     toml = Path(__file__).parent.with_name("data").joinpath("test.toml")
     run_mock = mocker.patch("subprocess.run")
 
@@ -67,28 +73,29 @@ def test_run_tool(tmp_dir, mocker):
         f"{os.sep}{SCRIPTS_DIR}{os.sep}{PYTHON_EXE}"
     )
 
-    run_args = run_mock.mock_calls[2].args[0]
-    run_kwargs = run_mock.mock_calls[2].kwargs
-    assert len(run_args) == 1
-    assert run_args[0] == "tool-1"
-    path_env = run_kwargs["env"]["PATH"]
+    assert len(run_mock.mock_calls) == 2, "the tool should replace the pyprojectx process"
+    exec_args = exec_mock.call_args.args[0]
+    exec_kwargs = exec_mock.call_args.kwargs
+    assert len(exec_args) == 1
+    assert exec_args[0] == "tool-1"
+    path_env = exec_kwargs["env"]["PATH"]
     assert (
         f"{tmp_dir.name}{os.sep}venvs{os.sep}tool-1-db298015454af73633c6be4b86b3f2e8-{PY_VER}{os.sep}{SCRIPTS_DIR}"
         in path_env
     )
-    assert run_kwargs["check"] is True
+    assert exec_kwargs["shell"] is False
 
 
-def test_run_tool_with_args(tmp_dir, mocker):
+def test_run_tool_with_args(tmp_dir, mocker, exec_mock):
     toml = Path(__file__).parent.with_name("data").joinpath("test.toml")
-    run_mock = mocker.patch("subprocess.run")
+    mocker.patch("subprocess.run")
 
     _run(["path/to/pyprojectx", "--install-dir", str(tmp_dir), "-t", str(toml), "tool-1", "arg1", "@last arg"])
 
-    run_mock.assert_called_with(ANY, shell=False, check=True, env=ANY, cwd=ANY, stdout=None)
-    run_args = run_mock.mock_calls[2].args[0]
-    assert run_args[0] == "tool-1"
-    assert run_args[1:] == ["arg1", "@last arg"]
+    exec_mock.assert_called_with(ANY, shell=False, env=ANY, cwd=ANY)
+    exec_args = exec_mock.call_args.args[0]
+    assert exec_args[0] == "tool-1"
+    assert exec_args[1:] == ["arg1", "@last arg"]
 
 
 def test_run_no_cmd(tmp_dir):
@@ -97,72 +104,69 @@ def test_run_no_cmd(tmp_dir):
         _run(["path/to/pyprojectx", "--install-dir", str(tmp_dir), "-t", str(toml)])
 
 
-def test_run_alias_with_ctx(tmp_dir, mocker):
+def test_run_alias_with_ctx(tmp_dir, mocker, exec_mock):
     toml = Path(__file__).parent.with_name("data").joinpath("test.toml")
-    run_mock = mocker.patch("subprocess.run")
+    mocker.patch("subprocess.run")
 
     _run(["path/to/pyprojectx", "--install-dir", str(tmp_dir), "-t", str(toml), "alias-1"])
 
-    run_mock.assert_called_with("tool-1 arg", shell=True, check=True, env=ANY, cwd=ANY, stdout=None)
-    path_env = run_mock.mock_calls[2].kwargs["env"]["PATH"]
+    exec_mock.assert_called_with("tool-1 arg", shell=True, env=ANY, cwd=ANY)
+    path_env = exec_mock.call_args.kwargs["env"]["PATH"]
     assert (
         f"{tmp_dir.name}{os.sep}venvs{os.sep}"
         f"tool-1-db298015454af73633c6be4b86b3f2e8-{PY_VER}{os.sep}{SCRIPTS_DIR}{os.path.pathsep}" in path_env
     )
 
 
-def test_run_alias_with_ctx_with_args(tmp_dir, mocker):
+def test_run_alias_with_ctx_with_args(tmp_dir, mocker, exec_mock):
     toml = Path(__file__).parent.with_name("data").joinpath("test.toml")
-    run_mock = mocker.patch("subprocess.run")
+    mocker.patch("subprocess.run")
 
     _run(["path/to/pyprojectx", "--install-dir", str(tmp_dir), "-t", str(toml), "alias-1", "alias-arg1", "alias-arg2"])
 
-    run_mock.assert_called_with(
-        'tool-1 arg "alias-arg1" "alias-arg2"', shell=True, check=True, env=ANY, cwd=ANY, stdout=None
-    )
+    exec_mock.assert_called_with('tool-1 arg "alias-arg1" "alias-arg2"', shell=True, env=ANY, cwd=ANY)
 
 
-def test_run_explicit_alias_with_ctx_with_arg(tmp_dir, mocker):
+def test_run_explicit_alias_with_ctx_with_arg(tmp_dir, mocker, exec_mock):
     toml = Path(__file__).parent.with_name("data").joinpath("test.toml")
-    run_mock = mocker.patch("subprocess.run")
+    mocker.patch("subprocess.run")
 
     _run(["path/to/pyprojectx", "--install-dir", str(tmp_dir), "-t", str(toml), "alias-3", "alias-arg"])
 
-    run_mock.assert_called_with('command arg "alias-arg"', shell=True, check=True, env=ANY, cwd=ANY, stdout=None)
+    exec_mock.assert_called_with('command arg "alias-arg"', shell=True, env=ANY, cwd=ANY)
     assert (
         f"{tmp_dir.name}{os.sep}venvs{os.sep}"
         f"tool-1-db298015454af73633c6be4b86b3f2e8-{PY_VER}{os.sep}{SCRIPTS_DIR}{os.path.pathsep}"
-        in run_mock.mock_calls[2].kwargs["env"]["PATH"]
+        in exec_mock.call_args.kwargs["env"]["PATH"]
     )
 
 
-def test_combined_alias_with_arg(tmp_dir, mocker):
+def test_combined_alias_with_arg(tmp_dir, mocker, exec_mock):
     toml = Path(__file__).parent.with_name("data").joinpath("test.toml")
     run_mock = mocker.patch("subprocess.run")
 
     _run(["path to/pyprojectx", "--install-dir", str(tmp_dir), "-t", str(toml), "combined-alias", "alias-arg"])
 
-    run_mock.assert_called_with(
+    # the leading reference runs in the same pyprojectx process, the rest of the command in a shell
+    run_mock.assert_any_call("tool-1 arg", shell=True, check=True, env=ANY, cwd=ANY, stdout=None)
+    exec_mock.assert_called_with(
         f'"{Path("path to/pyprojectx").absolute()}" --install-dir "{tmp_dir.absolute()}" -t {toml.absolute()} '
-        f'alias-1 && "{Path("path to/pyprojectx").absolute()}"'
-        f' --install-dir "{tmp_dir.absolute()}" -t {toml.absolute()} alias-2 "{Path("path to/pyprojectx").absolute()}"'
+        f'alias-2 "{Path("path to/pyprojectx").absolute()}"'
         f' --install-dir "{tmp_dir.absolute()}" -t {toml.absolute()} shell-command "alias-arg"',
         shell=True,
-        check=True,
         env=ANY,
         cwd=ANY,
-        stdout=None,
     )
 
 
 @pytest.mark.parametrize("cmd", ["tool-1", "alias-1", "alias-dict"])
-def test_run_with_env(tmp_dir, mocker, cmd):
+def test_run_with_env(tmp_dir, mocker, exec_mock, cmd):
     toml = Path(__file__).parent.with_name("data").joinpath("test.toml")
-    run_mock = mocker.patch("subprocess.run")
+    mocker.patch("subprocess.run")
 
     _run(["path to/pyprojectx", "--install-dir", str(tmp_dir), "-t", str(toml), cmd])
 
-    args = run_mock.call_args
+    args = exec_mock.call_args
     assert args.kwargs["env"]["ENV_VAR1"] == "ENV_VAR1"
     if cmd == "alias-dict":
         assert args.kwargs["env"].get("ENV_VAR2") == "ENV_VAR2"
@@ -170,9 +174,9 @@ def test_run_with_env(tmp_dir, mocker, cmd):
         assert args.kwargs["env"].get("ENV_VAR2") is None
 
 
-def test_shell_command_alias(tmp_dir, mocker):
+def test_shell_command_alias(tmp_dir, mocker, exec_mock):
     toml = Path(__file__).parent.with_name("data").joinpath("test.toml")
-    run_mock = mocker.patch("subprocess.run")
+    mocker.patch("subprocess.run")
 
     _run(
         [
@@ -186,36 +190,35 @@ def test_shell_command_alias(tmp_dir, mocker):
         ]
     )
 
-    run_mock.assert_called_with('ls -al "alias-arg"', shell=True, check=True, env=ANY, cwd=ANY, stdout=None)
+    exec_mock.assert_called_with('ls -al "alias-arg"', shell=True, env=ANY, cwd=ANY)
 
 
-def test_run_script(tmp_dir, mocker):
+def test_run_script(tmp_dir, mocker, exec_mock):
     data = Path(__file__).parent.with_name("data")
     toml = data / "test.toml"
-    run_mock = mocker.patch("subprocess.run")
+    mocker.patch("subprocess.run")
 
     _run(["path to/pyprojectx", "--install-dir", str(tmp_dir), "-t", str(toml), "script-a"])
 
-    args = run_mock.call_args.args[0]
+    args = exec_mock.call_args.args[0]
     assert len(args) == 2
     assert "python" in args[0]
     assert args[1] == (data / "scripts/script-a.py").absolute()
-    kwargs = run_mock.call_args.kwargs
+    kwargs = exec_mock.call_args.kwargs
     assert "tool-1" in kwargs["env"]["PATH"], "the path of the scripts_ctx should be in the PATH"
     assert kwargs["env"]["ENV_VAR1"] == "ENV_VAR1"
-    assert kwargs["check"]
     assert kwargs["cwd"] == "/cwd"
     assert not kwargs["shell"]
 
 
-def test_run_aliased_script(tmp_dir, mocker):
+def test_run_aliased_script(tmp_dir, mocker, exec_mock):
     data = Path(__file__).parent.with_name("data")
     toml = data / "test.toml"
-    run_mock = mocker.patch("subprocess.run")
+    mocker.patch("subprocess.run")
 
     _run(["path to/pyprojectx", "--install-dir", str(tmp_dir), "-t", str(toml), "aS"])
 
-    assert run_mock.call_args.args[0] == "python aliased-script.py --some-option"
+    assert exec_mock.call_args.args[0] == "python aliased-script.py --some-option"
 
 
 def test_install_context(tmp_dir, mocker):
@@ -269,7 +272,7 @@ def test_info_without_arg_should_not_raise_exception(tmp_dir, capsys):
 
 
 @pytest.mark.parametrize("cmd", ["", "my-cmd"])
-def test_clean(tmp_dir, capsys, mocker, cmd):
+def test_clean(tmp_dir, capsys, mocker, exec_mock, cmd):
     data = Path(__file__).parent.with_name("data")
     toml = data / "test.toml"
     run_mock = mocker.patch("subprocess.run")
@@ -288,6 +291,52 @@ def test_clean(tmp_dir, capsys, mocker, cmd):
     )
     assert captured.out == ""
     if cmd:
-        run_mock.assert_called_with([cmd], shell=False, check=True, env=ANY, cwd=ANY, stdout=ANY)
+        exec_mock.assert_called_with([cmd], shell=False, env=ANY, cwd=ANY)
     else:
         run_mock.assert_not_called()
+        exec_mock.assert_not_called()
+
+
+def test_clean_only_unlinks_shared_venvs(tmp_dir, capsys):
+    toml = Path(__file__).parent.with_name("data").joinpath("test.toml")
+    shared_venv_dir = tmp_dir / "shared" / "pyprojectx" / "old-pyprojectx"
+    shared_venv_dir.mkdir(parents=True)
+    shared_venv_dir.joinpath("pyprojectx").touch()
+    old_pyprojectx_link = tmp_dir / "pyprojectx" / "old-pyprojectx"
+    old_pyprojectx_link.parent.mkdir()
+    old_pyprojectx_link.symlink_to(shared_venv_dir, target_is_directory=True)
+
+    _run(["path to/pyprojectx", "--install-dir", str(tmp_dir), "-t", str(toml), "--clean"])
+
+    assert not old_pyprojectx_link.exists()
+    assert shared_venv_dir.joinpath("pyprojectx").exists()
+    assert capsys.readouterr().err == f"{pw.CYAN}Removing {pw.BLUE}{old_pyprojectx_link}{pw.RESET}\n"
+
+
+def test_alias_list_does_not_replace_process(tmp_dir, mocker, exec_mock):
+    toml = Path(__file__).parent.with_name("data").joinpath("test.toml")
+    run_mock = mocker.patch("subprocess.run")
+
+    _run(["path/to/pyprojectx", "--install-dir", str(tmp_dir), "-t", str(toml), "alias-dict-list"])
+
+    exec_mock.assert_not_called()
+    run_mock.assert_called_with("alias-dict-list-2", shell=True, check=True, env=ANY, cwd=ANY, stdout=None)
+
+
+def test_run_python_matrix(tmp_dir, capfd):
+    version = f"{sys.version_info.major}.{sys.version_info.minor}"
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text(
+        "[tool.pyprojectx]\nmain = []\n[tool.pyprojectx.aliases]\n"
+        f"""v = {{ cmd = 'python -c "import sys; print(sys.version_info[:2])"', python = ["{version}", "3.5"] }}"""
+    )
+
+    with pytest.raises(SystemExit) as e:
+        _run(["pyprojectx", "--install-dir", str(tmp_dir / ".pyprojectx"), "-t", str(toml), "v"])
+
+    assert e.value.code
+    captured = capfd.readouterr()
+    assert f"[py{version}] {sys.version_info[:2]}\n" in captured.out
+    assert f"py{version}  \x1b[94m0" in captured.err
+    assert "py3.5   \x1b[91m" in captured.err
+    assert [venv.name.endswith(f"-py{version}") for venv in (tmp_dir / ".pyprojectx" / "venvs").iterdir()] == [True]
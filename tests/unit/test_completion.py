@@ -0,0 +1,88 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+from pyprojectx.cli import _run
+from pyprojectx.completion import index_path
+from pyprojectx.manifest import load_config
+
+TOML = """
+[tool.pyprojectx]
+main = []
+lint = []
+
+[tool.pyprojectx.aliases]
+test = "echo test"
+test-all = "echo test all"
+fooBar = "echo foo bar"
+"""
+
+# a pw script that only writes the index, like `pw --info` would
+PW = f"""#!{sys.executable}
+from pathlib import Path
+from pyprojectx.manifest import load_config
+project = Path(__file__).parent
+load_config(project / "pyproject.toml", project / ".pyprojectx")
+"""
+
+
+@pytest.fixture
+def project(tmp_dir):
+    (tmp_dir / "pyproject.toml").write_text(TOML)
+    (tmp_dir / "bin").mkdir()
+    (tmp_dir / "bin" / "my-script.py").touch()
+    old = time.time() - 60
+    os.utime(tmp_dir / "pyproject.toml", (old, old))
+    return tmp_dir
+
+
+def test_index_is_written_with_the_config(project):
+    load_config(project / "pyproject.toml", project / ".pyprojectx")
+
+    assert index_path(project / ".pyprojectx").read_text().splitlines() == [
+        f"# {project / 'pyproject.toml'}",
+        "fooBar\talias",
+        "lint\ttool context",
+        "main\ttool context",
+        "my-script\tscript",
+        "test\talias",
+        "test-all\talias",
+    ]
+
+
+def test_index_is_only_written_for_the_default_locations(project):
+    load_config(project / "pyproject.toml", project / "other-install-dir")
+
+    assert not index_path(project / "other-install-dir").exists()
+
+
+def test_completion_script(capsys):
+    _run(["pyprojectx", "--completion", "fish"])
+
+    assert "complete -c px" in capsys.readouterr().out
+
+
+@pytest.mark.skipif(not (shutil.which("bash") and shutil.which("awk")), reason="needs bash and awk")
+@pytest.mark.parametrize(
+    ("word", "expected"),
+    [("", "fooBar lint main my-script test test-all"), ("te", "test test-all"), ("tA", "test-all"), ("f-b", "fooBar")],
+)
+def test_bash_completion(project, capsys, word, expected):
+    (project / "pw").write_text(PW)
+    (project / "pw").chmod(0o755)
+    _run(["pyprojectx", "--completion", "bash"])
+    script = capsys.readouterr().out
+    (project / "sub").mkdir()
+
+    result = subprocess.run(
+        ["bash", "-c", f'{script}\n_pyprojectx_commands "{word}" 1'],
+        cwd=project / "sub",
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.split() == expected.split()
@@ -1,7 +1,8 @@
+import time
 from pathlib import Path
 
 import pytest
-from pyprojectx.config import MAIN, AliasCommand, Config
+from pyprojectx.config import MAIN, AliasCommand, Config, build_name_trie, camel_match, find_in_name_trie
 
 
 def test_no_config():
@@ -99,6 +100,39 @@ def test_alias_config():
     ]
 
 
+def test_python_matrix(tmp_dir):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text(
+        """
+[tool.pyprojectx]
+main = { requirements = ["pytest"], python = "3.12" }
+other = []
+
+[tool.pyprojectx.aliases]
+test = { cmd = "pytest", python = ["3.10", "3.12"] }
+default = "pytest"
+one = { cmd = "pytest", python = "3.13" }
+other = { cmd = "pytest", ctx = "other" }
+"""
+    )
+    config = Config(toml)
+
+    assert config.get_alias("test")[0].python == ["3.10", "3.12"]
+    assert config.get_alias("one")[0].python == ["3.13"]
+    assert config.get_alias("other")[0].python == []
+    assert config.get_alias("default")[0].python == []
+    assert config.get_python_version("main") == "3.12"
+    assert config.get_python_version("other") is None
+
+
+def test_tool_context_python_is_one_version(tmp_dir):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text('[tool.pyprojectx]\nmain = { requirements = ["pytest"], python = ["3.10", "3.12"] }\n')
+
+    with pytest.raises(Warning, match="must be one version"):
+        Config(toml).get_python_version("main")
+
+
 def test_os_specific_alias_config(mocker):
     config = Config(Path(__file__).parent.with_name("data").joinpath("test-shell.toml"))
     assert config.get_alias("os-specific") == [AliasCommand("cmd", cwd="/cwd", ctx=MAIN, shell="default-shell")]
@@ -109,7 +143,7 @@ def test_os_specific_alias_config(mocker):
 
 
 def test_invalid_toml():
-    with pytest.raises(Warning, match=r"Could not parse.+are not allowed in strings.+"):
+    with pytest.raises(Warning, match=r"Could not parse.+(are not allowed in strings|Illegal character).+"):
         Config(Path(__file__).parent.with_name("data").joinpath("invalid.toml"))
 
 
@@ -140,3 +174,41 @@ def test_invalid_toml():
 def test_find_aliases_or_scripts(shortcut, candidates):
     config = Config(Path(__file__).parent.with_name("data").joinpath("alias-abbreviations.toml"))
     assert config.find_aliases_or_scripts(shortcut) == candidates
+
+
+# thousands of generated alias names, like f.e. build-service-12 and testService12Unit
+MANY_NAMES = [
+    name
+    for i in range(400)
+    for name in (
+        f"build-service-{i}",
+        f"deploy-service-{i}-prod",
+        f"testService{i}Unit",
+        f"test-service-{i}-integration",
+        f"lint{i}",
+    )
+]
+ABBREVIATIONS = ["", "b", "bS1", "build-service-12", "dS3P", "tS", "tS12U", "tS12I", "te-se-7-in", "l39", "x", "bSP"]
+
+
+def test_name_trie_matches_like_camel_match():
+    trie = build_name_trie(MANY_NAMES)
+
+    for abbrev in ABBREVIATIONS:
+        assert find_in_name_trie(trie, abbrev) == sorted(name for name in MANY_NAMES if camel_match(abbrev, name))
+
+
+def test_name_trie_benchmark():
+    trie = build_name_trie(MANY_NAMES)
+
+    start = time.perf_counter()
+    for abbrev in ABBREVIATIONS:
+        find_in_name_trie(trie, abbrev)
+    trie_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for abbrev in ABBREVIATIONS:
+        [name for name in MANY_NAMES if camel_match(abbrev, name)]
+    scan_seconds = time.perf_counter() - start
+
+    print(f"{len(MANY_NAMES)} names, {len(ABBREVIATIONS)} lookups: trie {trie_seconds:.4f}s, scan {scan_seconds:.4f}s")
+    assert trie_seconds < scan_seconds / 5
@@ -4,8 +4,9 @@ import sys
 from unittest.mock import ANY
 
 import pytest
-from pyprojectx.env import IsolatedVirtualEnv, PYTHON_EXE
+from pyprojectx.env import IsolatedVirtualEnv, PYTHON_EXE, uv_exe
 from pyprojectx.log import set_verbosity
+from pyprojectx.wrapper import pw
 
 
 def test_isolated_env_path(tmp_dir):
@@ -26,6 +27,13 @@ def test_isolated_env_path(tmp_dir):
     )
 
 
+def test_isolated_env_path_with_python_version(tmp_dir):
+    env = IsolatedVirtualEnv(tmp_dir, "env-name", {"requirements": ["requirement1"]}, python="3.10")
+
+    assert env.path.name.startswith("env-name-")
+    assert env.path.name.endswith("-py3.10")
+
+
 def test_isolated_env_install(tmp_dir):
     env = IsolatedVirtualEnv(tmp_dir, "env-name", {})
     assert not env.is_installed
@@ -113,3 +121,38 @@ def test_run(tmp_dir, capfd):
     env.run(f"echo {path}", env={}, cwd=".")
     captured = capfd.readouterr()
     assert str(env.scripts_path.name) in captured.out
+
+
+def test_run_replaces_process(tmp_dir, mocker):
+    mocker.patch("pyprojectx.env.CAN_EXEC", True)
+    execvpe_mock = mocker.patch("os.execvpe")
+    chdir_mock = mocker.patch("os.chdir")
+    env = IsolatedVirtualEnv(tmp_dir, "env-name", {})
+
+    env.run("echo hello", env={"FOO": "bar"}, cwd="some-dir", replace_process=True)
+
+    chdir_mock.assert_called_with("some-dir")
+    args = execvpe_mock.call_args.args
+    assert args[0] == "/bin/sh"
+    assert args[1] == ["/bin/sh", "-c", "echo hello"]
+    assert args[2]["FOO"] == "bar"
+    assert str(env.scripts_path.absolute()) in args[2]["PATH"]
+
+
+def test_run_does_not_replace_process_when_redirected(tmp_dir, mocker):
+    mocker.patch("pyprojectx.env.CAN_EXEC", True)
+    execvpe_mock = mocker.patch("os.execvpe")
+    run_mock = mocker.patch("subprocess.run")
+    env = IsolatedVirtualEnv(tmp_dir, "env-name", {})
+
+    env.run("echo hello", env={}, cwd=".", stdout=sys.stderr, replace_process=True)
+
+    execvpe_mock.assert_not_called()
+    run_mock.assert_called_once()
+
+
+def test_uv_exe(monkeypatch):
+    assert uv_exe.__wrapped__().endswith(f"uv{pw.EXE}")
+
+    monkeypatch.setenv(pw.PYPROJECTX_UV_BIN_ENV_VAR, "/path/to/uv")
+    assert uv_exe.__wrapped__() == "/path/to/uv"
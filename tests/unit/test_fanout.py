@@ -0,0 +1,12 @@
+import sys
+
+from pyprojectx.fanout import run_processes
+
+
+def test_prefixed_output_keeps_whitespace(capfd):
+    cmd = [sys.executable, "-c", "print('  indented\\ttrailing  ')"]
+
+    results = run_processes({"a": cmd, "b": None}, 2)
+
+    assert [(r.name, r.returncode) for r in results] == [("a", 0), ("b", None)]
+    assert capfd.readouterr().out == "[a]   indented\ttrailing  \n"
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from pyprojectx.cli import _run
+from pyprojectx.config import Config
+from pyprojectx.graph import split_references
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="the aliases use posix shell commands")
+
+TOML = """
+[tool.pyprojectx.aliases]
+failing = { cmd = "echo failed && exit 2", inputs = ["src/**/*.txt"] }
+build = "@generate && echo built"
+
+[tool.pyprojectx.aliases.generate]
+cmd = "mkdir -p out && cat src/*.txt > out/all.txt && echo generated"
+inputs = "src/*.txt"
+outputs = ["out/*.txt"]
+"""
+
+
+@pytest.fixture
+def toml(tmp_dir):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text(TOML)
+    (tmp_dir / "src").mkdir()
+    (tmp_dir / "src" / "a.txt").write_text("a")
+    return toml
+
+
+def run(toml, tmp_dir, *args):
+    _run(["pyprojectx", "--install-dir", str(tmp_dir / ".pyprojectx"), "-t", str(toml), *args])
+
+
+def test_inputs_and_outputs_config(toml):
+    (alias_cmd,) = Config(toml).get_alias("generate")
+
+    assert alias_cmd.inputs == ["src/*.txt"]
+    assert alias_cmd.outputs == ["out/*.txt"]
+    assert Config(toml).get_alias("build")[0].inputs == []
+
+
+def test_references_run_in_their_own_process(toml):
+    # so that they are skipped when they are up-to-date
+    assert split_references("@generate && echo built", Config(toml)) == ([], "@generate && echo built")
+
+
+def test_invalid_inputs_config(tmp_dir):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text("[tool.pyprojectx.aliases]\ninvalid = { cmd = 'echo', inputs = 1 }\n")
+
+    with pytest.raises(Warning, match="'inputs' must be a string or a list of strings"):
+        Config(toml).get_alias("invalid")
+
+
+def test_skip_up_to_date_alias(toml, tmp_dir, capfd):
+    run(toml, tmp_dir, "generate")
+    assert capfd.readouterr().out == "generated\n"
+
+    run(toml, tmp_dir, "generate")
+    captured = capfd.readouterr()
+    assert captured.out == ""
+    assert "generate \x1b[94mis up-to-date" in captured.err
+
+    # the same content with another mtime
+    (tmp_dir / "src" / "a.txt").write_text("a")
+    run(toml, tmp_dir, "generate")
+    assert capfd.readouterr().out == ""
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda tmp_dir: (tmp_dir / "src" / "a.txt").write_text("changed"),
+        lambda tmp_dir: (tmp_dir / "src" / "b.txt").write_text("b"),
+        lambda tmp_dir: (tmp_dir / "out" / "all.txt").unlink(),
+        lambda tmp_dir: (tmp_dir / "out" / "all.txt").write_text("changed"),
+    ],
+)
+def test_rerun_when_files_change(toml, tmp_dir, capfd, change):
+    run(toml, tmp_dir, "generate")
+    change(tmp_dir)
+    capfd.readouterr()
+
+    run(toml, tmp_dir, "generate")
+
+    assert capfd.readouterr().out == "generated\n"
+
+
+def test_rerun_with_other_arguments(toml, tmp_dir, capfd):
+    run(toml, tmp_dir, "generate")
+    run(toml, tmp_dir, "generate", "again")
+
+    assert capfd.readouterr().out == "generated\ngenerated again\n"
+
+
+def test_failed_alias_is_not_up_to_date(toml, tmp_dir, capfd):
+    for _ in range(2):
+        with pytest.raises(SystemExit):
+            run(toml, tmp_dir, "failing")
+
+    assert capfd.readouterr().out == "failed\nfailed\n"
+    assert not list((tmp_dir / ".pyprojectx" / "fingerprints").glob("*/failing.json"))
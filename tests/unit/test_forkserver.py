@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from pyprojectx import forkserver
+from pyprojectx.cli import _run
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="forkservers are only available on Linux and Mac")
+
+SCRIPT = """
+import os
+import sys
+
+print("args", sys.argv[1:], "cwd", os.path.basename(os.getcwd()), "env", os.environ.get("MY_VAR"))
+print("preloaded", "json" in sys.modules)
+raise SystemExit(int(os.environ.get("EXIT_CODE", "0")))
+"""
+
+
+@pytest.fixture
+def server(tmp_dir):
+    path = forkserver.socket_path(tmp_dir, "main", tmp_dir / "venv", ["json"])
+    forkserver.start(sys.executable, path, ["json"], tmp_dir, dict(os.environ), idle_timeout=10)
+    yield path
+    forkserver.stop(path)
+
+
+def wait_until_stopped(path):
+    deadline = time.monotonic() + 5
+    while Path(path).exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return not Path(path).exists()
+
+
+def test_run_script(tmp_dir, server, capfd):
+    script = tmp_dir / "script.py"
+    script.write_text(SCRIPT)
+
+    returncode = forkserver.run(server, [str(script), "a", "b"], str(tmp_dir), {"MY_VAR": "value"}, wait=10)
+
+    assert returncode == 0
+    assert capfd.readouterr().out == f"args ['a', 'b'] cwd {tmp_dir.name} env value\npreloaded True\n"
+
+
+def test_exit_code(tmp_dir, server):
+    script = tmp_dir / "script.py"
+    script.write_text(SCRIPT)
+
+    assert forkserver.run(server, [str(script)], str(tmp_dir), {"EXIT_CODE": "3"}, wait=10) == 3
+    script.write_text("raise ValueError('failed')")
+    assert forkserver.run(server, [str(script)], str(tmp_dir), {}) == 1
+
+
+def test_unavailable_forkserver(tmp_dir):
+    path = forkserver.socket_path(tmp_dir, "main", tmp_dir / "venv", [])
+
+    assert forkserver.run(path, ["script.py"], str(tmp_dir), {}) is None
+
+
+def test_socket_path_depends_on_venv_and_modules(tmp_dir):
+    path = forkserver.socket_path(tmp_dir, "main", tmp_dir / "venv", ["json"])
+
+    assert Path(path).name.startswith("main-")
+    assert forkserver.socket_path(tmp_dir, "main", tmp_dir / "venv", ["json"]) == path
+    assert forkserver.socket_path(tmp_dir, "main", tmp_dir / "other-venv", ["json"]) != path
+    assert forkserver.socket_path(tmp_dir, "main", tmp_dir / "venv", ["csv"]) != path
+
+
+def test_stop_stale(tmp_dir, server):
+    assert forkserver.run(server, ["-"], str(tmp_dir), {}, wait=10) is not None
+
+    forkserver.stop_stale(forkserver.socket_path(tmp_dir, "main", tmp_dir / "venv", ["csv"]), "main")
+
+    assert wait_until_stopped(server)
+
+
+def test_run_script_in_forkserver(tmp_dir, capfd):
+    (tmp_dir / "pyproject.toml").write_text('[tool.pyprojectx]\nmain = { requirements = [], preload = "json" }\n')
+    (tmp_dir / "bin").mkdir()
+    (tmp_dir / "bin" / "my-script.py").write_text(SCRIPT)
+    argv = ["pyprojectx", "--install-dir", str(tmp_dir / ".pyprojectx"), "-t", str(tmp_dir / "pyproject.toml")]
+    try:
+        _run([*argv, "my-script", "arg"])
+
+        assert capfd.readouterr().out == f"args ['arg'] cwd {tmp_dir.name} env None\npreloaded True\n"
+    finally:
+        for path in (tmp_dir / ".pyprojectx" / forkserver.FORKSERVERS_DIR).glob("*.sock"):
+            forkserver.stop(str(path))
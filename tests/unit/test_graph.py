@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import pytest
+from pyprojectx.cli import _run
+from pyprojectx.config import Config
+from pyprojectx.graph import build_graph, split_references
+
+TOML = """
+[tool.pyprojectx]
+main = []
+lint-tools = []
+scripts_dir = "scripts"
+
+[tool.pyprojectx.aliases]
+install = "uv sync"
+lint = "@lint-tools: ruff check"
+test = { cmd = "pytest", env = { TEST_ENV = "test" } }
+check = ["@install && @lint", "@test"]
+build = ["@install", "@check", "uv build"]
+with-env = { cmd = "@test", env = { PARENT_ENV = "parent" } }
+cd-first = "cd docs && @install"
+with-args = "@lint && @test"
+run-script = "@my-script && echo done"
+cycle-1 = "@cycle-2"
+cycle-2 = "@cycle-1"
+"""
+
+
+@pytest.fixture
+def config(tmp_dir):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text(TOML)
+    (tmp_dir / "scripts").mkdir()
+    (tmp_dir / "scripts" / "my-script.py").touch()
+    return Config(toml)
+
+
+def test_split_references(config):
+    assert split_references("@install && @lint", config) == (["install", "lint"], "")
+    assert split_references("pw@install&&pw@ lint && uv build", config) == (["install", "lint"], "uv build")
+    assert split_references("@my-script", config) == (["my-script"], "")
+    # a reference with arguments or after another command is left to the shell
+    assert split_references("@install --frozen", config) == ([], "@install --frozen")
+    assert split_references("cd docs && @install", config) == ([], "cd docs && @install")
+    assert split_references("@lint-tools: ruff check", config) == ([], "@lint-tools: ruff check")
+    assert split_references("@unknown && @install", config) == ([], "@unknown && @install")
+
+
+def test_shared_references_run_once(config):
+    graph = build_graph(config, "build", [], ["pw"])
+
+    assert [c.cmd for c in graph.commands()] == ["uv sync", "ruff check", "pytest", "uv build"]
+    assert graph.contexts() == ["main", "lint-tools"]
+    assert graph.steps[1].steps[0].duplicate
+
+
+def test_env_is_inherited(config):
+    (command,) = build_graph(config, "with-env", [], ["pw"]).commands()
+
+    assert command.cmd == "pytest"
+    assert command.env == {"PARENT_ENV": "parent", "TEST_ENV": "test"}
+
+
+def test_args_are_passed_to_the_last_reference(config):
+    commands = build_graph(config, "with-args", ["-k", "x"], ["pw"]).commands()
+
+    assert [c.cmd for c in commands] == ["ruff check", 'pytest "-k" "x"']
+
+
+def test_commands_before_a_reference_run_in_a_shell(config):
+    (command,) = build_graph(config, "cd-first", [], ["pw"]).commands()
+
+    assert command.cmd == f"cd docs && {Path('pw').absolute()} install"
+
+
+def test_script_reference(config):
+    commands = build_graph(config, "run-script", [], ["pw"]).commands()
+
+    assert commands[0].cmd == ["python", config.get_script_path("my-script")]
+    assert commands[1].cmd == "echo done"
+
+
+def test_cycle(config):
+    with pytest.raises(Warning, match="Circular alias reference: cycle-1 -> cycle-2 -> cycle-1"):
+        build_graph(config, "cycle-1", [], ["pw"])
+
+
+def test_plan(config, tmp_dir, capsys):
+    toml = Path(config.toml_path)
+
+    _run(["pyprojectx", "--install-dir", str(tmp_dir / ".pyprojectx"), "-t", str(toml), "--plan", "build"])
+
+    out = capsys.readouterr().out
+    assert out.splitlines()[:4] == ["build", "  @install", "    uv sync \x1b[94min \x1b[96mmain\x1b[0m", "  @check"]
+    assert "    @install \x1b[94m(already runs before)\x1b[0m" in out
+    assert "lint-tools \x1b[94m(needs to be installed)\x1b[0m" in out
@@ -0,0 +1,70 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+data_dir = Path(__file__).parent.with_name("data")
+
+# modules that are only needed to modify toml files, install px or locate uv for an installation
+LAZY_MODULES = ["tomlkit", "userpath", "uv", "pyprojectx.install_global", "pyprojectx.requirements"]
+
+
+def imported_modules(statement):
+    proc_result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True
+    )
+    return {line.split("|")[-1].strip() for line in proc_result.stderr.splitlines() if line.startswith("import time:")}
+
+
+def test_version_imports(tmp_dir):
+    # the pyprojectx process that `pw --version` forwards to
+    modules = imported_modules(
+        f"import os, sys; os.chdir(r'{tmp_dir}'); sys.argv = ['pyprojectx', '--version']\n"
+        "from pyprojectx.cli import main\n"
+        "try:\n    main()\nexcept SystemExit:\n    pass"
+    )
+
+    assert "pyprojectx.cli" in modules
+    assert not modules.intersection([*LAZY_MODULES, "tomllib", "pyprojectx.graph", "pyprojectx.workspace"])
+
+
+def test_cli_import_is_lazy():
+    modules = imported_modules("import pyprojectx.cli")
+
+    assert "pyprojectx.cli" in modules
+    assert not modules.intersection(LAZY_MODULES)
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_hot_path_imports(tmp_dir, cached):
+    shutil.copyfile(data_dir / "test.toml", tmp_dir / "pyproject.toml")
+    (tmp_dir / "pw.lock").write_text(
+        '[tool-1]\nhash = "db298015454af73633c6be4b86b3f2e8"\nrequirements = ["req1==1.0", "req2==2.0"]\n'
+    )
+    old = time.time() - 60
+    for path in (tmp_dir / "pyproject.toml", tmp_dir / "pw.lock"):
+        os.utime(path, (old, old))
+    statement = f"""
+from pathlib import Path
+from pyprojectx.manifest import load_config
+from pyprojectx.lock import get_or_update_locked_requirements
+config = load_config(Path(r"{tmp_dir / "pyproject.toml"}"), Path(r"{tmp_dir / ".pyprojectx"}"))
+config.get_alias(config.find_aliases_or_scripts("alias-1")[0])
+assert get_or_update_locked_requirements("tool-1", config, quiet=True)[0]["requirements"] == ["req1==1.0", "req2==2.0"]
+"""
+    if cached:
+        imported_modules(statement)
+
+    modules = imported_modules(statement)
+
+    if cached:
+        assert not modules.intersection([*LAZY_MODULES, "tomllib"]), "warm runs should not parse any toml"
+    elif sys.version_info >= (3, 11):
+        assert not modules.intersection(LAZY_MODULES)
+        assert "tomllib" in modules
+    else:
+        assert not modules.intersection(set(LAZY_MODULES) - {"tomlkit"})
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+from pyprojectx.cli import _run
+from pyprojectx.jobserver import MAKEFLAGS_ENV_VAR, PYPROJECTX_JOBS_ENV_VAR, jobserver
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="the jobserver needs named pipes")
+
+
+@pytest.fixture(autouse=True)
+def _no_inherited_jobserver(monkeypatch):
+    monkeypatch.delenv(MAKEFLAGS_ENV_VAR, raising=False)
+    monkeypatch.delenv(PYPROJECTX_JOBS_ENV_VAR, raising=False)
+
+
+def available_tokens(js):
+    os.set_blocking(js.read_fd, False)
+    tokens = b""
+    try:
+        while token := os.read(js.read_fd, 1):
+            tokens += token
+    except BlockingIOError:
+        pass
+    os.write(js.write_fd, tokens)
+    os.set_blocking(js.read_fd, True)
+    return len(tokens)
+
+
+def test_create_jobserver():
+    with jobserver(3) as js:
+        assert "-j3 --jobserver-auth=fifo:" in os.environ[MAKEFLAGS_ENV_VAR]
+        assert os.environ[PYPROJECTX_JOBS_ENV_VAR] == "3"
+        # the implicit token of this process is not in the pipe
+        assert available_tokens(js) == 2
+
+    assert MAKEFLAGS_ENV_VAR not in os.environ
+    assert PYPROJECTX_JOBS_ENV_VAR not in os.environ
+
+
+def test_jobs_env_var(monkeypatch):
+    monkeypatch.setenv(PYPROJECTX_JOBS_ENV_VAR, "5")
+
+    with jobserver(2) as js:
+        assert available_tokens(js) == 4
+
+
+def test_inherit_jobserver():
+    with jobserver(3) as parent:
+        makeflags = os.environ[MAKEFLAGS_ENV_VAR]
+        with jobserver(8) as child:
+            assert os.environ[MAKEFLAGS_ENV_VAR] == makeflags
+            assert child.read_fd != parent.read_fd
+            assert child.acquire() is None
+            assert child.acquire() == b"+"
+            assert available_tokens(parent) == 1
+            child.release(b"+")
+            assert available_tokens(parent) == 2
+
+
+def test_ignore_unavailable_jobserver(monkeypatch):
+    makeflags = "-j4 --jobserver-auth=fifo:/does/not/exist"
+    monkeypatch.setenv(MAKEFLAGS_ENV_VAR, makeflags)
+
+    with jobserver(2) as js:
+        # the last jobserver in MAKEFLAGS wins
+        assert os.environ[MAKEFLAGS_ENV_VAR].startswith(f"{makeflags} -j2 --jobserver-auth=fifo:")
+        assert available_tokens(js) == 1
+
+
+def test_implicit_token():
+    with jobserver(1) as js:
+        assert js.acquire() is None
+        js.release(None)
+        assert js.acquire() is None
+        assert available_tokens(js) == 0
+
+
+@pytest.mark.skipif(os.name != "posix", reason="the aliases use posix shell commands")
+def test_parallel_alias_uses_jobs_limit(tmp_dir, monkeypatch, capfd):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text("""
+[tool.pyprojectx.aliases]
+check = { cmd = ["sleep 0.3 && echo slow done", "echo $PYPROJECTX_JOBS"], parallel = 2, prefix = false }
+""")
+    monkeypatch.setenv(PYPROJECTX_JOBS_ENV_VAR, "1")
+
+    _run(["pyprojectx", "--install-dir", str(tmp_dir / ".pyprojectx"), "-t", str(toml), "check"])
+
+    assert capfd.readouterr().out.splitlines() == ["slow done", "1"]
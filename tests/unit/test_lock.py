@@ -1,7 +1,174 @@
-from pyprojectx.lock import can_lock
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+
+import pytest
+from pyprojectx.config import Config, read_toml
+from pyprojectx.hash import calculate_hash
+from pyprojectx.lock import (
+    _index_lock,
+    can_lock,
+    get_lock_state,
+    get_locked_requirements,
+    get_or_update_locked_requirements,
+    read_lock_data,
+)
 
 
 def test_can_lock():
     assert can_lock({"requirements": ["my-package==1.0.0"]})
     assert not can_lock({"requirements": ["my-package==1.0.0", "-e ."]})
     assert not can_lock({"requirements": ["my-package==1.0.0", "--editable ."]})
+
+
+LOCK = """# locked by pyprojectx
+[other]
+hash = "abc"
+requirements = ["a==1.0"]
+"""
+
+
+def test_lock_updates_are_written_once_per_batch(tmp_dir, mocker):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text('[tool.pyprojectx]\nmain = ["b"]\ntools = ["c"]\n')
+    (tmp_dir / "pw.lock").write_text(LOCK)
+    config = Config(toml)
+    mocker.patch("pyprojectx.lock._freeze", side_effect=lambda ctx, *_: [f"{ctx}==1.0"])
+    replace = mocker.spy(Path, "replace")
+
+    with get_lock_state(config).batch():
+        for ctx in ("main", "tools"):
+            assert get_or_update_locked_requirements(ctx, config, quiet=True)[1]
+        assert (tmp_dir / "pw.lock").read_text() == LOCK
+        assert get_locked_requirements("main", config)["requirements"] == ["main==1.0"]
+
+    assert replace.call_count == 1
+    content = (tmp_dir / "pw.lock").read_text()
+    assert content.startswith(LOCK)
+    assert read_toml(tmp_dir / "pw.lock")["tools"]["requirements"] == ["tools==1.0"]
+    requirements, modified = get_or_update_locked_requirements("tools", config, quiet=True)
+    assert (requirements["requirements"], modified) == (["tools==1.0"], False)
+
+
+SINGLE_LOCK = """# locked by pyprojectx
+[main]
+hash = "e6d3eb8e0bd1df4ef2f37ad47c5f6b0a"
+requirements = ["b==1.0"]
+post-install = "echo installed"
+
+[tools]
+hash = "0c39d8e5e3ad1ba6b1f8d04ae9bea6ec"
+requirements = ["c==1.0", "d==2.0"]
+"""
+
+
+def sharded_project(tmp_dir, lock_shards, lint="e"):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text(
+        f'[tool.pyprojectx]\nlock-shards = {str(lock_shards).lower()}\nmain = ["b"]\ntools = ["c"]\nlint = ["{lint}"]\n'
+    )
+    return Config(toml)
+
+
+def test_sharded_lock_updates(tmp_dir, mocker):
+    config = sharded_project(tmp_dir, lock_shards=True)
+    (tmp_dir / "pw.lock").touch()
+    mocker.patch("pyprojectx.lock._freeze", side_effect=lambda ctx, *_: [f"{ctx}==1.0"])
+
+    with get_lock_state(config).batch():
+        for ctx in ("main", "tools"):
+            get_or_update_locked_requirements(ctx, config, quiet=True)
+
+    index = read_toml(tmp_dir / "pw.lock")
+    assert sorted(index) == ["main", "tools"]
+    assert set(index["main"]) == {"hash", "shard"}
+    assert read_toml(tmp_dir / "pw.lock.d" / "tools.lock") == {
+        "requirements": ["tools==1.0"],
+        "hash": calculate_hash(config.get_requirements("tools")),
+    }
+
+    # a new process only reads the shard of the context that it needs
+    (tmp_dir / "pw.lock.d" / "main.lock").unlink()
+    config = Config(tmp_dir / "pyproject.toml")
+    assert get_locked_requirements("tools", config)["requirements"] == ["tools==1.0"]
+    assert get_locked_requirements("lint", config) is None
+    # the index entry of a context that was locked concurrently may be missing
+    (tmp_dir / "pw.lock").write_text("")
+    config.lock_data = None
+    assert get_locked_requirements("tools", config)["requirements"] == ["tools==1.0"]
+
+
+def test_lossless_migration_to_and_from_shards(tmp_dir, mocker):
+    (tmp_dir / "pw.lock").write_text(SINGLE_LOCK)
+    original = read_toml(tmp_dir / "pw.lock")
+    mocker.patch("pyprojectx.lock._freeze", side_effect=lambda ctx, *_: [f"{ctx}==1.0"])
+
+    # the lock file is migrated when it's updated
+    get_or_update_locked_requirements("lint", sharded_project(tmp_dir, lock_shards=True), quiet=True)
+
+    sharded = read_lock_data(sharded_project(tmp_dir, lock_shards=True), complete=True)
+    assert {ctx: sharded[ctx] for ctx in original} == original
+    assert sorted(path.name for path in (tmp_dir / "pw.lock.d").iterdir()) == ["lint.lock", "main.lock", "tools.lock"]
+    assert read_toml(tmp_dir / "pw.lock.d" / "main.lock") == original["main"]
+    assert read_toml(tmp_dir / "pw.lock")["tools"]["hash"] == original["tools"]["hash"]
+
+    # a context that is up-to-date is not locked, so the lock file is not migrated yet
+    assert not get_or_update_locked_requirements("lint", sharded_project(tmp_dir, lock_shards=False), quiet=True)[1]
+    assert (tmp_dir / "pw.lock.d").exists()
+    get_or_update_locked_requirements("lint", sharded_project(tmp_dir, lock_shards=False, lint="f"), quiet=True)
+
+    migrated = read_lock_data(sharded_project(tmp_dir, lock_shards=False))
+    assert {ctx: migrated[ctx] for ctx in original} == original
+    assert (tmp_dir / "pw.lock").read_text().startswith("# locked by pyprojectx\n")
+    assert not (tmp_dir / "pw.lock.d").exists()
+
+
+@pytest.mark.parametrize("lock_shards", [True, False])
+def test_reading_does_not_migrate(tmp_dir, mocker, lock_shards):
+    (tmp_dir / "pw.lock").write_text(SINGLE_LOCK)
+    mocker.patch("pyprojectx.lock._freeze", side_effect=lambda ctx, *_: [f"{ctx}==1.0"])
+    get_or_update_locked_requirements("lint", sharded_project(tmp_dir, lock_shards=not lock_shards), quiet=True)
+    lock_files = [tmp_dir / "pw.lock", *tmp_dir.glob("pw.lock.d/*")]
+    contents = [path.read_text() for path in lock_files]
+    config = sharded_project(tmp_dir, lock_shards=lock_shards)
+
+    assert get_locked_requirements("lint", config)["requirements"] == ["lint==1.0"]
+    assert get_or_update_locked_requirements("lint", config, quiet=True)[1] is False
+    assert read_lock_data(config, complete=True)["main"]["post-install"] == "echo installed"
+    assert [path.read_text() for path in lock_files] == contents
+    assert (tmp_dir / "pw.lock.d").exists() == (not lock_shards)
+
+
+@pytest.mark.parametrize("lock_shards", [True, False])
+def test_concurrent_updates_keep_each_others_entries(tmp_dir, mocker, lock_shards):
+    configs = [sharded_project(tmp_dir, lock_shards), sharded_project(tmp_dir, lock_shards)]
+    (tmp_dir / "pw.lock").touch()
+    mocker.patch("pyprojectx.lock._freeze", side_effect=lambda ctx, *_: [f"{ctx}==1.0"])
+    for config in configs:
+        read_lock_data(config)
+    # the main thread plays the other process, which already holds the lock
+    mocker.patch(
+        "pyprojectx.lock._index_lock",
+        side_effect=lambda config: nullcontext() if config is configs[0] else _index_lock(config),
+    )
+    update = threading.Thread(
+        target=get_or_update_locked_requirements, args=("tools", configs[1]), kwargs={"quiet": True}
+    )
+
+    with _index_lock(configs[0]):
+        update.start()
+        update.join(0.5)
+        # the update waits until the other process wrote the lock file
+        assert update.is_alive()
+        get_or_update_locked_requirements("main", configs[0], quiet=True)
+        assert update.is_alive()
+    update.join()
+
+    assert sorted(read_toml(tmp_dir / "pw.lock")) == ["main", "tools"]
+
+
+def test_invalid_lock_shards(tmp_dir):
+    (tmp_dir / "pyproject.toml").write_text('[tool.pyprojectx]\nlock-shards = "yes"\n')
+
+    with pytest.raises(Warning, match="'lock-shards' must be true or false"):
+        Config(tmp_dir / "pyproject.toml")
@@ -0,0 +1,87 @@
+import os
+import shutil
+import time
+from pathlib import Path
+
+from pyprojectx.config import Config
+from pyprojectx.manifest import get_manifest_path, load_config
+
+data_dir = Path(__file__).parent.with_name("data")
+
+
+def create_project(tmp_dir):
+    toml = tmp_dir / "pyproject.toml"
+    shutil.copyfile(data_dir / "test.toml", toml)
+    shutil.copytree(data_dir / "scripts", tmp_dir / "scripts")
+    (tmp_dir / "pw.lock").write_text('[tool-1]\nhash = "some-hash"\nrequirements = ["req1==1.0"]\n')
+    make_old(toml, tmp_dir / "scripts", tmp_dir / "pw.lock")
+    return toml
+
+
+def make_old(*paths):
+    old = time.time() - 60
+    for path in paths:
+        os.utime(path, (old, old))
+
+
+def test_manifest_hit(tmp_dir, mocker):
+    toml = create_project(tmp_dir)
+    install_path = tmp_dir / ".pyprojectx"
+
+    config = load_config(toml, install_path)
+    assert get_manifest_path(toml, install_path).exists()
+
+    parse_spy = mocker.spy(Config, "_parse")
+    cached_config = load_config(toml, install_path)
+    parse_spy.assert_not_called()
+
+    assert cached_config.to_state() == config.to_state()
+    assert cached_config.get_scripts() == ["aliased-script", "script-a", "script-b"]
+    assert cached_config.get_alias("alias-dict") == config.get_alias("alias-dict")
+    assert cached_config.get_requirements("tool-5") == config.get_requirements("tool-5")
+    assert cached_config.lock_data == {"tool-1": {"hash": "some-hash", "requirements": ["req1==1.0"]}}
+
+
+def test_manifest_miss_for_other_pyprojectx_version(tmp_dir, mocker):
+    toml = create_project(tmp_dir)
+    install_path = tmp_dir / ".pyprojectx"
+    load_config(toml, install_path)
+    parse_spy = mocker.spy(Config, "_parse")
+
+    mocker.patch("pyprojectx.manifest.VERSION", "99.0.0")
+    load_config(toml, install_path)
+    load_config(toml, install_path)
+
+    parse_spy.assert_called_once()
+
+
+def test_manifest_miss_when_config_files_change(tmp_dir, mocker):
+    toml = create_project(tmp_dir)
+    install_path = tmp_dir / ".pyprojectx"
+    load_config(toml, install_path)
+    parse_spy = mocker.spy(Config, "_parse")
+
+    (tmp_dir / "scripts" / "new-script.py").touch()
+    make_old(tmp_dir / "scripts")
+    assert "new-script" in load_config(toml, install_path).get_scripts()
+
+    toml.write_text(toml.read_text().replace("alias-1 = 'tool-1 arg'", "alias-1 = 'tool-1 changed'"))
+    make_old(toml)
+    assert load_config(toml, install_path).get_alias("alias-1")[0].cmd == "tool-1 changed"
+
+    (tmp_dir / "pw.lock").unlink()
+    assert load_config(toml, install_path).lock_data is None
+
+    assert parse_spy.call_count == 3
+    load_config(toml, install_path)
+    assert parse_spy.call_count == 3
+
+
+def test_manifest_not_written_for_recently_modified_files(tmp_dir):
+    toml = create_project(tmp_dir)
+    toml.touch()
+    install_path = tmp_dir / ".pyprojectx"
+
+    load_config(toml, install_path)
+
+    assert not get_manifest_path(toml, install_path).exists()
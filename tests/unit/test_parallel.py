@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+
+import pytest
+from pyprojectx import cli, parallel
+from pyprojectx.cli import _run
+from pyprojectx.config import Config
+from pyprojectx.parallel import ParallelRunner
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="the aliases use posix shell commands")
+
+TOML = """
+[tool.pyprojectx.aliases]
+slow = "sleep 0.3 && echo slow done"
+fast = "echo fast done"
+check = { cmd = ["@slow", "@fast"], parallel = 2 }
+serial-check = { cmd = ["@slow", "@fast"], parallel = 1, prefix = false }
+fail-fast = { cmd = ["sleep 10", "sleep 0.1 && exit 3"], parallel = 2 }
+shared = { cmd = ["@fast", "@after-fast && @slow"], parallel = 2 }
+default-parallel = { cmd = ["@fast", "@slow"], parallel = true }
+after-fast = "@fast && echo after fast"
+session-a = "ps -o sid= -p $$"
+session-b = "ps -o sid= -p $$"
+sessions = { cmd = ["@session-a", "@session-b"], parallel = 2, prefix = false }
+serial-sessions = { cmd = ["@session-a", "@session-b"], parallel = 1, prefix = false }
+"""
+
+
+@pytest.fixture
+def toml(tmp_dir):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text(TOML)
+    return toml
+
+
+def run(toml, tmp_dir, *args):
+    _run(["pyprojectx", "--install-dir", str(tmp_dir / ".pyprojectx"), "-t", str(toml), *args])
+
+
+def test_parallel_config(toml):
+    config = Config(toml)
+
+    assert config.get_alias("default-parallel")[0].parallel == os.cpu_count()
+    assert config.get_alias("check")[0].prefix
+    assert config.get_alias("serial-check")[0].parallel == 1
+    assert not config.get_alias("serial-check")[0].prefix
+    assert config.get_alias("fast")[0].parallel == 0
+
+
+@pytest.mark.parametrize(("parallel", "error"), [(0, "'parallel' must be"), ("yes", "'parallel' must be")])
+def test_invalid_parallel_config(tmp_dir, parallel, error):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text(f"[tool.pyprojectx.aliases]\ninvalid = {{ cmd = ['a', 'b'], parallel = {parallel!r} }}\n")
+
+    with pytest.raises(Warning, match=error):
+        Config(toml).get_alias("invalid")
+
+
+def test_run_in_parallel_with_prefixed_output(toml, tmp_dir, capfd):
+    run(toml, tmp_dir, "check")
+
+    assert capfd.readouterr().out.splitlines() == ["[fast] fast done", "[slow] slow done"]
+
+
+def test_max_concurrency(toml, tmp_dir, capfd):
+    run(toml, tmp_dir, "serial-check")
+
+    assert capfd.readouterr().out.splitlines() == ["slow done", "fast done"]
+
+
+def test_fail_fast(toml, tmp_dir):
+    start = time.time()
+
+    with pytest.raises(SystemExit) as e:
+        run(toml, tmp_dir, "fail-fast")
+
+    assert e.value.code == 3
+    assert time.time() - start < 5
+
+
+def test_shared_reference_runs_once(toml, tmp_dir, capfd):
+    run(toml, tmp_dir, "shared")
+
+    out = capfd.readouterr().out.splitlines()
+    assert out.count("[fast] fast done") == 1
+    # the steps of a concurrent command are prefixed with the name of its first step
+    assert out.index("[fast] fast done") < out.index("[after-fast] after fast")
+    assert "[after-fast] slow done" in out
+
+
+def test_only_concurrent_commands_run_in_their_own_session(toml, tmp_dir, capfd):
+    run(toml, tmp_dir, "serial-sessions")
+    serial = capfd.readouterr().out.split()
+    run(toml, tmp_dir, "sessions")
+    concurrent = capfd.readouterr().out.split()
+
+    # commands that run one at a time stay in the foreground process group, so they can read the terminal
+    assert serial == [str(os.getsid(0))] * 2
+    assert str(os.getsid(0)) not in concurrent
+
+
+def test_kill_command_on_keyboard_interrupt(tmp_dir, mocker):
+    mocker.patch("subprocess.Popen.wait", side_effect=KeyboardInterrupt)
+    kill = mocker.spy(parallel, "_kill")
+    runner = ParallelRunner(prepare=None)
+
+    with pytest.raises(KeyboardInterrupt):
+        runner._run_process(["sleep", "10"], None, False, tmp_dir, None, False)  # noqa: SLF001
+
+    proc, group = kill.call_args.args
+    assert not group
+    mocker.stopall()
+    assert proc.wait(5) == -15
+
+
+def test_tool_contexts_are_resolved_on_the_main_thread(tmp_dir, mocker, capfd):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text(
+        "[tool.pyprojectx]\nmain = []\ntools = []\n\n[tool.pyprojectx.aliases]\n"
+        'both = { cmd = ["main: echo main", "tools: echo tools"], parallel = 2 }\n'
+    )
+    mocker.patch("pyprojectx.env.IsolatedVirtualEnv.install")
+    ensure_ctx = mocker.spy(cli, "ensure_ctx")
+    threads = []
+    mocker.patch("pyprojectx.cli._refresh_shims", side_effect=lambda *_: threads.append(threading.current_thread()))
+
+    run(toml, tmp_dir, "both")
+
+    assert ensure_ctx.call_count == 2
+    assert threads == [threading.main_thread()] * 2
+    assert {"main", "tools"} <= set(capfd.readouterr().out.split())
@@ -0,0 +1,202 @@
+import hashlib
+import http.client
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pyprojectx.wrapper import pw
+
+VENV_NAME = f"{pw.VERSION}-py{sys.version_info.major}.{sys.version_info.minor}"
+
+
+@pytest.fixture
+def shared_dir(tmp_dir, monkeypatch):
+    monkeypatch.delenv(pw.PYPROJECTX_PACKAGE_ENV_VAR, raising=False)
+    monkeypatch.setenv(pw.PYPROJECTX_SHARED_DIR_ENV_VAR, str(tmp_dir / "shared"))
+    return tmp_dir / "shared"
+
+
+@pytest.fixture
+def install_mock(mocker):
+    def install(venv_dir, *_args, **_kwargs):
+        script = venv_dir / pw.SCRIPTS_DIR / f"pyprojectx{pw.EXE}"
+        script.parent.mkdir(parents=True)
+        script.touch()
+
+    return mocker.patch("pyprojectx.wrapper.pw._install_pyprojectx", side_effect=install)
+
+
+def ensure_pyprojectx(project_dir):
+    return pw.ensure_pyprojectx(pw.get_options(["-q", "--install-dir", str(project_dir / ".pyprojectx")]))
+
+
+def test_shared_pyprojectx_is_installed_once(tmp_dir, shared_dir, install_mock):
+    scripts = [ensure_pyprojectx(tmp_dir / project) for project in ("project-1", "project-2")]
+
+    install_mock.assert_called_once()
+    shared_venv_dir = shared_dir / "pyprojectx" / VENV_NAME
+    assert install_mock.call_args.args[0] == shared_venv_dir
+    assert shared_venv_dir.joinpath(pw.SHARED_READY_MARKER).is_file()
+    for project, script in zip(("project-1", "project-2"), scripts):
+        venv_link = tmp_dir / project / ".pyprojectx" / "pyprojectx" / VENV_NAME
+        assert venv_link.is_symlink()
+        assert venv_link.resolve() == shared_venv_dir.resolve()
+        assert script.is_file()
+
+
+@pytest.mark.usefixtures("shared_dir")
+def test_concurrent_shared_installs(tmp_dir, install_mock):
+    projects = [tmp_dir / f"project-{i}" for i in range(8)]
+    with ThreadPoolExecutor(max_workers=len(projects)) as executor:
+        scripts = list(executor.map(ensure_pyprojectx, projects))
+
+    install_mock.assert_called_once()
+    assert all(script.is_file() for script in scripts)
+
+
+def test_unfinished_shared_install_is_replaced(tmp_dir, shared_dir, install_mock):
+    shared_venv_dir = shared_dir / "pyprojectx" / VENV_NAME
+    shared_venv_dir.joinpath("leftover").mkdir(parents=True)
+
+    ensure_pyprojectx(tmp_dir / "project")
+
+    install_mock.assert_called_once()
+    assert not shared_venv_dir.joinpath("leftover").exists()
+
+
+def test_development_version_is_not_shared(tmp_dir, shared_dir, install_mock, monkeypatch):
+    monkeypatch.setenv(pw.PYPROJECTX_PACKAGE_ENV_VAR, "path/to/pyprojectx")
+
+    ensure_pyprojectx(tmp_dir / "project")
+
+    venv_dir = tmp_dir / "project" / ".pyprojectx" / "pyprojectx" / f"development-py{VENV_NAME.split('-py')[1]}"
+    install_mock.assert_called_once()
+    assert install_mock.call_args.args[0] == venv_dir
+    assert not venv_dir.is_symlink()
+    assert not shared_dir.exists()
+
+
+def zipapp_path(project_dir, version=pw.VERSION):
+    return project_dir / ".pyprojectx" / "pyprojectx" / f"pyprojectx-{version}.pyz"
+
+
+def test_existing_zipapp_is_used(tmp_dir, install_mock):
+    zipapp = zipapp_path(tmp_dir)
+    zipapp.parent.mkdir(parents=True)
+    zipapp.touch()
+
+    assert ensure_pyprojectx(tmp_dir) == zipapp
+    install_mock.assert_not_called()
+
+
+@pytest.fixture
+def release(mocker, monkeypatch):
+    """Publish a zipapp of release 9.8.7 with its checksum; returns the mocked download."""
+    monkeypatch.setattr(pw, "VERSION", "9.8.7")
+    monkeypatch.delenv(pw.PYPROJECTX_PACKAGE_ENV_VAR, raising=False)
+    monkeypatch.delenv(pw.PYPROJECTX_SHARED_DIR_ENV_VAR, raising=False)
+    monkeypatch.setenv(pw.PYPROJECTX_ZIPAPP_ENV_VAR, "1")
+    mocker.patch("shutil.which", return_value="/usr/bin/uv")
+    url = pw.ZIPAPP_URL.format(version="9.8.7")
+    content = b"zipapp content"
+    files = {url: content, f"{url}.sha256": f"{hashlib.sha256(content).hexdigest()}  pyprojectx-9.8.7.pyz\n".encode()}
+    return mocker.patch("pyprojectx.wrapper.pw._download", side_effect=lambda u, _timeout: files[u])
+
+
+def test_zipapp_is_downloaded_for_releases(tmp_dir, install_mock, release):
+    zipapp = ensure_pyprojectx(tmp_dir)
+
+    assert zipapp == zipapp_path(tmp_dir, "9.8.7")
+    assert zipapp.read_bytes() == b"zipapp content"
+    release.assert_called_with(pw.ZIPAPP_URL.format(version="9.8.7"), pw.ZIPAPP_DOWNLOAD_TIMEOUT)
+    install_mock.assert_not_called()
+
+
+def test_zipapp_is_only_downloaded_when_opted_in(tmp_dir, install_mock, release, monkeypatch):
+    monkeypatch.delenv(pw.PYPROJECTX_ZIPAPP_ENV_VAR)
+
+    script = ensure_pyprojectx(tmp_dir)
+
+    assert script.suffix != ".pyz"
+    release.assert_not_called()
+    install_mock.assert_called_once()
+
+
+def test_zipapp_is_downloaded_from_mirror(tmp_dir, install_mock, release, monkeypatch):
+    mirror = "https://mirror.example.com/pyprojectx-{version}.pyz"
+    monkeypatch.setenv(pw.PYPROJECTX_ZIPAPP_ENV_VAR, mirror)
+    content = b"mirrored zipapp"
+    files = {
+        "https://mirror.example.com/pyprojectx-9.8.7.pyz": content,
+        "https://mirror.example.com/pyprojectx-9.8.7.pyz.sha256": hashlib.sha256(content).hexdigest().encode(),
+    }
+    release.side_effect = lambda url, _timeout: files[url]
+
+    assert ensure_pyprojectx(tmp_dir).read_bytes() == content
+    install_mock.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "error", [OSError("offline"), TimeoutError("too slow"), http.client.IncompleteRead(b"partial")]
+)
+def test_venv_is_created_quietly_when_zipapp_download_fails(tmp_dir, install_mock, release, capsys, error):
+    release.side_effect = error
+
+    script = ensure_pyprojectx(tmp_dir)
+
+    assert script.suffix != ".pyz"
+    install_mock.assert_called_once()
+    assert not zipapp_path(tmp_dir, "9.8.7").parent.joinpath(f"pyprojectx-9.8.7.pyz.{os.getpid()}.tmp").exists()
+    assert capsys.readouterr().err == ""
+
+
+def test_venv_is_created_when_zipapp_checksum_does_not_match(tmp_dir, install_mock, release):
+    release.side_effect = lambda url, _timeout: b"tampered" if url.endswith(".pyz") else b"0" * 64
+
+    script = ensure_pyprojectx(tmp_dir)
+
+    assert script.suffix != ".pyz"
+    install_mock.assert_called_once()
+    assert not zipapp_path(tmp_dir, "9.8.7").exists()
+
+
+def test_shared_dir_is_used_for_releases(tmp_dir, install_mock, release, monkeypatch):
+    shared_dir = tmp_dir / "shared"
+    monkeypatch.setenv(pw.PYPROJECTX_SHARED_DIR_ENV_VAR, str(shared_dir))
+
+    ensure_pyprojectx(tmp_dir / "project")
+
+    release.assert_not_called()
+    install_mock.assert_called_once()
+    assert install_mock.call_args.args[0].parent == shared_dir / "pyprojectx"
+
+
+def test_download_is_bounded_in_time(mocker):
+    response = mocker.MagicMock()
+    response.__enter__.return_value.read.side_effect = [b"chunk"] * 3 + [b""]
+    mocker.patch("urllib.request.urlopen", return_value=response)
+    mocker.patch("time.monotonic", side_effect=[0, 1, 2, 31])
+
+    with pytest.raises(TimeoutError):
+        pw._download("https://example.com/file", 30)  # noqa: SLF001
+
+
+def test_forward_runs_zipapp_with_current_python(tmp_dir, mocker, monkeypatch):
+    monkeypatch.delenv(pw.PYPROJECTX_UV_BIN_ENV_VAR, raising=False)
+    exec_mock = mocker.patch("os.execv")
+    subprocess_mock = mocker.patch("subprocess.run", return_value=mocker.Mock(returncode=0))
+    zipapp = zipapp_path(tmp_dir)
+    uv = tmp_dir / ".pyprojectx" / f"uv-{pw.UV_VERSION}" / f"uv{pw.EXE}"
+    uv.parent.mkdir(parents=True)
+    uv.touch()
+
+    pw._forward(str(zipapp), ["--toml", "pyproject.toml"], ["my-cmd"])  # noqa: SLF001
+
+    cmd = [sys.executable, str(zipapp), "--toml", "pyproject.toml", "my-cmd"]
+    if os.name == "posix":
+        exec_mock.assert_called_once_with(sys.executable, cmd)
+    else:
+        subprocess_mock.assert_called_once_with(cmd, check=False)
+    assert os.environ[pw.PYPROJECTX_UV_BIN_ENV_VAR] == str(uv)
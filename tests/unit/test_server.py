@@ -0,0 +1,154 @@
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from pyprojectx.env import POSIX_SHELL, IsolatedVirtualEnv
+from pyprojectx.manifest import load_config
+from pyprojectx.server import DispatchServer, start_server
+from pyprojectx.wrapper import pw
+
+data_dir = Path(__file__).parent.with_name("data")
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="the pyprojectx server uses a Unix socket")
+
+
+@pytest.fixture
+def server(tmp_dir, monkeypatch):
+    # the server changes to the working directory of its clients
+    monkeypatch.chdir(tmp_dir)
+    toml = tmp_dir / "pyproject.toml"
+    shutil.copyfile(data_dir / "test.toml", toml)
+    shutil.copytree(data_dir / "scripts", tmp_dir / "scripts")
+    make_old(toml, tmp_dir / "scripts")
+    install_path = tmp_dir / ".pyprojectx"
+    config = load_config(toml, install_path)
+    IsolatedVirtualEnv(install_path / "venvs", "tool-1", config.get_requirements("tool-1")).scripts_path.mkdir(
+        parents=True
+    )
+    return DispatchServer(toml, install_path, idle_timeout=0.5)
+
+
+def make_old(*paths):
+    old = time.time() - 60
+    for path in paths:
+        os.utime(path, (old, old))
+
+
+def request(server, *args):
+    return {
+        "argv": [
+            server.pyprojectx_script,
+            *("--toml", str(server.toml_path), "--install-dir", str(server.install_path)),
+            *args,
+        ],
+        "cwd": str(server.toml_path.parent),
+        "env": {"PATH": "/client/bin", "CLIENT_VAR": "client"},
+    }
+
+
+def test_dispatch_alias(server):
+    response = server.dispatch(request(server, "alias-1", "extra arg"))
+
+    assert response["exec"] == [POSIX_SHELL, "-c", 'tool-1 arg "extra arg"']
+    assert response["cwd"] == "/cwd"
+    assert response["env"]["CLIENT_VAR"] == "client"
+    assert response["env"]["ENV_VAR1"] == "ENV_VAR1"
+    assert response["env"]["PATH"].endswith(f"{os.pathsep}/client/bin")
+    assert "tool-1" in response["env"]["PATH"]
+
+
+def test_dispatch_ctx_command(server):
+    response = server.dispatch(request(server, "tool-1", "arg"))
+
+    assert response["exec"] == ["tool-1", "arg"]
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["alias-2"],  # the tool context is not installed
+        ["alias-list"],
+        ["--info", "alias-1"],
+        ["--force-install", "alias-1"],
+        ["unknown-command"],
+    ],
+)
+def test_dispatch_falls_back_to_pyprojectx(server, args):
+    assert "fallback" in server.dispatch(request(server, *args))
+
+
+def test_dispatch_reloads_changed_config(server):
+    server.dispatch(request(server, "alias-1"))
+    toml = server.toml_path
+    toml.write_text(toml.read_text().replace("alias-1 = 'tool-1 arg'", "alias-1 = 'tool-1 changed'"))
+    make_old(toml)
+
+    assert server.dispatch(request(server, "alias-1"))["exec"] == [POSIX_SHELL, "-c", "tool-1 changed"]
+
+
+def test_other_pyprojectx_version_stops_server(server):
+    other_request = request(server, "alias-1")
+    other_request["argv"][0] = "/other/pyprojectx"
+
+    assert "fallback" in server.dispatch(other_request)
+    assert server._stopped  # noqa: SLF001
+
+
+def test_pw_execs_resolved_command(server, mocker):
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    socket_path = Path(pw.server_socket_path(server.install_path))
+    while not socket_path.exists():
+        time.sleep(0.01)
+    chdir_mock = mocker.patch("os.chdir")
+    exec_mock = mocker.patch("os.execvpe")
+
+    pw._dispatch(server.install_path, request(server, "alias-1")["argv"])  # noqa: SLF001
+
+    exec_mock.assert_called_once_with(POSIX_SHELL, [POSIX_SHELL, "-c", "tool-1 arg"], mocker.ANY)
+    chdir_mock.assert_called_with("/cwd")
+    # the server stops when it is idle
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert not socket_path.exists()
+
+
+def test_only_one_server_per_project(server):
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    socket_path = Path(pw.server_socket_path(server.install_path))
+    while not socket_path.exists():
+        time.sleep(0.01)
+
+    DispatchServer(server.toml_path, server.install_path).serve()
+
+    assert socket_path.exists()
+    thread.join(timeout=5)
+
+
+def test_start_server(server, mocker):
+    popen_mock = mocker.patch("subprocess.Popen")
+    options = pw.get_options(["--toml", str(server.toml_path), "--install-dir", str(server.install_path)])
+
+    start_server(options)
+    popen_mock.assert_called_once()
+    assert popen_mock.call_args.args[0][-5:] == [
+        "--toml",
+        str(server.toml_path),
+        "--install-dir",
+        str(server.install_path),
+        "--server",
+    ]
+
+    popen_mock.reset_mock()
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    while not Path(pw.server_socket_path(server.install_path)).exists():
+        time.sleep(0.01)
+    start_server(options)
+    popen_mock.assert_not_called()
+    thread.join(timeout=5)
@@ -0,0 +1,99 @@
+import os
+import shlex
+import subprocess
+import time
+
+import pytest
+from pyprojectx import shims
+from pyprojectx.cli import _run
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="shims are only available on Linux and Mac")
+
+FALLBACK = ["sh", "-c", 'echo refreshing "$@" >&2', "pw"]
+
+
+def make_scripts(path, *names):
+    path.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (path / name).write_text(f'#!/bin/sh\necho "{name} in {path.parent.name}" "$@"\n')
+        (path / name).chmod(0o755)
+    return path
+
+
+def touch(path, seconds_from_now):
+    path.touch()
+    mtime = time.time() + seconds_from_now
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def lock_file(tmp_dir):
+    lock_file = tmp_dir / "pw.lock"
+    touch(lock_file, -60)
+    return lock_file
+
+
+def run(shim, *args):
+    env = {k: v for k, v in os.environ.items() if k != shims.REFRESHED_ENV_VAR}
+    return subprocess.run([shim, *args], capture_output=True, text=True, env=env, check=False)
+
+
+def test_shims_exec_the_tools(tmp_dir, lock_file):
+    scripts = make_scripts(tmp_dir / "main" / "bin", "tool", "python", "activate", "activate.fish", "python3.12")
+
+    shims.write_shims(tmp_dir, "main", scripts, FALLBACK, [lock_file])
+
+    assert sorted(path.name for path in (tmp_dir / "bin").iterdir()) == [".stamps", "tool"]
+    assert shims.is_up_to_date(tmp_dir, "main", scripts, [lock_file])
+    result = run(tmp_dir / "bin" / "tool", "arg")
+    assert (result.stdout, result.stderr) == ("tool in main arg\n", "")
+
+
+def test_stale_shims_install_the_context_first(tmp_dir, lock_file):
+    scripts = make_scripts(tmp_dir / "main" / "bin", "tool")
+    shims.write_shims(tmp_dir, "main", scripts, FALLBACK, [lock_file])
+
+    touch(lock_file, 60)
+
+    assert not shims.is_up_to_date(tmp_dir, "main", scripts, [lock_file])
+    result = run(tmp_dir / "bin" / "tool", "arg")
+    assert (result.stdout, result.stderr) == ("tool in main arg\n", "refreshing --install-context main\n")
+    assert not shims.is_up_to_date(tmp_dir, "main", make_scripts(tmp_dir / "other" / "bin"), [])
+
+
+def test_shims_of_several_contexts(tmp_dir, lock_file):
+    other_scripts = make_scripts(tmp_dir / "other" / "bin", "tool", "other-tool", "removed-tool")
+    shims.write_shims(tmp_dir, "other", other_scripts, FALLBACK, [lock_file])
+    main_scripts = make_scripts(tmp_dir / "main" / "bin", "tool")
+    shims.write_shims(tmp_dir, "main", main_scripts, FALLBACK, [lock_file])
+
+    (other_scripts / "removed-tool").unlink()
+    shims.write_shims(tmp_dir, "other", other_scripts, FALLBACK, [lock_file])
+
+    # the main context wins
+    assert run(tmp_dir / "bin" / "tool").stdout == "tool in main\n"
+    assert run(tmp_dir / "bin" / "other-tool").stdout == "other-tool in other\n"
+    assert not (tmp_dir / "bin" / "removed-tool").exists()
+
+
+def test_env(tmp_dir, capfd):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text("[tool.pyprojectx]\ntools = []\n")
+    install_dir = tmp_dir / ".pyprojectx"
+
+    _run(["pyprojectx", "--install-dir", str(install_dir), "-t", str(toml), "--env", "tools"])
+
+    scripts_path = next((install_dir / "venvs").iterdir()) / "bin"
+    assert capfd.readouterr().out == f'export PATH={shlex.quote(str(scripts_path))}":$PATH"\n'
+    assert (install_dir / "tools").resolve() == scripts_path
+    assert shims.is_up_to_date(install_dir, "tools", scripts_path, [toml])
+
+
+def test_no_shims_for_other_config_files(tmp_dir):
+    toml = tmp_dir / "other.toml"
+    toml.write_text("[tool.pyprojectx]\ntools = []\n")
+    install_dir = tmp_dir / ".pyprojectx"
+
+    _run(["pyprojectx", "--install-dir", str(install_dir), "-t", str(toml), "--install-context", "tools"])
+
+    assert not (install_dir / "bin").exists()
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from pyprojectx.cli import _run
+from pyprojectx.manifest import load_config
+from pyprojectx.plan import resolve_references
+from pyprojectx.state import PYPROJECTX_STATE_ENV_VAR, ResolvedState
+
+data_dir = Path(__file__).parent.with_name("data")
+SCRIPTS_DIR = "Scripts" if sys.platform.startswith("win") else "bin"
+
+
+@pytest.fixture
+def project(tmp_dir):
+    toml = tmp_dir / "pyproject.toml"
+    shutil.copyfile(data_dir / "test.toml", toml)
+    shutil.copytree(data_dir / "scripts", tmp_dir / "scripts")
+    (tmp_dir / "pw.lock").write_text('[tool-1]\nhash = "db298015454af73633c6be4b86b3f2e8"\nrequirements = []\n')
+    make_old(toml, tmp_dir / "scripts", tmp_dir / "pw.lock")
+    return toml, tmp_dir / ".pyprojectx"
+
+
+def make_old(*paths):
+    old = time.time() - 60
+    for path in paths:
+        os.utime(path, (old, old))
+
+
+def test_env_and_inherit(project, tmp_dir, monkeypatch):
+    toml, install_path = project
+    config = load_config(toml, install_path)
+    state = ResolvedState.inherit(config, install_path)
+    assert state.venvs == {}
+
+    state.add_venv("tool-1", tmp_dir / "venv")
+    env = state.env()
+    assert json.loads(env[PYPROJECTX_STATE_ENV_VAR])["venvs"] == {"tool-1": str(tmp_dir / "venv")}
+    assert PYPROJECTX_STATE_ENV_VAR not in os.environ
+
+    monkeypatch.setenv(PYPROJECTX_STATE_ENV_VAR, env[PYPROJECTX_STATE_ENV_VAR])
+    assert ResolvedState.inherit(config, install_path).venv_path("tool-1") == str(tmp_dir / "venv")
+    # the state is taken out of the environment of the nested process, so that its tools don't receive it
+    assert PYPROJECTX_STATE_ENV_VAR not in os.environ
+    monkeypatch.setenv(PYPROJECTX_STATE_ENV_VAR, env[PYPROJECTX_STATE_ENV_VAR])
+    assert ResolvedState.inherit(config, tmp_dir / "other-install-dir").venv_path("tool-1") is None
+
+
+def test_ignore_state_when_config_changes(project, tmp_dir, monkeypatch):
+    toml, install_path = project
+    config = load_config(toml, install_path)
+    state = ResolvedState.inherit(config, install_path)
+    state.add_venv("tool-1", tmp_dir / "venv")
+    monkeypatch.setenv(PYPROJECTX_STATE_ENV_VAR, state.env()[PYPROJECTX_STATE_ENV_VAR])
+
+    toml.write_text(toml.read_text() + "\n")
+    make_old(toml)
+
+    assert ResolvedState.inherit(config, install_path).venv_path("tool-1") is None
+
+
+def test_racy_state_is_not_exported(project, tmp_dir):
+    toml, install_path = project
+    config = load_config(toml, install_path)
+    toml.touch()
+    state = ResolvedState.inherit(config, install_path)
+
+    state.add_venv("tool-1", tmp_dir / "venv")
+
+    assert state.env() == {}
+
+
+def test_nested_run_uses_verified_ctx(project, mocker):
+    toml, install_path = project
+    toml.write_text(toml.read_text().replace('shell-command = "ls -al"', 'nested = "tool-1 arg && pw@alias-1"'))
+    make_old(toml)
+    mocker.patch("pyprojectx.env.CAN_EXEC", True)
+    exec_mock = mocker.patch("pyprojectx.env.exec_process")
+    install_mock = mocker.patch("pyprojectx.env.IsolatedVirtualEnv.install")
+    pw_args = ["pyprojectx", "-t", str(toml), "--install-dir", str(install_path)]
+
+    _run([*pw_args, "nested"])
+    install_mock.assert_called_once()
+    state = exec_mock.call_args.kwargs["env"][PYPROJECTX_STATE_ENV_VAR]
+    venv_path = Path(json.loads(state)["venvs"]["tool-1"])
+    (venv_path / SCRIPTS_DIR).mkdir(parents=True)
+
+    # the nested pyprojectx process
+    mocker.patch.dict(os.environ, {PYPROJECTX_STATE_ENV_VAR: state})
+    lock_mock = mocker.patch("pyprojectx.cli.get_or_update_locked_requirements")
+    install_mock.reset_mock()
+    _run([*pw_args, "alias-1"])
+
+    lock_mock.assert_not_called()
+    install_mock.assert_not_called()
+    assert exec_mock.call_count == 2
+    env = exec_mock.call_args.kwargs["env"]
+    assert str(venv_path) in env["PATH"]
+    # tools don't receive the state
+    assert PYPROJECTX_STATE_ENV_VAR not in env
+
+
+def test_pw_references_run_zipapp_with_python(project):
+    toml, install_path = project
+    zipapp = install_path / "pyprojectx" / "pyprojectx-1.0.0.pyz"
+    pw_args = [str(zipapp), "-t", str(toml), "--install-dir", str(install_path)]
+    config = load_config(toml, install_path)
+
+    assert resolve_references("pw@alias-1", pw_args, config).startswith(f'{sys.executable} "{zipapp}" ')
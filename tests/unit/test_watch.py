@@ -0,0 +1,187 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+from pyprojectx.cli import _run
+from pyprojectx.graph import AliasNode
+from pyprojectx.parallel import ParallelRunner
+from pyprojectx.plan import PlannedCommand
+from pyprojectx.watch import InotifyWatcher, PollingWatcher, Watcher, watch
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="the commands use posix shell commands")
+
+
+class FakeWatcher(Watcher):
+    """Reports the given changes one by one, and then interrupts the watch loop."""
+
+    def __init__(self, *changes, patterns=("*.py",)):
+        """Construct a FakeWatcher."""
+        super().__init__(None, list(patterns))
+        self.changes = list(changes)
+        self.closed = False
+
+    def wait(self, debounce=0, timeout=None):  # noqa: ARG002
+        if timeout is not None:
+            # the changes that arrive before the run ended are reported by the wait without timeout
+            return set()
+        time.sleep(0.3)
+        if not self.changes:
+            raise KeyboardInterrupt
+        self.changed_at = time.monotonic()
+        return self.changes.pop(0)
+
+    def close(self):
+        self.closed = True
+
+    def _changes(self, timeout):  # noqa: ARG002
+        return set()
+
+
+@pytest.fixture
+def files(tmp_dir):
+    (tmp_dir / "src" / "pkg").mkdir(parents=True)
+    (tmp_dir / "src" / "a.py").write_text("a")
+    (tmp_dir / ".hidden").mkdir()
+    return tmp_dir
+
+
+def change_later(*changes):
+    def change():
+        time.sleep(0.2)
+        for path, content in changes:
+            path.write_text(content)
+
+    threading.Thread(target=change).start()
+
+
+watchers = [lambda root, patterns, excludes=None: PollingWatcher(root, patterns, excludes, interval=0.05)]
+if sys.platform.startswith("linux"):
+    watchers.append(InotifyWatcher)
+
+
+@pytest.mark.parametrize("create_watcher", watchers)
+def test_watch_files(files, create_watcher):
+    watcher = create_watcher(files, ["src/**/*.py"])
+    try:
+        change_later(
+            (files / "src" / "a.py", "changed"),
+            (files / "src" / "b.txt", "not watched"),
+            (files / ".hidden" / "c.py", "not watched"),
+            (files / "src" / "pkg" / "d.py", "new"),
+        )
+
+        assert watcher.wait(debounce=0.2) == {"src/a.py", "src/pkg/d.py"}
+    finally:
+        watcher.close()
+
+
+@pytest.mark.parametrize("create_watcher", watchers)
+def test_outputs_are_not_watched(files, create_watcher):
+    watcher = create_watcher(files, [], ["out/*"])
+    try:
+        (files / "out").mkdir()
+        change_later((files / "out" / "a.txt", "output"), (files / "src" / "a.py", "changed"))
+
+        assert watcher.wait(debounce=0.2) == {"src/a.py"}
+    finally:
+        watcher.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is only available on Linux")
+def test_removed_directories_are_not_watched(files):
+    watcher = InotifyWatcher(files, [])
+    try:
+        (files / "src" / "pkg" / "sub").mkdir()
+        (files / "src" / "pkg" / "sub" / "e.py").write_text("e")
+        watcher.wait(debounce=0.2)
+        (files / "src" / "pkg").rename(files / ".hidden" / "pkg")
+        (files / "src" / "a.py").unlink()
+        (files / "src").rmdir()
+
+        watcher.wait(debounce=0.2)
+
+        assert sorted(watcher._dirs_by_wd.values()) == [files]  # noqa: SLF001
+    finally:
+        watcher.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is only available on Linux")
+def test_watch_new_directory(files):
+    watcher = InotifyWatcher(files, [])
+    try:
+        (files / "new").mkdir()
+        (files / "new" / "e.py").write_text("e")
+
+        assert watcher.wait(debounce=0.2) == {"new/e.py"}
+    finally:
+        watcher.close()
+
+
+def test_cancel_running_command(capfd):
+    graph = AliasNode("slow", steps=[PlannedCommand("sleep 10 && echo not cancelled", None)])
+    runners = []
+
+    def plan():
+        runners.append(ParallelRunner(lambda command: (command.cmd, dict(os.environ), True)))
+        return runners[-1], graph
+
+    start = time.time()
+    watcher = FakeWatcher({"a.py"})
+
+    with pytest.raises(KeyboardInterrupt):
+        watch(plan, watcher, "slow")
+
+    assert time.time() - start < 5
+    assert len(runners) == 2
+    assert all(runner.cancelled for runner in runners)
+    assert watcher.closed
+    assert "Files changed, restarting \x1b[96mslow" in capfd.readouterr().err
+
+
+class WrittenWatcher(FakeWatcher):
+    """Reports the changes while the run is busy."""
+
+    def wait(self, debounce=0, timeout=None):
+        changes = super().wait(debounce, timeout)
+        self.changed_at = 0.0
+        return changes
+
+
+@pytest.mark.parametrize(
+    ("changes", "runs"),
+    [
+        # the second run writes the same file as the first one: it doesn't start another run
+        ([{"written"}, {"written"}], 2),
+        # a file that the run doesn't write changed during the second run
+        ([{"written"}, {"written", "a.py"}, {"written"}], 3),
+    ],
+)
+def test_changes_during_a_run_without_patterns(tmp_dir, changes, runs):
+    graph = AliasNode("write", steps=[PlannedCommand(f"touch {tmp_dir}/written", None)])
+    runners = []
+
+    def plan():
+        runners.append(ParallelRunner(lambda command: (command.cmd, dict(os.environ), True)))
+        return runners[-1], graph
+
+    with pytest.raises(KeyboardInterrupt):
+        watch(plan, WrittenWatcher(*changes, patterns=[]), "write")
+
+    assert len(runners) == runs
+    assert not any(runner.cancelled for runner in runners[:-1])
+
+
+def test_watch_alias(tmp_dir, mocker, capfd):
+    toml = tmp_dir / "pyproject.toml"
+    toml.write_text('[tool.pyprojectx.aliases]\ngreet = { cmd = "echo hello", watch = "*.py" }\n')
+    create_watcher = mocker.patch("pyprojectx.watch.create_watcher", return_value=FakeWatcher({"a.py"}))
+
+    with pytest.raises(KeyboardInterrupt):
+        _run(["pyprojectx", "--install-dir", str(tmp_dir / ".pyprojectx"), "-t", str(toml), "--watch", "greet"])
+
+    create_watcher.assert_called_once_with(tmp_dir, ["*.py"], [])
+    captured = capfd.readouterr()
+    assert captured.out == "hello\nhello\n"
+    assert "greet \x1b[94msucceeded, watching for changes..." in captured.err
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+from pyprojectx.cli import _run
+from pyprojectx.config import Config
+from pyprojectx.workspace import find_members
+
+MEMBER = """
+[tool.pyprojectx]
+main = []
+
+[tool.pyprojectx.aliases]
+test = "echo testing {name}"
+"""
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return path
+
+
+@pytest.fixture
+def workspace(tmp_dir):
+    write(tmp_dir / "pyproject.toml", "[tool.pyprojectx]\n")
+    write(tmp_dir / "libs" / "a" / "pyproject.toml", MEMBER.format(name="a"))
+    write(tmp_dir / "libs" / "b" / "pyproject.toml", MEMBER.format(name="b"))
+    write(tmp_dir / "apps" / "c" / "pyproject.toml", MEMBER.format(name="c").replace("echo", "exit 3 && echo"))
+    write(
+        tmp_dir / "apps" / "d" / "pyproject.toml",
+        '[tool.pyprojectx]\ntools = []\naliases = { build = "echo building" }\n',
+    )
+    write(tmp_dir / "other" / "pyproject.toml", "[project]\nname = 'other'\n")
+    write(tmp_dir / ".hidden" / "pyproject.toml", MEMBER.format(name="hidden"))
+    return tmp_dir
+
+
+def test_discover_members(workspace):
+    members = find_members(Config(workspace / "pyproject.toml"))
+
+    assert [member.relative_to(workspace).as_posix() for member in members] == [
+        "apps/c/pyproject.toml",
+        "apps/d/pyproject.toml",
+        "libs/a/pyproject.toml",
+        "libs/b/pyproject.toml",
+    ]
+
+
+def test_members_from_globs(workspace):
+    (workspace / "pyproject.toml").write_text('[tool.pyprojectx]\nworkspace = ["libs/*/pyproject.toml", "other/*"]\n')
+
+    members = find_members(Config(workspace / "pyproject.toml"))
+
+    assert [member.relative_to(workspace).as_posix() for member in members] == [
+        "libs/a/pyproject.toml",
+        "libs/b/pyproject.toml",
+        "other/pyproject.toml",
+    ]
+
+
+def test_no_members(tmp_dir):
+    write(tmp_dir / "pyproject.toml", '[tool.pyprojectx]\nworkspace = "libs/*/pyproject.toml"\n')
+
+    with pytest.raises(Warning, match="No workspace members found"):
+        find_members(Config(tmp_dir / "pyproject.toml"))
+
+
+def test_invalid_workspace(tmp_dir):
+    write(tmp_dir / "pyproject.toml", "[tool.pyprojectx]\nworkspace = 1\n")
+
+    with pytest.raises(Warning, match="'workspace' must be a string or a list of strings"):
+        Config(tmp_dir / "pyproject.toml")
+
+
+@pytest.mark.skipif(os.name != "posix", reason="the aliases use posix shell commands")
+def test_run_alias_in_all_members(workspace, capfd):
+    install_dir = workspace / ".pyprojectx"
+
+    with pytest.raises(SystemExit) as e:
+        _run(
+            ["pyprojectx", "--install-dir", str(install_dir), "-t", str(workspace / "pyproject.toml"), "--all", "test"]
+        )
+
+    assert e.value.code == 3
+    captured = capfd.readouterr()
+    assert sorted(captured.out.splitlines()) == ["[libs/a] testing a", "[libs/b] testing b"]
+    summary = captured.err[captured.err.index("member") :]
+    assert "apps/c  \x1b[91m3" in summary
+    assert "apps/d  \x1b[94mskipped" in summary
+    assert "libs/a  \x1b[94m0" in summary
+    # the members with the same requirements share the virtual environment of their main context
+    assert [venv.name.split("-")[0] for venv in (install_dir / "venvs").iterdir()] == ["main"]
+
+
+def test_members_resolve_against_their_own_toml(workspace, mocker):
+    ensure_ctx = mocker.patch("pyprojectx.cli.ensure_ctx")
+    mocker.patch("pyprojectx.fanout.run_processes", return_value=[])
+    mocker.patch("pyprojectx.fanout.print_summary")
+    member_toml = workspace / "libs" / "a" / "pyproject.toml"
+    (workspace / "pyproject.toml").write_text('[tool.pyprojectx]\nworkspace = "libs/a/pyproject.toml"\n')
+
+    _run(["pyprojectx", "-t", str(workspace / "pyproject.toml"), "--all", "test"])
+
+    # post-install commands with references run pyprojectx with the toml file of the member
+    pw_args = ensure_ctx.call_args.args[4]
+    assert pw_args[pw_args.index("--toml") + 1] == str(member_toml)